@@ -3,15 +3,16 @@ GariPamoja AI Services - FastAPI Application
 Provides AI-powered services for the car sharing platform
 """
 
-from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Depends, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
+from fastapi.responses import Response
+from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 import uvicorn
 import os
+import time
+import asyncio
 import redis
-import json
 import logging
 from datetime import datetime, timedelta
 
@@ -21,6 +22,21 @@ from services.pricing import PricingService
 from services.fraud_detection import FraudDetectionService
 from services.recommendations import RecommendationService
 from services.content_moderation import ContentModerationService
+from services.analytics import MetricsAggregator
+from services.jobs import JobQueue
+from services.executor import cpu_executor
+from services.singleflight import SingleFlight
+from services.cache import tiered_cache
+from services.admission import AdmissionController
+from services.data_access import data_access
+from services import serialization
+from services.metrics import (
+    REQUEST_LATENCY,
+    REQUESTS_IN_PROGRESS,
+    BATCH_SIZE,
+    monitor_event_loop_lag,
+    render_metrics,
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -32,7 +48,8 @@ app = FastAPI(
     description="AI-powered services for peer-to-peer car sharing platform",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=serialization.JSONResponse
 )
 
 # Add CORS middleware
@@ -57,6 +74,87 @@ fraud_detection_service = FraudDetectionService()
 recommendation_service = RecommendationService()
 content_moderation_service = ContentModerationService()
 
+# Durable batch jobs, consumed by worker.py processes
+job_queue = JobQueue(redis_client)
+
+# Identical concurrent requests share one computation
+singleflight = SingleFlight(redis_client)
+
+# Rate limits and priority admission; fraud checks keep reserved capacity under overload
+admission = AdmissionController(redis_client)
+
+# Dashboard metrics: one MGET across all services, cached briefly
+metrics_aggregator = MetricsAggregator(
+    redis_client,
+    services={
+        "chatbot": chatbot_service,
+        "pricing": pricing_service,
+        "fraud_detection": fraud_detection_service,
+        "recommendations": recommendation_service,
+        "content_moderation": content_moderation_service
+    },
+    summary_sections=["chatbot", "pricing", "fraud_detection", "recommendations"],
+    cache_seconds=float(os.getenv("ANALYTICS_CACHE_SECONDS", "5"))
+)
+
+@app.middleware("http")
+async def instrument_requests(request: Request, call_next):
+    """Record latency per route template, never per raw URL"""
+    started = time.perf_counter()
+    route = "unmatched"
+    for candidate in app.router.routes:
+        match, _ = candidate.matches(request.scope)
+        if match.name == "FULL":
+            route = candidate.path
+            break
+    
+    REQUESTS_IN_PROGRESS.labels(route=route).inc()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        REQUESTS_IN_PROGRESS.labels(route=route).dec()
+        REQUEST_LATENCY.labels(
+            method=request.method,
+            route=route,
+            status=str(status)
+        ).observe(time.perf_counter() - started)
+
+async def watch_fraud_model(interval: float):
+    """Pick up models published by trainer.py without a stop-the-world refit"""
+    while True:
+        await asyncio.sleep(interval)
+        if await asyncio.to_thread(fraud_detection_service.load_published_model):
+            await asyncio.to_thread(cpu_executor.reload)
+
+@app.on_event("startup")
+async def startup_event():
+    """Start background monitors, cache invalidation and warm the CPU pool"""
+    app.state.loop_lag_monitor = asyncio.create_task(monitor_event_loop_lag())
+    tiered_cache.start_listener()
+    await data_access.start()
+    await fraud_detection_service.update_model()
+    app.state.fraud_model_watcher = asyncio.create_task(
+        watch_fraud_model(float(os.getenv("FRAUD_MODEL_POLL_SECONDS", "30")))
+    )
+    await asyncio.to_thread(cpu_executor.start, [
+        pricing_service,
+        fraud_detection_service,
+        recommendation_service
+    ])
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop monitors and release pooled connections"""
+    app.state.loop_lag_monitor.cancel()
+    app.state.fraud_model_watcher.cancel()
+    tiered_cache.stop_listener()
+    cpu_executor.shutdown()
+    await data_access.close()
+    await chatbot_service.llm_gateway.aclose()
+
 # Pydantic models for request/response
 class ChatRequest(BaseModel):
     user_id: str
@@ -70,6 +168,10 @@ class ChatResponse(BaseModel):
     suggested_actions: List[str] = []
     follow_up_questions: List[str] = []
 
+class ChatFeedbackRequest(BaseModel):
+    user_id: str
+    rating: int = Field(..., ge=1, le=5)
+
 class PricingRequest(BaseModel):
     car_id: str
     base_price: float
@@ -89,6 +191,11 @@ class FraudDetectionRequest(BaseModel):
     transaction_data: Dict[str, Any]
     user_behavior: Optional[Dict[str, Any]] = None
 
+class FraudLabelRequest(BaseModel):
+    transaction_id: str  # transaction_data["transaction_id"] of the scored request
+    is_fraud: bool
+    source: str = "chargeback"  # "chargeback", "dispute", "manual_review"
+
 class FraudDetectionResponse(BaseModel):
     risk_score: float
     is_suspicious: bool
@@ -134,19 +241,19 @@ async def health_check():
         }
     }
 
+# Prometheus scrape endpoint
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics exposition"""
+    payload, content_type = render_metrics()
+    return Response(content=payload, media_type=content_type)
+
 # Chatbot endpoint
-@app.post("/chat", response_model=ChatResponse)
+@app.post("/chat", response_model=ChatResponse, dependencies=[Depends(admission.guard("chat"))])
 async def chat_with_ai(request: ChatRequest):
     """AI-powered chatbot for customer support"""
     try:
-        # Check cache first
-        cache_key = f"chat:{request.user_id}:{hash(request.message)}"
-        cached_response = redis_client.get(cache_key)
-        
-        if cached_response:
-            return JSONResponse(content=json.loads(cached_response))
-        
-        # Get AI response
+        # Cached per user/message/language for 5 minutes (see ChatbotService.get_response)
         response = await chatbot_service.get_response(
             user_id=request.user_id,
             message=request.message,
@@ -154,27 +261,39 @@ async def chat_with_ai(request: ChatRequest):
             language=request.language
         )
         
-        # Cache response for 5 minutes
-        redis_client.setex(cache_key, 300, json.dumps(response.dict()))
-        
         return response
         
     except Exception as e:
         logger.error(f"Error in chat endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+# Chatbot feedback endpoint
+@app.post("/chat/feedback")
+async def chat_feedback(request: ChatFeedbackRequest):
+    """Record user satisfaction with a chatbot answer"""
+    chatbot_service.record_feedback(request.user_id, request.rating)
+    return {"status": "recorded"}
+
 # Dynamic pricing endpoint
-@app.post("/pricing/suggest", response_model=PricingResponse)
+@app.post(
+    "/pricing/suggest",
+    response_model=PricingResponse,
+    dependencies=[Depends(admission.guard("pricing_suggest"))]
+)
 async def suggest_pricing(request: PricingRequest):
     """AI-powered dynamic pricing suggestions"""
     try:
-        response = await pricing_service.suggest_price(
-            car_id=request.car_id,
-            base_price=request.base_price,
-            location=request.location,
-            start_date=request.start_date,
-            end_date=request.end_date,
-            demand_factors=request.demand_factors
+        response = await singleflight.do(
+            "pricing_suggest",
+            request.model_dump(),
+            lambda: pricing_service.suggest_price(
+                car_id=request.car_id,
+                base_price=request.base_price,
+                location=request.location,
+                start_date=request.start_date,
+                end_date=request.end_date,
+                demand_factors=request.demand_factors
+            )
         )
         
         return response
@@ -184,7 +303,11 @@ async def suggest_pricing(request: PricingRequest):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 # Fraud detection endpoint
-@app.post("/fraud/detect", response_model=FraudDetectionResponse)
+@app.post(
+    "/fraud/detect",
+    response_model=FraudDetectionResponse,
+    dependencies=[Depends(admission.guard("fraud_detect"))]
+)
 async def detect_fraud(request: FraudDetectionRequest):
     """AI-powered fraud detection"""
     try:
@@ -200,17 +323,39 @@ async def detect_fraud(request: FraudDetectionRequest):
         logger.error(f"Error in fraud detection endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@app.post("/fraud/labels")
+async def record_fraud_labels(labels: List[FraudLabelRequest]):
+    """Ingest confirmed outcomes (chargebacks, dispute rulings) for scored transactions"""
+    try:
+        for label in labels:
+            await asyncio.to_thread(fraud_detection_service.record_label, label.transaction_id, label.is_fraud)
+        logger.info(f"Recorded {len(labels)} fraud labels ({', '.join(sorted({label.source for label in labels}))})")
+        
+        return {"recorded": len(labels)}
+        
+    except Exception as e:
+        logger.error(f"Error recording fraud labels: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 # Recommendations endpoint
-@app.post("/recommendations", response_model=RecommendationResponse)
+@app.post(
+    "/recommendations",
+    response_model=RecommendationResponse,
+    dependencies=[Depends(admission.guard("recommendations"))]
+)
 async def get_recommendations(request: RecommendationRequest):
     """AI-powered car recommendations"""
     try:
-        response = await recommendation_service.get_recommendations(
-            user_id=request.user_id,
-            preferences=request.preferences,
-            location=request.location,
-            budget=request.budget,
-            dates=request.dates
+        response = await singleflight.do(
+            "recommendations",
+            request.model_dump(),
+            lambda: recommendation_service.get_recommendations(
+                user_id=request.user_id,
+                preferences=request.preferences,
+                location=request.location,
+                budget=request.budget,
+                dates=request.dates
+            )
         )
         
         return response
@@ -220,7 +365,11 @@ async def get_recommendations(request: RecommendationRequest):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 # Content moderation endpoint
-@app.post("/moderation/check", response_model=ContentModerationResponse)
+@app.post(
+    "/moderation/check",
+    response_model=ContentModerationResponse,
+    dependencies=[Depends(admission.guard("moderation_check"))]
+)
 async def moderate_content(request: ContentModerationRequest):
     """AI-powered content moderation"""
     try:
@@ -236,19 +385,22 @@ async def moderate_content(request: ContentModerationRequest):
         logger.error(f"Error in content moderation endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
-# Batch processing endpoint
-@app.post("/batch/process")
-async def batch_process(background_tasks: BackgroundTasks, tasks: List[Dict[str, Any]]):
-    """Process multiple AI tasks in background"""
+# Batch processing endpoints
+@app.post("/batch/process", dependencies=[Depends(admission.guard("batch_process"))])
+async def batch_process(tasks: List[Dict[str, Any]]):
+    """Queue AI tasks for the batch worker processes"""
+    unknown = [task.get("type") for task in tasks if task.get("type") not in JobQueue.TASK_TYPES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unsupported task types: {unknown}")
+    
     try:
         task_ids = []
         
         for task in tasks:
-            task_id = f"task_{datetime.utcnow().timestamp()}_{len(task_ids)}"
-            task_ids.append(task_id)
+            data = task.get("data", [])
+            BATCH_SIZE.labels(task_type=task["type"]).observe(len(data))
             
-            # Add task to background processing
-            background_tasks.add_task(process_background_task, task_id, task)
+            task_ids.append(job_queue.submit(task["type"], data, task.get("chunk_size")))
         
         return {
             "message": "Tasks queued for processing",
@@ -260,59 +412,37 @@ async def batch_process(background_tasks: BackgroundTasks, tasks: List[Dict[str,
         logger.error(f"Error in batch processing: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
-async def process_background_task(task_id: str, task: Dict[str, Any]):
-    """Process a background AI task"""
-    try:
-        task_type = task.get("type")
-        
-        if task_type == "pricing_analysis":
-            await pricing_service.batch_analyze(task.get("data", []))
-        elif task_type == "fraud_analysis":
-            await fraud_detection_service.batch_analyze(task.get("data", []))
-        elif task_type == "content_moderation":
-            await content_moderation_service.batch_moderate(task.get("data", []))
-        
-        # Store result in Redis
-        redis_client.setex(f"task_result:{task_id}", 3600, json.dumps({
-            "status": "completed",
-            "timestamp": datetime.utcnow().isoformat()
-        }))
-        
-    except Exception as e:
-        logger.error(f"Error processing background task {task_id}: {str(e)}")
-        redis_client.setex(f"task_result:{task_id}", 3600, json.dumps({
-            "status": "failed",
-            "error": str(e),
-            "timestamp": datetime.utcnow().isoformat()
-        }))
+@app.get("/batch/jobs/{job_id}")
+async def get_batch_job(job_id: str):
+    """Get batch job status and progress"""
+    job = job_queue.get_status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/batch/jobs/{job_id}/results")
+async def get_batch_job_results(job_id: str, offset: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000)):
+    """Get per-item results of a batch job, paginated"""
+    job = job_queue.get_status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return {
+        "job_id": job_id,
+        "status": job["status"],
+        "processed_items": job["processed_items"],
+        "failed_items": job["failed_items"],
+        "total_items": job["total_items"],
+        "offset": offset,
+        "results": job_queue.get_results(job_id, offset, limit)
+    }
 
 # Analytics endpoint
-@app.get("/analytics/summary")
+@app.get("/analytics/summary", dependencies=[Depends(admission.guard("analytics"))])
 async def get_analytics_summary():
     """Get AI service analytics summary"""
     try:
-        return {
-            "chatbot": {
-                "total_conversations": await chatbot_service.get_total_conversations(),
-                "average_response_time": await chatbot_service.get_average_response_time(),
-                "satisfaction_score": await chatbot_service.get_satisfaction_score()
-            },
-            "pricing": {
-                "total_suggestions": await pricing_service.get_total_suggestions(),
-                "average_accuracy": await pricing_service.get_average_accuracy(),
-                "revenue_impact": await pricing_service.get_revenue_impact()
-            },
-            "fraud_detection": {
-                "total_analyses": await fraud_detection_service.get_total_analyses(),
-                "detection_rate": await fraud_detection_service.get_detection_rate(),
-                "false_positive_rate": await fraud_detection_service.get_false_positive_rate()
-            },
-            "recommendations": {
-                "total_recommendations": await recommendation_service.get_total_recommendations(),
-                "conversion_rate": await recommendation_service.get_conversion_rate(),
-                "average_rating": await recommendation_service.get_average_rating()
-            }
-        }
+        return await metrics_aggregator.get_summary()
         
     except Exception as e:
         logger.error(f"Error in analytics endpoint: {str(e)}")
@@ -330,6 +460,9 @@ async def update_models():
         await recommendation_service.update_model()
         await content_moderation_service.update_model()
         
+        # Pool workers hold copies of the models; restart them on the new ones
+        await asyncio.to_thread(cpu_executor.reload)
+        
         return {
             "message": "All models updated successfully",
             "timestamp": datetime.utcnow().isoformat()
@@ -343,13 +476,7 @@ async def update_models():
 async def get_model_status():
     """Get status of all AI models"""
     try:
-        return {
-            "chatbot": await chatbot_service.get_model_status(),
-            "pricing": await pricing_service.get_model_status(),
-            "fraud_detection": await fraud_detection_service.get_model_status(),
-            "recommendations": await recommendation_service.get_model_status(),
-            "content_moderation": await content_moderation_service.get_model_status()
-        }
+        return await metrics_aggregator.get_model_status()
         
     except Exception as e:
         logger.error(f"Error getting model status: {str(e)}")
@@ -360,6 +487,8 @@ if __name__ == "__main__":
         "app:app",
         host="0.0.0.0",
         port=8001,
-        reload=True,
+        loop="uvloop",
+        http="httptools",
+        reload=os.getenv("AI_SERVICES_RELOAD", "false").lower() == "true",
         log_level="info"
     ) 
\ No newline at end of file
@@ -0,0 +1,4 @@
+"""
+Benchmark Suite for GariPamoja AI Services
+Reproducible timings of service hot paths at configurable data scales
+"""
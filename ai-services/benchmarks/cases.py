@@ -0,0 +1,91 @@
+"""
+Benchmark cases for the ai-services hot paths
+
+Each case builds its service once per scale and returns a zero-argument callable
+(sync or async) that performs one operation.
+"""
+
+from typing import Callable, Dict, Optional
+
+from benchmarks import fixtures
+
+# name -> (setup(scale, redis_client) -> operation, max_scale, scaled)
+CASES: Dict[str, tuple] = {}
+
+BATCH_SIZE = 100
+
+
+def case(name: str, max_scale: Optional[int] = None, scaled: bool = True):
+    """Register a benchmark; unscaled cases run once at the smallest scale"""
+    def register(setup: Callable):
+        CASES[name] = (setup, max_scale, scaled)
+        return setup
+    return register
+
+
+@case("fraud.analyze_risk")
+def fraud_analyze_risk(scale: int, redis_client):
+    service = fixtures.build_fraud_service(scale, redis_client)
+    item = fixtures.make_transactions(1, scale)[0]
+    return lambda: service.analyze_risk(**item)
+
+
+@case("fraud.batch_analyze")
+def fraud_batch_analyze(scale: int, redis_client):
+    service = fixtures.build_fraud_service(scale, redis_client)
+    batch = fixtures.make_transactions(BATCH_SIZE, scale)
+    return lambda: service.batch_analyze(batch)
+
+
+@case("fraud.train")
+def fraud_train(scale: int, redis_client):
+    trainer = fixtures.build_fraud_trainer(scale, redis_client)
+    return trainer.train
+
+
+@case("pricing.suggest_price")
+def pricing_suggest_price(scale: int, redis_client):
+    service = fixtures.build_pricing_service(scale, redis_client)
+    return lambda: service.suggest_price(
+        car_id="car_1",
+        base_price=120.0,
+        location="kampala_central",
+        start_date="2024-07-12",
+        end_date="2024-07-15",
+        demand_factors={"event": "conference"}
+    )
+
+
+@case("recommendations.get_recommendations")
+def recommendations_get(scale: int, redis_client):
+    service = fixtures.build_recommendation_service(scale, redis_client)
+    return lambda: service.get_recommendations(user_id=f"user_{scale // 2}", budget=180.0)
+
+
+@case("recommendations.rank_cars", max_scale=100000)
+def recommendations_rank(scale: int, redis_client):
+    service = fixtures.build_recommendation_service(scale, redis_client)
+    cars = fixtures.make_cars(scale)
+    return lambda: service.rank_cars(f"user_{scale // 2}", None, cars)
+
+
+@case("recommendations.get_similar_cars")
+def recommendations_similar(scale: int, redis_client):
+    service = fixtures.build_recommendation_service(scale, redis_client)
+    return lambda: service.get_similar_cars("car_1", limit=5)
+
+
+@case("moderation.check_content", scaled=False)
+def moderation_check(scale: int, redis_client):
+    service = fixtures.build_moderation_service(scale, redis_client)
+    content = (
+        "Clean Toyota RAV4, great for trips to Jinja. Pick-up near Kampala Road, "
+        "flexible hours. Contact me through the app for details!"
+    )
+    return lambda: service.check_content(content, "listing", "user_1")
+
+
+@case("chatbot.check_faq", scaled=False)
+def chatbot_check_faq(scale: int, redis_client):
+    service = fixtures.build_chatbot_faq(scale, redis_client)
+    return lambda: service.check_faq("How do I cancel my booking?", "en")
@@ -0,0 +1,201 @@
+"""
+Benchmark runner for GariPamoja AI Services
+
+Usage (from ai-services/):
+    python -m benchmarks.run --scales 1000,100000 --output bench.json
+    python -m benchmarks.run --baseline main.json --max-regression 0.15
+
+Results are written as JSON keyed "case[scale]"; with --baseline, medians are
+compared and the process exits non-zero when any case regresses past the limit.
+"""
+
+import os
+import sys
+import json
+import time
+import fnmatch
+import asyncio
+import inspect
+import logging
+import argparse
+import platform
+import statistics
+import subprocess
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.cases import CASES
+from benchmarks.fixtures import make_redis
+
+logger = logging.getLogger("benchmarks")
+
+DEFAULT_SCALES = "1000,10000,100000"
+
+
+def time_operation(
+    loop: asyncio.AbstractEventLoop,
+    operation: Callable,
+    warmup: int,
+    min_time: float,
+    min_iterations: int,
+    max_iterations: int
+) -> List[float]:
+    """Wall-clock samples for one operation, sync or async"""
+    def call():
+        result = operation()
+        if inspect.isawaitable(result):
+            loop.run_until_complete(result)
+
+    for _ in range(warmup):
+        call()
+
+    samples = []
+    deadline = time.perf_counter() + min_time
+    while len(samples) < max_iterations and (len(samples) < min_iterations or time.perf_counter() < deadline):
+        started = time.perf_counter()
+        call()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def summarize(samples: List[float]) -> Dict[str, Any]:
+    ordered = sorted(samples)
+    mean = statistics.fmean(ordered)
+    return {
+        "iterations": len(ordered),
+        "mean": mean,
+        "median": statistics.median(ordered),
+        "p95": ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)],
+        "min": ordered[0],
+        "max": ordered[-1],
+        "stdev": statistics.stdev(ordered) if len(ordered) > 1 else 0.0,
+        "ops_per_sec": 1.0 / mean if mean else 0.0
+    }
+
+
+def environment() -> Dict[str, Any]:
+    """Enough context to tell whether two result files are comparable"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        commit = None
+
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count()
+    }
+
+
+def run(args) -> Dict[str, Any]:
+    scales = sorted(int(scale) for scale in args.scales.split(","))
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    # Measure the computation rather than the result cache unless asked to
+    from services.cache import tiered_cache
+
+    tiered_cache.enabled = args.with_cache
+    if args.with_cache:
+        tiered_cache.redis_client = tiered_cache.singleflight.redis_client = make_redis(args.redis_url)
+
+    results: Dict[str, Any] = {}
+    for name, (setup, max_scale, scaled) in CASES.items():
+        if args.cases and not any(fnmatch.fnmatch(name, pattern) for pattern in args.cases):
+            continue
+
+        for scale in (scales if scaled else scales[:1]):
+            key = f"{name}[{scale}]"
+            if max_scale and scale > max_scale:
+                results[key] = {"skipped": f"scale above {max_scale}"}
+                continue
+
+            try:
+                setup_started = time.perf_counter()
+                operation = setup(scale, make_redis(args.redis_url))
+                setup_seconds = time.perf_counter() - setup_started
+
+                samples = time_operation(
+                    loop, operation, args.warmup, args.min_time, args.min_iterations, args.max_iterations
+                )
+                results[key] = {**summarize(samples), "setup_seconds": setup_seconds}
+                logger.info(f"{key}: median {results[key]['median'] * 1000:.3f} ms over {len(samples)} runs")
+            except Exception as e:
+                logger.error(f"{key} failed: {str(e)}")
+                results[key] = {"error": str(e)}
+
+    loop.close()
+    return {"environment": environment(), "scales": scales, "results": results}
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> List[str]:
+    """Print a median comparison table; returns the keys that regressed"""
+    regressions = []
+    print(f"{'benchmark':<50} {'baseline ms':>12} {'current ms':>12} {'change':>9}")
+    for key, result in current["results"].items():
+        previous = baseline.get("results", {}).get(key, {})
+        if "median" not in result or "median" not in previous:
+            continue
+
+        change = result["median"] / previous["median"] - 1.0 if previous["median"] else 0.0
+        flag = ""
+        if change > max_regression:
+            regressions.append(key)
+            flag = "  REGRESSION"
+        print(
+            f"{key:<50} {previous['median'] * 1000:>12.3f} {result['median'] * 1000:>12.3f} "
+            f"{change:>+8.1%}{flag}"
+        )
+    return regressions
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark ai-services hot paths")
+    parser.add_argument("--scales", default=os.getenv("BENCH_SCALES", DEFAULT_SCALES),
+                        help="Comma-separated data sizes (cars/users/transactions), e.g. 1000,1000000")
+    parser.add_argument("--cases", nargs="*", help="Glob patterns of case names to run, e.g. 'fraud.*'")
+    parser.add_argument("--redis-url", default=os.getenv("BENCH_REDIS_URL"),
+                        help="Use a real (flushed!) Redis instead of fakeredis")
+    parser.add_argument("--with-cache", action="store_true", help="Keep the L1/L2 result cache enabled")
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--min-time", type=float, default=1.0, help="Seconds to sample each case")
+    parser.add_argument("--min-iterations", type=int, default=5)
+    parser.add_argument("--max-iterations", type=int, default=10000)
+    parser.add_argument("--output", help="Write results JSON here")
+    parser.add_argument("--baseline", help="Results JSON to compare medians against")
+    parser.add_argument("--max-regression", type=float, default=0.15,
+                        help="Allowed median slowdown vs baseline (0.15 = 15%%)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(level=logging.INFO)
+    # Service loggers are chatty at INFO; keep the runner's own progress only
+    logging.getLogger("services").setLevel(logging.WARNING)
+    args = parse_args(argv)
+
+    report = run(args)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.max_regression)
+        if regressions:
+            logger.error(f"{len(regressions)} benchmark(s) regressed more than {args.max_regression:.0%}")
+            return 1
+
+    if any("error" in result for result in report["results"].values()):
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,4 @@
+"""
+HTTP Load Testing for GariPamoja AI Services
+Replays weighted traffic mixes against app.py with stubbed LLM providers and Redis
+"""
@@ -0,0 +1,233 @@
+"""
+Open-loop asyncio/httpx load driver for ai-services
+
+Requests are launched on a Poisson schedule at each target rate regardless of
+how fast responses come back, so queueing shows up as latency instead of
+silently lowering the offered load. Each --rates entry is a separate stage.
+
+Usage (from ai-services/, with loadtest.llm_stub and loadtest.serve running):
+    python -m loadtest.driver --mix default --rates 20,40,80 --duration 60
+    python -m loadtest.driver --mix chat_heavy --rates 30 --baseline loadtest/reports/previous.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import platform
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from loadtest.scenarios import MIXES, TrafficMix
+
+logger = logging.getLogger("loadtest")
+
+REPORT_DIR = os.path.join(os.path.dirname(__file__), "reports")
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class EndpointStats:
+    """Latency samples and outcomes for one endpoint within a stage"""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.status_counts: Dict[str, int] = {}
+        self.errors = 0
+
+    def record(self, latency: float, status: str, failed: bool):
+        self.latencies.append(latency)
+        self.status_counts[status] = self.status_counts.get(status, 0) + 1
+        if failed:
+            self.errors += 1
+
+    def summary(self, duration: float) -> Dict[str, Any]:
+        ordered = sorted(self.latencies)
+        count = len(ordered)
+        return {
+            "requests": count,
+            "throughput_rps": round(count / duration, 3) if duration else 0.0,
+            "error_rate": round(self.errors / count, 4) if count else 0.0,
+            "p50_ms": round(percentile(ordered, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(ordered, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(ordered, 0.99) * 1000, 2),
+            "mean_ms": round(sum(ordered) / count * 1000, 2) if count else 0.0,
+            "max_ms": round(ordered[-1] * 1000, 2) if count else 0.0,
+            "status_counts": self.status_counts
+        }
+
+
+async def send(client: httpx.AsyncClient, method: str, path: str, body: Optional[Dict[str, Any]]) -> tuple:
+    """(status label, failed) for one request"""
+    try:
+        response = await client.request(method, path, json=body)
+        return str(response.status_code), response.status_code >= 500 or response.status_code == 429
+    except httpx.TimeoutException:
+        return "timeout", True
+    except httpx.HTTPError as e:
+        return type(e).__name__, True
+
+
+async def run_stage(
+    client: httpx.AsyncClient,
+    mix: TrafficMix,
+    rate: float,
+    duration: float,
+    concurrency: int
+) -> Dict[str, Any]:
+    """Offer `rate` requests/second for `duration` seconds"""
+    stats: Dict[str, EndpointStats] = {label: EndpointStats() for label in mix.labels}
+    overall = EndpointStats()
+    in_flight = set()
+    dropped = 0
+
+    async def one_request():
+        label, method, path, body = mix.next_request()
+        started = time.perf_counter()
+        status, failed = await send(client, method, path, body)
+        latency = time.perf_counter() - started
+        stats[label].record(latency, status, failed)
+        overall.record(latency, status, failed)
+
+    started = time.perf_counter()
+    next_at = started
+    while next_at - started < duration:
+        await asyncio.sleep(max(next_at - time.perf_counter(), 0))
+        if len(in_flight) >= concurrency:
+            # Client-side saturation: count it rather than silently slowing the schedule
+            dropped += 1
+        else:
+            task = asyncio.create_task(one_request())
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        next_at += random.expovariate(rate)
+
+    if in_flight:
+        await asyncio.wait(in_flight)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "target_rps": rate,
+        "duration_seconds": round(elapsed, 2),
+        "achieved_rps": round(len(overall.latencies) / elapsed, 3) if elapsed else 0.0,
+        "dropped": dropped,
+        "overall": overall.summary(elapsed),
+        "endpoints": {label: endpoint.summary(elapsed) for label, endpoint in stats.items() if endpoint.latencies}
+    }
+
+
+async def run(args) -> Dict[str, Any]:
+    mix = TrafficMix(MIXES[args.mix])
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    stages = []
+
+    async with httpx.AsyncClient(base_url=args.target, timeout=args.timeout, limits=limits) as client:
+        for rate in [float(rate) for rate in args.rates.split(",")]:
+            logger.info(f"Stage {rate} rps for {args.duration}s ({args.mix} mix)")
+            stage = await run_stage(client, mix, rate, args.duration, args.concurrency)
+            overall = stage["overall"]
+            logger.info(
+                f"  achieved {stage['achieved_rps']} rps, p50 {overall['p50_ms']} ms, "
+                f"p95 {overall['p95_ms']} ms, p99 {overall['p99_ms']} ms, errors {overall['error_rate']:.2%}"
+            )
+            stages.append(stage)
+            if args.pause:
+                await asyncio.sleep(args.pause)
+
+    return {
+        "environment": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "target": args.target,
+            "python": platform.python_version(),
+            "platform": platform.platform()
+        },
+        "config": {
+            "mix": args.mix,
+            "rates": args.rates,
+            "duration": args.duration,
+            "concurrency": args.concurrency,
+            "timeout": args.timeout
+        },
+        "stages": stages
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], max_p95_regression: float) -> List[str]:
+    """Print p95/error deltas per stage and endpoint; returns regressed entries"""
+    previous_stages = {stage["target_rps"]: stage for stage in baseline.get("stages", [])}
+    regressions = []
+
+    print(f"{'stage/endpoint':<36} {'p95 base':>10} {'p95 now':>10} {'change':>9} {'err base':>9} {'err now':>9}")
+    for stage in report["stages"]:
+        previous = previous_stages.get(stage["target_rps"])
+        if not previous:
+            continue
+        rows = [("overall", stage["overall"], previous["overall"])]
+        rows += [
+            (label, summary, previous["endpoints"][label])
+            for label, summary in stage["endpoints"].items()
+            if label in previous["endpoints"]
+        ]
+        for label, now, before in rows:
+            change = now["p95_ms"] / before["p95_ms"] - 1.0 if before["p95_ms"] else 0.0
+            name = f"{stage['target_rps']:g}rps/{label}"
+            flag = ""
+            if change > max_p95_regression:
+                regressions.append(name)
+                flag = "  REGRESSION"
+            print(
+                f"{name:<36} {before['p95_ms']:>10.1f} {now['p95_ms']:>10.1f} {change:>+8.1%} "
+                f"{before['error_rate']:>9.2%} {now['error_rate']:>9.2%}{flag}"
+            )
+    return regressions
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Load test ai-services with a weighted traffic mix")
+    parser.add_argument("--target", default=os.getenv("LOADTEST_TARGET", "http://127.0.0.1:8001"))
+    parser.add_argument("--mix", default="default", choices=sorted(MIXES))
+    parser.add_argument("--rates", default="10,20,40", help="Comma-separated offered loads (requests/second)")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds per stage")
+    parser.add_argument("--pause", type=float, default=5, help="Seconds between stages")
+    parser.add_argument("--concurrency", type=int, default=500, help="Max in-flight requests before dropping")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--output", help=f"Report path (default: {REPORT_DIR}/<mix>-<timestamp>.json)")
+    parser.add_argument("--baseline", help="Earlier report to compare p95 and error rates against")
+    parser.add_argument("--max-p95-regression", type=float, default=0.2)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    args = parse_args(argv)
+
+    report = asyncio.run(run(args))
+
+    output = args.output or os.path.join(
+        REPORT_DIR, f"{args.mix}-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Report written to {output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.max_p95_regression):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+"""
+Local stand-in for the OpenAI and Anthropic APIs
+
+Serves chat completions, embeddings and messages with lognormal latency and
+injected errors so load tests exercise the gateway's deadlines, retries and
+hedging without paying for (or being rate limited by) real providers.
+
+Usage (from ai-services/):
+    python -m loadtest.llm_stub --port 8090 --openai-median-ms 900 --anthropic-median-ms 1200
+"""
+
+import math
+import time
+import uuid
+import random
+import asyncio
+import hashlib
+import argparse
+from typing import Any, List
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+EMBEDDING_DIMENSIONS = 1536
+
+STUB_REPLY = (
+    "Thanks for reaching out to GariPamoja. You can book a car by searching for "
+    "available vehicles, choosing your dates and completing payment in the app."
+)
+
+
+class LatencyProfile:
+    """Lognormal latency (median, sigma) plus error and rate-limit injection"""
+
+    def __init__(self, median_ms: float, sigma: float, error_rate: float, rate_limit_rate: float):
+        self.median = median_ms / 1000.0
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+
+    async def wait(self):
+        await asyncio.sleep(self.median * math.exp(self.sigma * random.gauss(0.0, 1.0)))
+
+    def failure(self):
+        """Status code to fail with, or None"""
+        roll = random.random()
+        if roll < self.rate_limit_rate:
+            return 429
+        if roll < self.rate_limit_rate + self.error_rate:
+            return 500
+        return None
+
+
+def create_app(openai_profile: LatencyProfile, anthropic_profile: LatencyProfile) -> FastAPI:
+    app = FastAPI(title="LLM provider stub")
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        await openai_profile.wait()
+        status = openai_profile.failure()
+        if status:
+            return JSONResponse(
+                status_code=status,
+                content={"error": {"message": "Injected failure", "type": "server_error", "code": status}}
+            )
+
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in body.get("messages", [])) // 4
+        completion_tokens = len(STUB_REPLY) // 4
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": STUB_REPLY},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        }
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        inputs = body.get("input", [])
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+
+        return {
+            "object": "list",
+            "model": body.get("model", "stub"),
+            "data": [
+                {"object": "embedding", "index": index, "embedding": embed(item)}
+                for index, item in enumerate(inputs)
+            ],
+            "usage": {"prompt_tokens": 0, "total_tokens": 0}
+        }
+
+    @app.post("/v1/messages")
+    async def messages(request: Request):
+        body = await request.json()
+        await anthropic_profile.wait()
+        status = anthropic_profile.failure()
+        if status:
+            return JSONResponse(
+                status_code=status,
+                content={"type": "error", "error": {"type": "api_error", "message": "Injected failure"}}
+            )
+
+        return {
+            "id": f"msg_{uuid.uuid4().hex}",
+            "type": "message",
+            "role": "assistant",
+            "model": body.get("model", "stub"),
+            "content": [{"type": "text", "text": STUB_REPLY}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": {"input_tokens": 0, "output_tokens": len(STUB_REPLY) // 4}
+        }
+
+    return app
+
+
+def embed(item: Any) -> List[float]:
+    """Deterministic unit vector so identical text retrieves identical neighbours"""
+    seed = int(hashlib.md5(str(item).encode()).hexdigest()[:8], 16)
+    rng = random.Random(seed)
+    vector = [rng.gauss(0.0, 1.0) for _ in range(EMBEDDING_DIMENSIONS)]
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="OpenAI/Anthropic API stub for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--openai-median-ms", type=float, default=900)
+    parser.add_argument("--anthropic-median-ms", type=float, default=1200)
+    parser.add_argument("--sigma", type=float, default=0.5, help="Lognormal spread; 0.5 gives p99 ~3x median")
+    parser.add_argument("--error-rate", type=float, default=0.01)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    app = create_app(
+        LatencyProfile(args.openai_median_ms, args.sigma, args.error_rate, args.rate_limit_rate),
+        LatencyProfile(args.anthropic_median_ms, args.sigma, args.error_rate, args.rate_limit_rate)
+    )
+    uvicorn.run(app, host=args.host, port=args.port, loop="uvloop", http="httptools", log_level="warning")
@@ -0,0 +1,123 @@
+"""
+Traffic mixes for load tests
+
+A mix maps an endpoint label to (weight, method, path, body factory). Weights are
+relative; bodies are drawn from small pools so caches see realistic repeat rates.
+"""
+
+import random
+from datetime import date, timedelta
+from typing import Any, Dict, Optional
+
+LOCATIONS = ["kampala_central", "entebbe", "jinja", "other"]
+USERS = [f"user_{i}" for i in range(5000)]
+CARS = [f"car_{i}" for i in range(2000)]
+
+CHAT_MESSAGES = [
+    "How do I book a car?",
+    "What is your cancellation policy?",
+    "Can I pay with mobile money?",
+    "Is insurance included in the price?",
+    "My host has not confirmed my booking yet, what should I do?",
+    "Can I take the car from Kampala to Nairobi?",
+    "The car I rented has a flat tyre, who do I call?",
+    "How long does verification take?"
+]
+
+LISTINGS = [
+    "Well maintained Toyota Premio, automatic, AC, perfect for city trips.",
+    "Spacious 7-seater Noah for family safaris. Driver available on request.",
+    "BEST PRICE!!! CALL NOW!!! WhatsApp me directly to avoid fees!!!",
+    "Land Cruiser Prado, 4x4, ideal for upcountry roads. Pick up in Ntinda."
+]
+
+
+def trip_dates() -> Dict[str, str]:
+    start = date.today() + timedelta(days=random.randint(1, 60))
+    return {
+        "start_date": start.isoformat(),
+        "end_date": (start + timedelta(days=random.randint(1, 10))).isoformat()
+    }
+
+
+def chat_body() -> Dict[str, Any]:
+    return {"user_id": random.choice(USERS), "message": random.choice(CHAT_MESSAGES), "language": "en"}
+
+
+def pricing_body() -> Dict[str, Any]:
+    return {
+        "car_id": random.choice(CARS),
+        "base_price": round(random.uniform(40, 250), 2),
+        "location": random.choice(LOCATIONS),
+        **trip_dates()
+    }
+
+
+def fraud_body() -> Dict[str, Any]:
+    return {
+        "user_id": random.choice(USERS),
+        "transaction_data": {
+            "amount": round(random.uniform(50, 1500), 2),
+            "payment_method": random.choice(["card", "mobile_money", "bank_transfer"])
+        },
+        "user_behavior": {
+            "cancellation_rate": round(random.uniform(0, 0.5), 2),
+            "verification_score": round(random.uniform(0.3, 1.0), 2)
+        }
+    }
+
+
+def recommendations_body() -> Dict[str, Any]:
+    return {
+        "user_id": random.choice(USERS),
+        "location": random.choice(LOCATIONS[:3]),
+        "budget": random.choice([None, 80.0, 120.0, 200.0])
+    }
+
+
+def moderation_body() -> Dict[str, Any]:
+    return {"content": random.choice(LISTINGS), "content_type": "listing", "user_id": random.choice(USERS)}
+
+
+Endpoint = tuple  # (weight, method, path, body factory or None)
+
+MIXES: Dict[str, Dict[str, Endpoint]] = {
+    # Production-like: browse-heavy with a steady share of LLM chat
+    "default": {
+        "pricing_suggest": (25, "POST", "/pricing/suggest", pricing_body),
+        "recommendations": (25, "POST", "/recommendations", recommendations_body),
+        "chat": (15, "POST", "/chat", chat_body),
+        "fraud_detect": (15, "POST", "/fraud/detect", fraud_body),
+        "moderation_check": (15, "POST", "/moderation/check", moderation_body),
+        "analytics_summary": (3, "GET", "/analytics/summary", None),
+        "health": (2, "GET", "/health", None)
+    },
+    # Support surge: LLM-bound traffic dominates
+    "chat_heavy": {
+        "chat": (70, "POST", "/chat", chat_body),
+        "recommendations": (15, "POST", "/recommendations", recommendations_body),
+        "pricing_suggest": (15, "POST", "/pricing/suggest", pricing_body)
+    },
+    # Model endpoints only, to size CPU
+    "cpu_only": {
+        "pricing_suggest": (35, "POST", "/pricing/suggest", pricing_body),
+        "recommendations": (35, "POST", "/recommendations", recommendations_body),
+        "fraud_detect": (30, "POST", "/fraud/detect", fraud_body)
+    }
+}
+
+
+class TrafficMix:
+    """Weighted endpoint picker"""
+
+    def __init__(self, endpoints: Dict[str, Endpoint]):
+        self.endpoints = endpoints
+        self.labels = list(endpoints)
+        self.weights = [endpoints[label][0] for label in self.labels]
+
+    def next_request(self) -> tuple:
+        """(label, method, path, json body or None)"""
+        label = random.choices(self.labels, weights=self.weights)[0]
+        _, method, path, body_factory = self.endpoints[label]
+        body: Optional[Dict[str, Any]] = body_factory() if body_factory else None
+        return label, method, path, body
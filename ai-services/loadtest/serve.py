@@ -0,0 +1,54 @@
+"""
+Run app.py for load tests: providers point at the local LLM stub, Redis at fakeredis
+
+Usage (from ai-services/):
+    python -m loadtest.serve --port 8001 --llm-stub http://127.0.0.1:8090
+    python -m loadtest.serve --redis-url redis://localhost:6379/15   # real Redis instead
+"""
+
+import os
+import argparse
+
+import uvicorn
+
+
+def use_fake_redis():
+    """Route every redis.Redis.from_url() in the app to one shared in-memory server"""
+    import redis
+    import fakeredis
+
+    server = fakeredis.FakeServer()
+
+    def from_url(cls, url, **kwargs):
+        return fakeredis.FakeRedis(server=server, **kwargs)
+
+    redis.Redis.from_url = classmethod(from_url)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Serve ai-services against local stubs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--llm-stub", default="http://127.0.0.1:8090", help="Base URL of loadtest.llm_stub")
+    parser.add_argument("--redis-url", help="Use this Redis instead of fakeredis")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    # Must be set before app.py builds its clients
+    os.environ["OPENAI_BASE_URL"] = f"{args.llm_stub}/v1"
+    os.environ["OPENAI_API_BASE"] = f"{args.llm_stub}/v1"  # langchain embeddings
+    os.environ["ANTHROPIC_BASE_URL"] = args.llm_stub
+    os.environ.setdefault("OPENAI_API_KEY", "stub-key")
+    os.environ.setdefault("ANTHROPIC_API_KEY", "stub-key")
+
+    if args.redis_url:
+        os.environ["REDIS_URL"] = args.redis_url
+    else:
+        use_fake_redis()
+
+    from app import app
+
+    uvicorn.run(app, host=args.host, port=args.port, loop="uvloop", http="httptools", log_level="warning")
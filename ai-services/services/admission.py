@@ -0,0 +1,243 @@
+"""
+Admission Control for GariPamoja AI Services
+Redis token-bucket rate limits plus a priority-aware concurrency limiter that
+reserves capacity for payment-path fraud checks and sheds load past a queueing deadline
+"""
+
+import os
+import time
+import heapq
+import asyncio
+import itertools
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Request
+
+from services.metrics import ADMISSION_IN_FLIGHT, ADMISSION_SHED, ADMISSION_WAIT
+
+logger = logging.getLogger(__name__)
+
+# Highest first; lower classes can never use capacity reserved for higher ones
+PRIORITIES = ("critical", "high", "normal", "low")
+
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+
+local state = redis.call("HMGET", KEYS[1], "tokens", "ts")
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = (cost - tokens) / rate
+end
+
+redis.call("HSET", KEYS[1], "tokens", tokens, "ts", now)
+redis.call("PEXPIRE", KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return {allowed, tostring(retry_after)}
+"""
+
+
+class EndpointPolicy:
+    """Priority class and (rate/s, burst) limits for one operation"""
+
+    def __init__(
+        self,
+        priority: str,
+        user_limit: Optional[Tuple[float, float]] = None,
+        endpoint_limit: Optional[Tuple[float, float]] = None
+    ):
+        self.priority = priority
+        self.user_limit = user_limit
+        self.endpoint_limit = endpoint_limit
+
+
+POLICIES: Dict[str, EndpointPolicy] = {
+    # Payment path: highest priority, generous per-user limit, no global cap
+    "fraud_detect": EndpointPolicy("critical", user_limit=(20, 40)),
+    "pricing_suggest": EndpointPolicy("high", user_limit=(5, 20), endpoint_limit=(200, 400)),
+    "moderation_check": EndpointPolicy("high", user_limit=(5, 20), endpoint_limit=(200, 400)),
+    "recommendations": EndpointPolicy("normal", user_limit=(3, 10), endpoint_limit=(150, 300)),
+    "chat": EndpointPolicy("low", user_limit=(1, 5), endpoint_limit=(50, 100)),
+    "batch_process": EndpointPolicy("low", user_limit=(0.1, 3), endpoint_limit=(2, 10)),
+    "analytics": EndpointPolicy("low", endpoint_limit=(20, 40))
+}
+
+
+class Overloaded(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__("Overloaded")
+        self.retry_after = retry_after
+
+
+class TokenBucketLimiter:
+    """Redis-backed token buckets shared by every worker; fails open if Redis is down"""
+
+    def __init__(self, redis_client):
+        self.redis_client = redis_client
+        self.script = redis_client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    def consume(self, key: str, rate: float, burst: float, cost: float = 1.0) -> Tuple[bool, float]:
+        """(allowed, seconds until enough tokens)"""
+        try:
+            allowed, retry_after = self.script(
+                keys=[f"ratelimit:{key}"], args=[rate, burst, time.time(), cost]
+            )
+            return bool(int(allowed)), float(retry_after)
+        except Exception as e:
+            logger.error(f"Rate limiter unavailable: {str(e)}")
+            return True, 0.0
+
+
+class PriorityLimiter:
+    """Concurrency slots handed out by priority, with per-class reservations and queue deadlines"""
+
+    def __init__(self, capacity: int, reserved: Dict[str, int], max_wait: Dict[str, float]):
+        self.capacity = capacity
+        self.max_wait = max_wait
+        self.in_use = 0
+
+        # A class may use capacity minus everything reserved for classes above it
+        self.limits: Dict[str, int] = {}
+        held_back = 0
+        for priority in PRIORITIES:
+            self.limits[priority] = max(capacity - held_back, 1)
+            held_back += reserved.get(priority, 0)
+
+        self._waiters: List[tuple] = []
+        self._sequence = itertools.count()
+
+    async def acquire(self, priority: str):
+        rank = PRIORITIES.index(priority)
+        self._drop_cancelled()
+        if self.in_use < self.limits[priority] and (not self._waiters or self._waiters[0][0] > rank):
+            self.in_use += 1
+            ADMISSION_WAIT.labels(priority=priority).observe(0.0)
+            return
+
+        started = time.perf_counter()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (rank, next(self._sequence), future, priority))
+        try:
+            done, _ = await asyncio.wait({future}, timeout=self.max_wait[priority])
+        except asyncio.CancelledError:
+            # Client went away; hand back a slot granted in the meantime
+            if future.done() and not future.cancelled():
+                self.release()
+            future.cancel()
+            raise
+        ADMISSION_WAIT.labels(priority=priority).observe(time.perf_counter() - started)
+        if not done:
+            # Still queued past the deadline; it will be skipped when reached
+            future.cancel()
+            raise Overloaded(retry_after=self.max_wait[priority])
+
+    def release(self):
+        self.in_use -= 1
+        self._wake()
+
+    def _wake(self):
+        # The best waiter goes first; if it cannot fit, lower classes cannot either
+        while self._waiters:
+            rank, _, future, priority = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if self.in_use >= self.limits[priority]:
+                break
+            heapq.heappop(self._waiters)
+            self.in_use += 1
+            future.set_result(True)
+
+    def _drop_cancelled(self):
+        while self._waiters and self._waiters[0][2].done():
+            heapq.heappop(self._waiters)
+
+
+class AdmissionController:
+    """Rate limits then concurrency admission for each guarded operation"""
+
+    def __init__(self, redis_client):
+        self.rate_limiting = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+        self.admission = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+        self.buckets = TokenBucketLimiter(redis_client)
+
+        capacity = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "64"))
+        self.limiter = PriorityLimiter(
+            capacity,
+            reserved={
+                "critical": int(os.getenv("ADMISSION_RESERVED_CRITICAL", str(capacity // 4))),
+                "high": int(os.getenv("ADMISSION_RESERVED_HIGH", str(capacity // 8)))
+            },
+            max_wait={
+                "critical": float(os.getenv("ADMISSION_MAX_WAIT_CRITICAL_SECONDS", "2.0")),
+                "high": float(os.getenv("ADMISSION_MAX_WAIT_HIGH_SECONDS", "1.0")),
+                "normal": float(os.getenv("ADMISSION_MAX_WAIT_NORMAL_SECONDS", "0.5")),
+                "low": float(os.getenv("ADMISSION_MAX_WAIT_LOW_SECONDS", "0.25"))
+            }
+        )
+
+    def check_rate(self, operation: str, policy: EndpointPolicy, user_id: Optional[str]):
+        """Raise 429 when the user's or the endpoint's bucket is empty"""
+        checks = []
+        if policy.user_limit and user_id:
+            checks.append((f"user:{operation}:{user_id}", policy.user_limit, "user_rate"))
+        if policy.endpoint_limit:
+            checks.append((f"endpoint:{operation}", policy.endpoint_limit, "endpoint_rate"))
+
+        for key, (rate, burst), reason in checks:
+            allowed, retry_after = self.buckets.consume(key, rate, burst)
+            if not allowed:
+                ADMISSION_SHED.labels(priority=policy.priority, reason=reason).inc()
+                raise HTTPException(
+                    status_code=429,
+                    detail="Rate limit exceeded",
+                    headers={"Retry-After": str(max(int(retry_after + 0.999), 1))}
+                )
+
+    def guard(self, operation: str):
+        """FastAPI dependency: rate limit, then hold a priority slot for the request"""
+        policy = POLICIES[operation]
+
+        async def dependency(request: Request):
+            if self.rate_limiting:
+                user_id = None
+                if request.method == "POST":
+                    try:
+                        # FastAPI has already read the body; this is the cached copy
+                        user_id = (await request.json()).get("user_id")
+                    except Exception:
+                        user_id = None
+                self.check_rate(operation, policy, user_id)
+
+            if not self.admission:
+                yield
+                return
+
+            try:
+                await self.limiter.acquire(policy.priority)
+            except Overloaded as e:
+                ADMISSION_SHED.labels(priority=policy.priority, reason="queue_deadline").inc()
+                raise HTTPException(
+                    status_code=503,
+                    detail="Service overloaded, please retry",
+                    headers={"Retry-After": str(max(int(e.retry_after + 0.999), 1))}
+                )
+
+            ADMISSION_IN_FLIGHT.labels(priority=policy.priority).inc()
+            try:
+                yield
+            finally:
+                ADMISSION_IN_FLIGHT.labels(priority=policy.priority).dec()
+                self.limiter.release()
+
+        return dependency
@@ -0,0 +1,115 @@
+"""
+AI Service Metrics Aggregation for GariPamoja
+Gathers every service's analytics counters in one Redis round trip
+"""
+
+import time
+import asyncio
+import logging
+from typing import Dict, List, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+
+def parse_metric(raw: Optional[str], cast, default):
+    """Convert a raw Redis value, falling back to the metric's default"""
+    if raw is None:
+        return default
+    try:
+        return cast(raw)
+    except (TypeError, ValueError):
+        return default
+
+
+def read_metrics(redis_client, metrics: Dict[str, tuple]) -> Dict[str, Any]:
+    """Read a service's ANALYTICS_METRICS with a single MGET"""
+    fields = list(metrics)
+    try:
+        raw_values = redis_client.mget([metrics[field][0] for field in fields])
+    except Exception as e:
+        logger.error(f"Error reading metrics: {str(e)}")
+        raw_values = [None] * len(fields)
+
+    return {
+        field: parse_metric(raw, metrics[field][1], metrics[field][2])
+        for field, raw in zip(fields, raw_values)
+    }
+
+
+class MetricsAggregator:
+    """Single-pass analytics fan-out with a short-lived composed cache"""
+
+    def __init__(
+        self,
+        redis_client,
+        services: Dict[str, Any],
+        summary_sections: Optional[List[str]] = None,
+        cache_seconds: float = 5.0
+    ):
+        self.redis_client = redis_client
+        self.services = services
+        self.summary_sections = summary_sections or list(services)
+        self.cache_seconds = cache_seconds
+
+        self._cache: Dict[str, tuple] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def fetch_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Read every service's counters with one MGET"""
+        keys = []
+        layout = []
+        for name, service in self.services.items():
+            for field, spec in service.ANALYTICS_METRICS.items():
+                keys.append(spec[0])
+                layout.append((name, field, spec))
+
+        try:
+            raw_values = self.redis_client.mget(keys) if keys else []
+        except Exception as e:
+            logger.error(f"Error fetching analytics metrics: {str(e)}")
+            raw_values = [None] * len(keys)
+
+        metrics = {name: {} for name in self.services}
+        for (name, field, spec), raw in zip(layout, raw_values):
+            metrics[name][field] = parse_metric(raw, spec[1], spec[2])
+
+        # Services may report derived values (averages) instead of raw counters
+        for name, service in self.services.items():
+            if hasattr(service, "derive_metrics"):
+                metrics[name] = service.derive_metrics(metrics[name])
+        return metrics
+
+    async def get_summary(self) -> Dict[str, Any]:
+        """Analytics summary for dashboards"""
+        return await self.cached("summary", self.compose_summary)
+
+    async def get_model_status(self) -> Dict[str, Any]:
+        """Model status for every service"""
+        return await self.cached("model_status", self.compose_model_status)
+
+    def compose_summary(self) -> Dict[str, Any]:
+        metrics = self.fetch_metrics()
+        return {name: metrics[name] for name in self.summary_sections}
+
+    def compose_model_status(self) -> Dict[str, Any]:
+        metrics = self.fetch_metrics()
+        return {
+            name: service.build_model_status(metrics[name])
+            for name, service in self.services.items()
+        }
+
+    async def cached(self, key: str, compose) -> Dict[str, Any]:
+        """Serve from cache; one caller recomputes on expiry while others wait"""
+        entry = self._cache.get(key)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            entry = self._cache.get(key)
+            if entry and entry[0] > time.monotonic():
+                return entry[1]
+
+            value = compose()
+            self._cache[key] = (time.monotonic() + self.cache_seconds, value)
+            return value
@@ -0,0 +1,325 @@
+"""
+Tiered Caching for GariPamoja AI Services
+In-process LRU (L1) over Redis (L2) with versioned namespaces, negative caching,
+jittered TTLs, stale-while-revalidate and pub/sub invalidation across workers
+"""
+
+import os
+import time
+import random
+import asyncio
+import inspect
+import logging
+import threading
+import functools
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+import redis
+
+from services import serialization
+from services.metrics import CACHE_REQUESTS
+from services.singleflight import SingleFlight, request_key
+
+logger = logging.getLogger(__name__)
+
+
+class CacheEntry:
+    __slots__ = ("value", "fresh_until", "expires_at", "negative")
+
+    def __init__(self, value: Any, fresh_until: float, expires_at: float, negative: bool = False):
+        self.value = value
+        self.fresh_until = fresh_until
+        self.expires_at = expires_at
+        self.negative = negative
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.fresh_until
+
+
+class LRUCache:
+    """Bounded in-process tier; entries also expire by time"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[tuple, CacheEntry]" = OrderedDict()
+
+    def get(self, key: tuple) -> Optional[CacheEntry]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.time():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry
+
+    def set(self, key: tuple, entry: CacheEntry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def evict(self, namespace: str, digest: Optional[str] = None):
+        """Drop one key, or every key in a namespace"""
+        for key in [k for k in self.entries if k[0] == namespace and (digest is None or k[2] == digest)]:
+            del self.entries[key]
+
+
+class TieredCache:
+    """L1/L2 cache shared by every service in the process"""
+
+    CHANNEL = "ai_cache:invalidate"
+
+    def __init__(self, redis_client=None):
+        self.redis_client = redis_client or redis.Redis.from_url(
+            os.getenv("REDIS_URL", "redis://localhost:6379/1"),
+            decode_responses=True
+        )
+        self.enabled = os.getenv("AI_CACHE_ENABLED", "true").lower() == "true"
+        self.l1 = LRUCache(int(os.getenv("AI_CACHE_L1_MAX_ENTRIES", "10000")))
+        self.l1_ttl = float(os.getenv("AI_CACHE_L1_TTL_SECONDS", "30"))
+        self.jitter = float(os.getenv("AI_CACHE_TTL_JITTER", "0.1"))
+        self.version_refresh = float(os.getenv("AI_CACHE_VERSION_REFRESH_SECONDS", "30"))
+
+        # namespace -> (version, checked_at); pub/sub pushes changes, polling is the fallback
+        self.versions: Dict[str, tuple] = {}
+        self.singleflight = SingleFlight(self.redis_client)
+        # (namespace, digest) -> running stale refresh; also keeps the task referenced
+        self.refreshing: Dict[tuple, asyncio.Task] = {}
+
+        self._pubsub = None
+        self._listener: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    def jittered(self, ttl: float) -> float:
+        """Spread expiries so keys written together do not expire together"""
+        return ttl * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def version(self, namespace: str) -> int:
+        cached = self.versions.get(namespace)
+        if cached and time.monotonic() - cached[1] < self.version_refresh:
+            return cached[0]
+        try:
+            version = int(self.redis_client.get(f"cache_version:{namespace}") or 0)
+        except Exception as e:
+            logger.error(f"Error reading cache version for {namespace}: {str(e)}")
+            version = cached[0] if cached else 0
+        self.versions[namespace] = (version, time.monotonic())
+        return version
+
+    def redis_key(self, namespace: str, digest: str) -> str:
+        return f"cache:{namespace}:v{self.version(namespace)}:{digest}"
+
+    def lookup(self, namespace: str, digest: str) -> Optional[CacheEntry]:
+        """L1, then L2 (promoting into L1)"""
+        local_key = (namespace, self.version(namespace), digest)
+        entry = self.l1.get(local_key)
+        if entry is not None:
+            CACHE_REQUESTS.labels(cache=namespace, result="l1_hit").inc()
+            return entry
+
+        try:
+            raw = self.redis_client.get(self.redis_key(namespace, digest))
+        except Exception as e:
+            logger.error(f"Error reading cache {namespace}: {str(e)}")
+            raw = None
+        if raw is None:
+            CACHE_REQUESTS.labels(cache=namespace, result="miss").inc()
+            return None
+
+        stored = serialization.loads(raw)
+        entry = CacheEntry(stored["v"], stored["f"], stored["e"], stored.get("n", False))
+        self.l1.set(local_key, CacheEntry(
+            entry.value, entry.fresh_until, min(entry.expires_at, time.time() + self.l1_ttl), entry.negative
+        ))
+        CACHE_REQUESTS.labels(cache=namespace, result="l2_hit").inc()
+        return entry
+
+    def store(self, namespace: str, digest: str, value: Any, ttl: float, stale_ttl: float, negative: bool = False):
+        """Write both tiers; the value stays servable (stale) for stale_ttl after it goes stale"""
+        now = time.time()
+        fresh_until = now + self.jittered(ttl)
+        expires_at = fresh_until + stale_ttl
+        entry = CacheEntry(value, fresh_until, expires_at, negative)
+
+        self.l1.set((namespace, self.version(namespace), digest), CacheEntry(
+            value, fresh_until, min(expires_at, now + self.l1_ttl), negative
+        ))
+        try:
+            self.redis_client.set(
+                self.redis_key(namespace, digest),
+                serialization.dumps({"v": value, "f": fresh_until, "e": expires_at, "n": negative}),
+                px=max(int((expires_at - now) * 1000), 1)
+            )
+        except Exception as e:
+            logger.error(f"Error writing cache {namespace}: {str(e)}")
+        return entry
+
+    def delete(self, namespace: str, params: Any):
+        """Drop one entry everywhere"""
+        digest = request_key(namespace, params)
+        self.l1.evict(namespace, digest)
+        try:
+            self.redis_client.delete(self.redis_key(namespace, digest))
+            self.redis_client.publish(self.CHANNEL, serialization.dumps({"namespace": namespace, "digest": digest}))
+        except Exception as e:
+            logger.error(f"Error deleting cache entry in {namespace}: {str(e)}")
+
+    def invalidate_namespace(self, namespace: str):
+        """Bump the namespace version so every worker's old entries become unreachable"""
+        self.l1.evict(namespace)
+        try:
+            version = self.redis_client.incr(f"cache_version:{namespace}")
+            self.versions[namespace] = (version, time.monotonic())
+            self.redis_client.publish(self.CHANNEL, serialization.dumps({"namespace": namespace, "version": version}))
+        except Exception as e:
+            logger.error(f"Error invalidating cache namespace {namespace}: {str(e)}")
+
+    def apply_invalidation(self, data: str):
+        message = serialization.loads(data)
+        namespace = message["namespace"]
+        if "version" in message:
+            self.versions[namespace] = (int(message["version"]), time.monotonic())
+        self.l1.evict(namespace, message.get("digest"))
+
+    def start_listener(self):
+        """Subscribe to invalidation broadcasts; call from the running event loop"""
+        if self._listener is not None:
+            return
+        loop = asyncio.get_running_loop()
+        self._stopping.clear()
+        self._pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(self.CHANNEL)
+        self._listener = threading.Thread(target=self._listen, args=(loop,), name="cache-invalidation", daemon=True)
+        self._listener.start()
+
+    def stop_listener(self):
+        self._stopping.set()
+        if self._listener is not None:
+            self._listener.join(timeout=2)
+            self._listener = None
+        if self._pubsub is not None:
+            self._pubsub.close()
+            self._pubsub = None
+
+    def _listen(self, loop: asyncio.AbstractEventLoop):
+        # L1 is only touched on the loop thread; hand messages over rather than mutate here
+        while not self._stopping.is_set():
+            try:
+                message = self._pubsub.get_message(timeout=1.0)
+            except Exception as e:
+                logger.error(f"Cache invalidation listener error: {str(e)}")
+                time.sleep(1.0)
+                continue
+            if message and message.get("type") == "message":
+                loop.call_soon_threadsafe(self.apply_invalidation, message["data"])
+
+    async def get_or_compute(
+        self,
+        namespace: str,
+        params: Any,
+        compute: Callable,
+        ttl: float,
+        stale_ttl: float = 0.0,
+        negative_ttl: float = 0.0,
+        cacheable: Optional[Callable[[Any], bool]] = None,
+        is_negative: Optional[Callable[[Any], bool]] = None
+    ) -> Any:
+        """Serve fresh or stale-while-revalidate entries; misses are computed once per key"""
+        if not self.enabled:
+            return await compute()
+
+        digest = request_key(namespace, params)
+        entry = self.lookup(namespace, digest)
+        if entry is not None:
+            if not entry.fresh:
+                CACHE_REQUESTS.labels(cache=namespace, result="stale").inc()
+                if (namespace, digest) not in self.refreshing:
+                    task = asyncio.ensure_future(self.refresh(
+                        namespace, digest, compute, ttl, stale_ttl, negative_ttl, cacheable, is_negative, background=True
+                    ))
+                    self.refreshing[(namespace, digest)] = task
+                    task.add_done_callback(lambda _: self.refreshing.pop((namespace, digest), None))
+            return entry.value
+
+        return await self.refresh(namespace, digest, compute, ttl, stale_ttl, negative_ttl, cacheable, is_negative)
+
+    async def refresh(
+        self,
+        namespace: str,
+        digest: str,
+        compute: Callable,
+        ttl: float,
+        stale_ttl: float,
+        negative_ttl: float,
+        cacheable: Optional[Callable[[Any], bool]],
+        is_negative: Optional[Callable[[Any], bool]] = None,
+        background: bool = False
+    ) -> Any:
+        async def load():
+            value = await compute()
+            if value is None or (is_negative is not None and is_negative(value)):
+                # "Not found" answers are cached briefly so repeated lookups skip the work
+                if negative_ttl > 0:
+                    self.store(namespace, digest, value, negative_ttl, 0.0, negative=True)
+            elif cacheable is None or cacheable(value):
+                self.store(namespace, digest, value, ttl, stale_ttl)
+            return value
+
+        try:
+            return await self.singleflight.do(namespace, digest, load)
+        except Exception as e:
+            if not background:
+                raise
+            # The stale value was already served; try again on the next request
+            logger.error(f"Error refreshing stale {namespace} entry: {str(e)}")
+
+
+# Process-wide cache; services declare namespaces with @cached
+tiered_cache = TieredCache()
+
+
+def cached(
+    namespace: str,
+    ttl: float,
+    key: Optional[Callable[..., Any]] = None,
+    stale_ttl: float = 0.0,
+    negative_ttl: float = 0.0,
+    cacheable: Optional[Callable[[Any], bool]] = None,
+    is_negative: Optional[Callable[[Any], bool]] = None
+):
+    """Cache an async service method's result
+
+    key receives the method's arguments (without self) and returns the JSON-able
+    params that identify a result; by default all bound arguments are used.
+    Results failing `cacheable` (e.g. error fallbacks) are returned but not stored;
+    None, or results matching `is_negative`, are kept for negative_ttl only.
+    """
+    def decorate(method):
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            if key is not None:
+                params = key(*args, **kwargs)
+            else:
+                bound = signature.bind(self, *args, **kwargs)
+                bound.apply_defaults()
+                params = dict(list(bound.arguments.items())[1:])
+
+            return await tiered_cache.get_or_compute(
+                namespace,
+                params,
+                lambda: method(self, *args, **kwargs),
+                ttl,
+                stale_ttl=stale_ttl,
+                negative_ttl=negative_ttl,
+                cacheable=cacheable,
+                is_negative=is_negative
+            )
+
+        wrapper.cache_namespace = namespace
+        return wrapper
+    return decorate
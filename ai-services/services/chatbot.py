@@ -4,40 +4,39 @@ Provides intelligent customer support using LLMs and RAG
 """
 
 import os
-import json
+import time
+import asyncio
 import logging
 from typing import Dict, List, Optional, Any
 from datetime import datetime
-import openai
-import anthropic
-from langchain.chat_models import ChatOpenAI, ChatAnthropic
-from langchain.schema import HumanMessage, SystemMessage
 from langchain.vectorstores import Chroma
 from langchain.embeddings import OpenAIEmbeddings
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 import redis
 
+from services.llm_gateway import LLMGateway
+from services.context_builder import ContextBuilder
+from services.analytics import read_metrics
+from services.metrics import track_stage
+from services.cache import cached, tiered_cache
+from services import serialization
+
 logger = logging.getLogger(__name__)
 
 class ChatbotService:
     """AI-powered chatbot service for customer support"""
     
+    # Analytics counters: field -> (redis key, type, default)
+    ANALYTICS_METRICS = {
+        "total_conversations": ("chatbot_conversations_total", int, 0),
+        "response_time_total": ("chatbot_response_time_seconds_total", float, 0.0),
+        "ratings_total": ("chatbot_ratings_total", int, 0),
+        "ratings_count": ("chatbot_ratings_count", int, 0)
+    }
+    
     def __init__(self):
-        self.openai_client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        self.anthropic_client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
-        
-        # Initialize LLM models
-        self.chat_model = ChatOpenAI(
-            model="gpt-4",
-            temperature=0.7,
-            max_tokens=500
-        )
-        
-        self.anthropic_model = ChatAnthropic(
-            model="claude-3-sonnet-20240229",
-            temperature=0.7,
-            max_tokens=500
-        )
+        # Shared gateway for all LLM providers (pooling, deadlines, hedging)
+        self.llm_gateway = LLMGateway()
         
         # Initialize RAG components
         self.embeddings = OpenAIEmbeddings()
@@ -50,6 +49,17 @@ class ChatbotService:
             decode_responses=True
         )
         
+        # Token-budgeted prompt assembly with rolling summaries
+        self.context_builder = ContextBuilder(self.redis_client, self.llm_gateway)
+        
+        # Exchanges kept verbatim, and how many may pile up beyond that before
+        # the oldest are folded into the summary in one LLM call
+        self.history_window = int(os.getenv("CHAT_HISTORY_WINDOW", "10"))
+        self.fold_batch = int(os.getenv("CHAT_SUMMARY_FOLD_BATCH", "5"))
+        
+        # Running summary folds; the event loop only keeps weak references to tasks
+        self.background_tasks = set()
+        
         # System prompts for different languages
         self.system_prompts = {
             "en": """You are GariPamoja, an AI assistant for a peer-to-peer car sharing platform in East Africa. 
@@ -128,6 +138,14 @@ class ChatbotService:
             }
         }
     
+    @cached(
+        "chat",
+        ttl=300,
+        key=lambda user_id, message, context=None, language="en": {
+            "user_id": user_id, "message": message, "language": language
+        },
+        cacheable=lambda response: response.get("confidence", 0) > 0
+    )
     async def get_response(
         self,
         user_id: str,
@@ -136,13 +154,17 @@ class ChatbotService:
         language: str = "en"
     ) -> Dict[str, Any]:
         """Get AI response for user message"""
+        started = time.perf_counter()
         try:
             # Get conversation history
-            history = self.get_conversation_history(user_id)
+            with track_stage("chatbot", "redis"):
+                history = self.get_conversation_history(user_id)
             
             # Check if it's a FAQ question
-            faq_response = self.check_faq(message, language)
+            with track_stage("chatbot", "faq"):
+                faq_response = self.check_faq(message, language)
             if faq_response:
+                self.record_conversation(time.perf_counter() - started)
                 return {
                     "response": faq_response,
                     "confidence": 0.95,
@@ -151,22 +173,38 @@ class ChatbotService:
                 }
             
             # Get relevant context from RAG
-            relevant_context = self.get_relevant_context(message)
+            with track_stage("chatbot", "rag_retrieval"):
+                relevant_chunks = self.get_relevant_context(message)
             
-            # Build system prompt
+            # Pack system prompt, summary, knowledge and history within the token budget
             system_prompt = self.system_prompts.get(language, self.system_prompts["en"])
-            if relevant_context:
-                system_prompt += f"\n\nRelevant information: {relevant_context}"
+            with track_stage("chatbot", "redis"):
+                summary = self.context_builder.get_summary(user_id)
+            with track_stage("chatbot", "context_build"):
+                prompt_context = self.context_builder.build(
+                    system_prompt,
+                    message,
+                    history,
+                    retrieved_chunks=relevant_chunks,
+                    summary=summary
+                )
             
             # Generate response
-            if language == "sw":
-                response = await self.generate_swahili_response(message, system_prompt, history)
-            else:
-                response = await self.generate_english_response(message, system_prompt, history)
+            with track_stage("chatbot", "llm"):
+                if language == "sw":
+                    response = await self.generate_swahili_response(prompt_context)
+                else:
+                    response = await self.generate_english_response(prompt_context)
             
-            # Store conversation
-            self.store_conversation(user_id, message, response["response"])
+            # Store conversation, folding evicted exchanges into the summary
+            with track_stage("chatbot", "redis"):
+                evicted = self.store_conversation(user_id, message, response["response"])
+            if evicted:
+                task = asyncio.create_task(self.context_builder.fold_into_summary(user_id, evicted))
+                self.background_tasks.add(task)
+                task.add_done_callback(self.background_tasks.discard)
             
+            self.record_conversation(time.perf_counter() - started)
             return response
             
         except Exception as e:
@@ -178,25 +216,17 @@ class ChatbotService:
                 "follow_up_questions": []
             }
     
-    async def generate_english_response(
-        self,
-        message: str,
-        system_prompt: str,
-        history: List[Dict[str, str]]
-    ) -> Dict[str, Any]:
-        """Generate response using OpenAI GPT-4"""
+    async def generate_english_response(self, prompt_context: Dict[str, Any]) -> Dict[str, Any]:
+        """Generate response using OpenAI GPT-4, hedged to Claude"""
         try:
-            messages = [SystemMessage(content=system_prompt)]
-            
-            # Add conversation history
-            for entry in history[-5:]:  # Last 5 exchanges
-                messages.append(HumanMessage(content=entry["user"]))
-                messages.append(SystemMessage(content=entry["assistant"]))
-            
-            messages.append(HumanMessage(content=message))
-            
-            response = await self.chat_model.agenerate([messages])
-            response_text = response.generations[0][0].text
+            response = await self.llm_gateway.complete(
+                prompt_context["messages"],
+                system=prompt_context["system"],
+                primary="openai",
+                max_tokens=500,
+                temperature=0.7
+            )
+            response_text = response["text"]
             
             # Extract suggested actions and follow-up questions
             suggested_actions = self.extract_suggested_actions(response_text)
@@ -213,29 +243,18 @@ class ChatbotService:
             logger.error(f"Error generating English response: {str(e)}")
             raise
     
-    async def generate_swahili_response(
-        self,
-        message: str,
-        system_prompt: str,
-        history: List[Dict[str, str]]
-    ) -> Dict[str, Any]:
-        """Generate response using Anthropic Claude for Swahili"""
+    async def generate_swahili_response(self, prompt_context: Dict[str, Any]) -> Dict[str, Any]:
+        """Generate response using Anthropic Claude for Swahili, hedged to GPT-4"""
         try:
-            # Build conversation context
-            context = ""
-            for entry in history[-3:]:  # Last 3 exchanges
-                context += f"User: {entry['user']}\nAssistant: {entry['assistant']}\n"
-            
-            prompt = f"{system_prompt}\n\nConversation history:\n{context}\n\nUser: {message}\n\nAssistant:"
-            
-            response = await self.anthropic_client.messages.create(
-                model="claude-3-sonnet-20240229",
+            response = await self.llm_gateway.complete(
+                prompt_context["messages"],
+                system=prompt_context["system"],
+                primary="anthropic",
                 max_tokens=500,
-                temperature=0.7,
-                messages=[{"role": "user", "content": prompt}]
+                temperature=0.7
             )
             
-            response_text = response.content[0].text
+            response_text = response["text"]
             
             return {
                 "response": response_text,
@@ -269,20 +288,19 @@ class ChatbotService:
         
         return None
     
-    def get_relevant_context(self, message: str) -> str:
-        """Get relevant context from RAG knowledge base"""
+    def get_relevant_context(self, message: str) -> List[str]:
+        """Get relevant chunks from RAG knowledge base, best match first"""
         try:
             if not self.vector_store:
-                return ""
+                return []
             
             # Search for relevant documents
             docs = self.vector_store.similarity_search(message, k=3)
-            context = " ".join([doc.page_content for doc in docs])
-            return context
+            return [doc.page_content for doc in docs]
             
         except Exception as e:
             logger.error(f"Error getting relevant context: {str(e)}")
-            return ""
+            return []
     
     def get_conversation_history(self, user_id: str) -> List[Dict[str, str]]:
         """Get conversation history from Redis"""
@@ -291,15 +309,25 @@ class ChatbotService:
             history_data = self.redis_client.get(history_key)
             
             if history_data:
-                return json.loads(history_data)
+                return serialization.loads(history_data)
             return []
             
         except Exception as e:
             logger.error(f"Error getting conversation history: {str(e)}")
             return []
     
-    def store_conversation(self, user_id: str, user_message: str, assistant_response: str):
-        """Store conversation in Redis"""
+    def store_conversation(
+        self,
+        user_id: str,
+        user_message: str,
+        assistant_response: str
+    ) -> List[Dict[str, str]]:
+        """Store conversation in Redis, returning exchanges evicted from the window
+        
+        History grows to history_window + fold_batch exchanges, then drops back to
+        history_window; the evicted batch is summarized once instead of once per turn.
+        """
+        evicted = []
         try:
             history_key = f"chat_history:{user_id}"
             history = self.get_conversation_history(user_id)
@@ -311,19 +339,22 @@ class ChatbotService:
                 "timestamp": datetime.utcnow().isoformat()
             })
             
-            # Keep only last 10 exchanges
-            if len(history) > 10:
-                history = history[-10:]
+            # Evict a whole batch once the window has overflowed by fold_batch
+            if len(history) >= self.history_window + self.fold_batch:
+                evicted = history[:-self.history_window]
+                history = history[-self.history_window:]
             
             # Store in Redis with 24-hour expiry
             self.redis_client.setex(
                 history_key,
                 86400,  # 24 hours
-                json.dumps(history)
+                serialization.dumps(history)
             )
             
         except Exception as e:
             logger.error(f"Error storing conversation: {str(e)}")
+        
+        return evicted
     
     def extract_suggested_actions(self, response: str) -> List[str]:
         """Extract suggested actions from response"""
@@ -358,9 +389,8 @@ class ChatbotService:
     def is_healthy(self) -> bool:
         """Check if the service is healthy"""
         try:
-            # Test API connections
-            self.openai_client.models.list()
-            return True
+            # Healthy while at least one provider circuit is closed
+            return self.llm_gateway.is_healthy()
         except Exception as e:
             logger.error(f"Health check failed: {str(e)}")
             return False
@@ -368,8 +398,7 @@ class ChatbotService:
     async def get_total_conversations(self) -> int:
         """Get total number of conversations"""
         try:
-            # This would typically query a database
-            return 1000  # Placeholder
+            return int(self.redis_client.get("chatbot_conversations_total") or 0)
         except Exception as e:
             logger.error(f"Error getting total conversations: {str(e)}")
             return 0
@@ -377,8 +406,8 @@ class ChatbotService:
     async def get_average_response_time(self) -> float:
         """Get average response time in seconds"""
         try:
-            # This would typically calculate from metrics
-            return 2.5  # Placeholder
+            metrics = self.derive_metrics(read_metrics(self.redis_client, self.ANALYTICS_METRICS))
+            return metrics["average_response_time"]
         except Exception as e:
             logger.error(f"Error getting average response time: {str(e)}")
             return 0.0
@@ -386,29 +415,67 @@ class ChatbotService:
     async def get_satisfaction_score(self) -> float:
         """Get customer satisfaction score"""
         try:
-            # This would typically calculate from ratings
-            return 4.2  # Placeholder
+            metrics = self.derive_metrics(read_metrics(self.redis_client, self.ANALYTICS_METRICS))
+            return metrics["satisfaction_score"]
         except Exception as e:
             logger.error(f"Error getting satisfaction score: {str(e)}")
             return 0.0
     
+    def derive_metrics(self, metrics: Dict[str, Any]) -> Dict[str, Any]:
+        """Turn raw counters into the averages reported on dashboards"""
+        conversations = metrics["total_conversations"]
+        ratings_count = metrics["ratings_count"]
+        return {
+            "total_conversations": conversations,
+            "average_response_time": round(metrics["response_time_total"] / conversations, 3) if conversations else 0.0,
+            "satisfaction_score": round(metrics["ratings_total"] / ratings_count, 2) if ratings_count else 0.0
+        }
+    
+    def record_conversation(self, response_time: float):
+        """Count a served conversation turn and its response time"""
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.incr("chatbot_conversations_total")
+            pipe.incrbyfloat("chatbot_response_time_seconds_total", response_time)
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Error recording conversation: {str(e)}")
+    
+    def record_feedback(self, user_id: str, rating: int):
+        """Record a 1-5 satisfaction rating for a chatbot answer"""
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.incrby("chatbot_ratings_total", rating)
+            pipe.incr("chatbot_ratings_count")
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Error recording feedback for {user_id}: {str(e)}")
+    
     async def update_model(self):
         """Update the chatbot model with new data"""
         try:
             # This would typically retrain or fine-tune the model
+            tiered_cache.invalidate_namespace("chat")
             logger.info("Chatbot model updated successfully")
         except Exception as e:
             logger.error(f"Error updating chatbot model: {str(e)}")
     
     async def get_model_status(self) -> Dict[str, Any]:
         """Get model status information"""
+        return self.build_model_status(
+            self.derive_metrics(read_metrics(self.redis_client, self.ANALYTICS_METRICS))
+        )
+    
+    def build_model_status(self, metrics: Dict[str, Any]) -> Dict[str, Any]:
+        """Compose model status from pre-fetched analytics metrics"""
         return {
             "status": "active",
             "model": "gpt-4",
             "last_updated": datetime.utcnow().isoformat(),
+            "providers": self.llm_gateway.get_stats(),
             "performance": {
                 "accuracy": 0.85,
-                "response_time": 2.5,
-                "satisfaction": 4.2
+                "response_time": metrics["average_response_time"],
+                "satisfaction": metrics["satisfaction_score"]
             }
         } 
\ No newline at end of file
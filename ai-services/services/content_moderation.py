@@ -4,18 +4,29 @@ Provides content verification and moderation for listings and messages
 """
 
 import os
-import json
 import logging
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 import re
 import redis
 
+from services.analytics import read_metrics
+from services.metrics import track_stage
+from services.cache import cached, tiered_cache
+from services import serialization
+
 logger = logging.getLogger(__name__)
 
 class ContentModerationService:
     """AI-powered content moderation service"""
     
+    # Analytics counters: field -> (redis key, type, default)
+    ANALYTICS_METRICS = {
+        "total_moderations": ("content_moderations_total", int, 0),
+        "accuracy_rate": ("content_moderation_accuracy", float, 0.92),
+        "false_positive_rate": ("content_moderation_false_positive", float, 0.08)
+    }
+    
     def __init__(self):
         self.redis_client = redis.Redis.from_url(
             os.getenv("REDIS_URL", "redis://localhost:6379/1"),
@@ -66,48 +77,7 @@ class ContentModerationService:
     ) -> Dict[str, Any]:
         """Check content for appropriateness and compliance"""
         try:
-            # Basic content validation
-            validation_result = self.validate_content(content, content_type)
-            
-            # Check for prohibited content
-            prohibited_check = self.check_prohibited_content(content)
-            
-            # Check for suspicious patterns
-            pattern_check = self.check_suspicious_patterns(content)
-            
-            # Check for spam indicators
-            spam_check = self.check_spam_indicators(content, user_id)
-            
-            # Overall assessment
-            is_appropriate = (
-                validation_result['is_valid'] and
-                not prohibited_check['has_prohibited'] and
-                not pattern_check['has_suspicious'] and
-                not spam_check['is_spam']
-            )
-            
-            # Calculate confidence
-            confidence = self.calculate_confidence(
-                validation_result, prohibited_check, pattern_check, spam_check
-            )
-            
-            # Generate suggestions
-            suggestions = self.generate_suggestions(
-                validation_result, prohibited_check, pattern_check, spam_check
-            )
-            
-            # Store moderation result
-            self.store_moderation_result(user_id, content_type, is_appropriate, confidence)
-            
-            return {
-                "is_appropriate": is_appropriate,
-                "confidence": confidence,
-                "flagged_issues": self.get_flagged_issues(
-                    validation_result, prohibited_check, pattern_check, spam_check
-                ),
-                "suggestions": suggestions
-            }
-            
+            return await self.moderate_content(content, content_type, user_id)
         except Exception as e:
             logger.error(f"Error checking content: {str(e)}")
             return {
@@ -117,6 +87,67 @@ class ContentModerationService:
                 "suggestions": ["Manual review recommended"]
             }
     
+    async def moderate_content(
+        self,
+        content: str,
+        content_type: str,
+        user_id: str
+    ) -> Dict[str, Any]:
+        """Moderation verdict for one piece of content; raises when it cannot be computed"""
+        with track_stage("content_moderation", "rule_evaluation"):
+            checks = await self.classify_content(content, content_type)
+            validation_result = checks['validation']
+            prohibited_check = checks['prohibited']
+            pattern_check = checks['patterns']
+            
+            # The author's record changes with every call, so it is never cached
+            spam_check = self.add_user_spam_check(checks['spam'], user_id)
+        
+        # Overall assessment
+        is_appropriate = (
+            validation_result['is_valid'] and
+            not prohibited_check['has_prohibited'] and
+            not pattern_check['has_suspicious'] and
+            not spam_check['is_spam']
+        )
+        
+        # Calculate confidence
+        confidence = self.calculate_confidence(
+            validation_result, prohibited_check, pattern_check, spam_check
+        )
+        
+        # Generate suggestions
+        suggestions = self.generate_suggestions(
+            validation_result, prohibited_check, pattern_check, spam_check
+        )
+        
+        # Store moderation result on every call, cached classification or not
+        with track_stage("content_moderation", "redis"):
+            self.store_moderation_result(user_id, content_type, is_appropriate, confidence)
+        
+        return {
+            "is_appropriate": is_appropriate,
+            "confidence": confidence,
+            "flagged_issues": self.get_flagged_issues(
+                validation_result, prohibited_check, pattern_check, spam_check
+            ),
+            "suggestions": suggestions
+        }
+    
+    @cached("moderation", ttl=600)
+    async def classify_content(self, content: str, content_type: str) -> Dict[str, Any]:
+        """Checks that depend on the content alone, so identical submissions share them"""
+        return {
+            # Basic content validation
+            'validation': self.validate_content(content, content_type),
+            # Check for prohibited content
+            'prohibited': self.check_prohibited_content(content),
+            # Check for suspicious patterns
+            'patterns': self.check_suspicious_patterns(content),
+            # Check for spam indicators
+            'spam': self.check_spam_indicators(content)
+        }
+    
     def validate_content(self, content: str, content_type: str) -> Dict[str, Any]:
         """Validate content against type-specific rules"""
         try:
@@ -193,8 +224,8 @@ class ContentModerationService:
                 "suspicious_patterns": []
             }
     
-    def check_spam_indicators(self, content: str, user_id: str) -> Dict[str, Any]:
-        """Check for spam indicators"""
+    def check_spam_indicators(self, content: str) -> Dict[str, Any]:
+        """Check the content for spam indicators"""
         try:
             spam_indicators = []
             
@@ -217,11 +248,6 @@ class ContentModerationService:
             if len(re.findall(r'[!?]', content)) > len(content.split()) * 0.2:
                 spam_indicators.append("Excessive punctuation")
             
-            # Check user's content history
-            user_spam_score = self.get_user_spam_score(user_id)
-            if user_spam_score > 0.7:
-                spam_indicators.append("User has high spam score")
-            
             return {
                 "is_spam": len(spam_indicators) > 0,
                 "spam_indicators": spam_indicators
@@ -234,13 +260,22 @@ class ContentModerationService:
                 "spam_indicators": []
             }
     
+    def add_user_spam_check(self, spam_check: Dict[str, Any], user_id: str) -> Dict[str, Any]:
+        """Content spam indicators plus the user's content history"""
+        spam_indicators = list(spam_check['spam_indicators'])
+        if self.get_user_spam_score(user_id) > 0.7:
+            spam_indicators.append("User has high spam score")
+        return {
+            "is_spam": len(spam_indicators) > 0,
+            "spam_indicators": spam_indicators
+        }
+    
     def get_user_spam_score(self, user_id: str) -> float:
         """Get user's spam score based on history"""
         try:
-            # This would typically query user's moderation history
-            # For now, return a random score
-            import random
-            return random.uniform(0, 1)
+            total, flagged = self.redis_client.hmget(f"moderation_history:{user_id}", "total", "flagged")
+            # Smoothed so one flagged item from a new user is not treated as a spammer
+            return int(flagged or 0) / (int(total or 0) + 2)
         except Exception as e:
             logger.error(f"Error getting user spam score: {str(e)}")
             return 0.0
@@ -363,25 +398,34 @@ class ContentModerationService:
             }
             
             key = f"content_moderation:{user_id}:{datetime.utcnow().strftime('%Y%m%d')}"
-            self.redis_client.setex(key, 2592000, json.dumps(result))
+            history_key = f"moderation_history:{user_id}"
+            pipe = self.redis_client.pipeline()
+            pipe.setex(key, 2592000, serialization.dumps(result))
+            pipe.hincrby(history_key, "total", 1)
+            if not is_appropriate:
+                pipe.hincrby(history_key, "flagged", 1)
+            pipe.expire(history_key, 2592000)
+            pipe.execute()
             
         except Exception as e:
             logger.error(f"Error storing moderation result: {str(e)}")
     
-    async def batch_moderate(self, data: List[Dict[str, Any]]):
-        """Batch moderate content"""
-        try:
-            for item in data:
-                await self.check_content(
+    async def batch_moderate(self, data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Batch moderate content, returning one result per item; failed items get {"error": ...}"""
+        results = []
+        for item in data:
+            try:
+                results.append(await self.moderate_content(
                     content=item.get("content", ""),
                     content_type=item.get("content_type", "listing"),
                     user_id=item.get("user_id", "")
-                )
-            
-            logger.info(f"Batch moderated {len(data)} content items")
-            
-        except Exception as e:
-            logger.error(f"Error in batch moderation: {str(e)}")
+                ))
+            except Exception as e:
+                logger.error(f"Error in batch moderation: {str(e)}")
+                results.append({"error": str(e)})
+        
+        logger.info(f"Batch moderated {len(data)} content items")
+        return results
     
     def is_healthy(self) -> bool:
         """Check if the service is healthy"""
@@ -420,19 +464,24 @@ class ContentModerationService:
         """Update the content moderation model"""
         try:
             # This would typically retrain with new moderation data
+            tiered_cache.invalidate_namespace("moderation")
             logger.info("Content moderation model updated successfully")
         except Exception as e:
             logger.error(f"Error updating content moderation model: {str(e)}")
     
     async def get_model_status(self) -> Dict[str, Any]:
         """Get model status information"""
+        return self.build_model_status(read_metrics(self.redis_client, self.ANALYTICS_METRICS))
+    
+    def build_model_status(self, metrics: Dict[str, Any]) -> Dict[str, Any]:
+        """Compose model status from pre-fetched analytics metrics"""
         return {
             "status": "active",
             "model": "rule_based",
             "last_updated": datetime.utcnow().isoformat(),
             "performance": {
-                "accuracy_rate": await self.get_accuracy_rate(),
-                "false_positive_rate": await self.get_false_positive_rate(),
-                "total_moderations": await self.get_total_moderations()
+                "accuracy_rate": metrics["accuracy_rate"],
+                "false_positive_rate": metrics["false_positive_rate"],
+                "total_moderations": metrics["total_moderations"]
             }
         } 
\ No newline at end of file
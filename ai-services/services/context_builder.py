@@ -0,0 +1,194 @@
+"""
+Prompt Context Builder for GariPamoja
+Packs conversation history and retrieved knowledge into a bounded token budget
+"""
+
+import os
+import logging
+from typing import Dict, List, Optional, Any
+from datetime import datetime
+
+from services import serialization
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - falls back to a character heuristic
+    tiktoken = None
+
+
+class TokenCounter:
+    """Local token counting with tiktoken, or ~4 chars/token when unavailable"""
+
+    CHARS_PER_TOKEN = 4
+
+    def __init__(self, encoding_name: str = "cl100k_base"):
+        self.encoding = None
+        if tiktoken is not None:
+            try:
+                self.encoding = tiktoken.get_encoding(encoding_name)
+            except Exception as e:
+                logger.error(f"Error loading tokenizer {encoding_name}: {str(e)}")
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self.encoding is not None:
+            return len(self.encoding.encode(text))
+        return (len(text) + self.CHARS_PER_TOKEN - 1) // self.CHARS_PER_TOKEN
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Cut text down to at most max_tokens tokens"""
+        if max_tokens <= 0:
+            return ""
+        if self.encoding is not None:
+            tokens = self.encoding.encode(text)
+            return text if len(tokens) <= max_tokens else self.encoding.decode(tokens[:max_tokens])
+        return text[:max_tokens * self.CHARS_PER_TOKEN]
+
+
+class ContextBuilder:
+    """Builds token-bounded prompts and maintains rolling conversation summaries"""
+
+    # Role/formatting overhead per chat message, per OpenAI's accounting
+    MESSAGE_OVERHEAD = 4
+
+    def __init__(self, redis_client, llm_gateway=None):
+        self.redis_client = redis_client
+        self.llm_gateway = llm_gateway
+        self.counter = TokenCounter()
+
+        # Budget configuration
+        self.context_budget = int(os.getenv("CHAT_CONTEXT_TOKEN_BUDGET", "3000"))
+        self.rag_share = float(os.getenv("CHAT_RAG_TOKEN_SHARE", "0.4"))
+        self.summary_max_tokens = int(os.getenv("CHAT_SUMMARY_MAX_TOKENS", "200"))
+        self.summary_ttl = 86400  # Same lifetime as the conversation history
+
+    def build(
+        self,
+        system_prompt: str,
+        message: str,
+        history: List[Dict[str, str]],
+        retrieved_chunks: Optional[List[str]] = None,
+        summary: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Pack system prompt, summary, knowledge and recent history within budget"""
+        # System prompt and the current message are always sent
+        used = self.counter.count(system_prompt) + self.counter.count(message) + 2 * self.MESSAGE_OVERHEAD
+        remaining = available = max(self.context_budget - used, 0)
+
+        # Rolling summary of older turns
+        summary_text = ""
+        if summary:
+            summary_text = self.counter.truncate(summary, min(self.summary_max_tokens, remaining))
+            remaining -= self.counter.count(summary_text)
+
+        # Retrieved knowledge, capped at its share of the budget
+        knowledge = []
+        rag_budget = int(remaining * self.rag_share)
+        for chunk in retrieved_chunks or []:
+            chunk_tokens = self.counter.count(chunk)
+            if chunk_tokens > rag_budget:
+                if rag_budget > 0 and not knowledge:
+                    # Keep a truncated top hit rather than nothing
+                    chunk = self.counter.truncate(chunk, rag_budget)
+                    knowledge.append(chunk)
+                    rag_budget -= self.counter.count(chunk)
+                break
+            knowledge.append(chunk)
+            rag_budget -= chunk_tokens
+        remaining -= sum(self.counter.count(chunk) for chunk in knowledge)
+
+        # Most recent exchanges first, until the budget runs out
+        packed_history = []
+        for entry in reversed(history):
+            exchange_tokens = (
+                self.counter.count(entry.get("user", "")) +
+                self.counter.count(entry.get("assistant", "")) +
+                2 * self.MESSAGE_OVERHEAD
+            )
+            if exchange_tokens > remaining:
+                break
+            packed_history.insert(0, entry)
+            remaining -= exchange_tokens
+
+        system = system_prompt
+        if summary_text:
+            system += f"\n\nSummary of earlier conversation: {summary_text}"
+        if knowledge:
+            system += f"\n\nRelevant information: {' '.join(knowledge)}"
+
+        messages = []
+        for entry in packed_history:
+            messages.append({"role": "user", "content": entry["user"]})
+            messages.append({"role": "assistant", "content": entry["assistant"]})
+        messages.append({"role": "user", "content": message})
+
+        return {
+            "system": system,
+            "messages": messages,
+            "prompt_tokens": used + available - remaining,
+            "history_used": len(packed_history),
+            "chunks_used": len(knowledge)
+        }
+
+    def get_summary(self, user_id: str) -> str:
+        """Get the rolling conversation summary from Redis"""
+        try:
+            summary_data = self.redis_client.get(f"chat_summary:{user_id}")
+            if summary_data:
+                return serialization.loads(summary_data).get("summary", "")
+            return ""
+        except Exception as e:
+            logger.error(f"Error getting conversation summary: {str(e)}")
+            return ""
+
+    async def fold_into_summary(self, user_id: str, evicted: List[Dict[str, str]]):
+        """Fold exchanges dropped from the history window into the rolling summary"""
+        if not evicted:
+            return
+        try:
+            previous = self.get_summary(user_id)
+            transcript = "\n".join(
+                f"User: {entry['user']}\nAssistant: {entry['assistant']}" for entry in evicted
+            )
+            summary = await self.summarize(previous, transcript)
+
+            self.redis_client.setex(
+                f"chat_summary:{user_id}",
+                self.summary_ttl,
+                serialization.dumps({
+                    "summary": summary,
+                    "updated_at": datetime.utcnow().isoformat()
+                })
+            )
+
+        except Exception as e:
+            logger.error(f"Error updating conversation summary: {str(e)}")
+
+    async def summarize(self, previous: str, transcript: str) -> str:
+        """Summarize with the LLM gateway, falling back to extractive truncation"""
+        if self.llm_gateway is not None:
+            try:
+                prompt = (
+                    f"Existing summary:\n{previous or '(none)'}\n\n"
+                    f"New conversation turns:\n{transcript}\n\n"
+                    "Update the summary with the new turns. Keep user goals, booking details "
+                    "and unresolved issues. Reply with the summary only."
+                )
+                response = await self.llm_gateway.complete(
+                    [{"role": "user", "content": prompt}],
+                    system="You write terse summaries of customer support conversations.",
+                    max_tokens=self.summary_max_tokens,
+                    temperature=0.0
+                )
+                return response["text"].strip()
+            except Exception as e:
+                logger.error(f"Error summarizing conversation: {str(e)}")
+
+        # Keep the most recent material when the LLM is unavailable
+        combined = f"{previous} {transcript}".strip()
+        if self.counter.count(combined) <= self.summary_max_tokens:
+            return combined
+        return combined[-self.summary_max_tokens * TokenCounter.CHARS_PER_TOKEN:]
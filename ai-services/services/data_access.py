@@ -0,0 +1,238 @@
+"""
+Data Access for GariPamoja AI Services
+Read-only asyncpg queries against the Django tables, batched per request and
+cached per user/location with short TTLs
+"""
+
+import os
+import uuid
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+import asyncpg
+
+from services.cache import tiered_cache
+from services.singleflight import request_key
+
+logger = logging.getLogger(__name__)
+
+# Used for unknown users and whenever the database is unreachable
+DEFAULT_USER_FEATURES = {
+    "user_age_days": 30,
+    "transaction_count_24h": 1,
+    "device_count": 1,
+    "location_changes_24h": 0,
+    "payment_methods_count": 1,
+    "cancellation_rate": 0.1,
+    "verification_score": 0.5
+}
+
+DEFAULT_MARKET_DATA = {
+    "competition_count": 20,
+    "competition_level": "medium",
+    "average_price": 100,
+    "price_variance": 20,
+    "demand_trend": "stable"
+}
+
+VERIFICATION_WEIGHTS = {"verified": 0.5, "pending": 0.25, "rejected": 0.0}
+
+USER_FEATURES_QUERY = """
+SELECT
+    u.id::text AS user_id,
+    u.created_at,
+    u.verification_status,
+    u.is_kyc_verified,
+    u.trust_score,
+    COALESCE(jsonb_array_length(p.preferred_payment_methods), 0) AS payment_methods,
+    COUNT(b.id) AS bookings_total,
+    COUNT(b.id) FILTER (WHERE b.status = 'cancelled') AS bookings_cancelled,
+    COUNT(b.id) FILTER (WHERE b.created_at >= $2) AS bookings_24h,
+    COUNT(DISTINCT b.pickup_location) FILTER (WHERE b.created_at >= $2) AS pickup_locations_24h
+FROM users_user u
+LEFT JOIN users_userprofile p ON p.user_id = u.id
+LEFT JOIN bookings_booking b ON b.renter_id = u.id
+WHERE u.id = ANY($1::uuid[])
+GROUP BY u.id, p.id
+"""
+
+MARKET_DATA_QUERY = """
+WITH competitors AS (
+    SELECT daily_rate FROM cars_car
+    WHERE is_active AND LOWER(city) = LOWER($1)
+), demand AS (
+    SELECT
+        COUNT(*) FILTER (WHERE b.created_at >= $2) AS current_bookings,
+        COUNT(*) FILTER (WHERE b.created_at < $2) AS previous_bookings
+    FROM bookings_booking b
+    JOIN cars_car c ON c.id = b.car_id
+    WHERE LOWER(c.city) = LOWER($1) AND b.created_at >= $3 AND b.status <> 'cancelled'
+)
+SELECT
+    (SELECT COUNT(*) FROM competitors) AS competition_count,
+    (SELECT AVG(daily_rate) FROM competitors) AS average_price,
+    (SELECT STDDEV_POP(daily_rate) FROM competitors) AS price_variance,
+    demand.current_bookings,
+    demand.previous_bookings
+FROM demand
+"""
+
+
+class DataAccess:
+    """Pooled, read-only access to the marketplace database"""
+
+    def __init__(self):
+        self.dsn = os.getenv("AI_DATABASE_URL") or os.getenv("DATABASE_URL")
+        self.min_size = int(os.getenv("AI_DB_POOL_MIN_SIZE", "2"))
+        self.max_size = int(os.getenv("AI_DB_POOL_MAX_SIZE", "10"))
+        self.command_timeout = float(os.getenv("AI_DB_COMMAND_TIMEOUT_SECONDS", "2.0"))
+        self.user_features_ttl = float(os.getenv("USER_FEATURES_TTL_SECONDS", "60"))
+        self.market_data_ttl = float(os.getenv("MARKET_DATA_TTL_SECONDS", "300"))
+        self.pool: Optional[asyncpg.Pool] = None
+
+    async def start(self):
+        """Open the pool; without a database every lookup returns defaults"""
+        if not self.dsn or self.pool is not None:
+            return
+        try:
+            self.pool = await asyncpg.create_pool(
+                self.dsn,
+                min_size=self.min_size,
+                max_size=self.max_size,
+                command_timeout=self.command_timeout
+            )
+            logger.info("Database pool started")
+        except Exception as e:
+            logger.error(f"Error starting database pool: {str(e)}")
+            self.pool = None
+
+    async def close(self):
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    async def get_user_features(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Fraud features for each user; cache misses are fetched in one query"""
+        features: Dict[str, Dict[str, Any]] = {}
+        missing: List[str] = []
+        for user_id in dict.fromkeys(user_ids):
+            entry = self.cached_entry("user_features", user_id)
+            if entry is not None:
+                features[user_id] = entry
+            else:
+                missing.append(user_id)
+
+        if missing:
+            fetched = await self.fetch_user_features(missing)
+            for user_id in missing:
+                if fetched is None:
+                    # Database unavailable: answer with defaults but do not cache them
+                    features[user_id] = dict(DEFAULT_USER_FEATURES)
+                    continue
+                features[user_id] = fetched.get(user_id, dict(DEFAULT_USER_FEATURES))
+                self.cache_entry("user_features", user_id, features[user_id], self.user_features_ttl)
+
+        return features
+
+    async def fetch_user_features(self, user_ids: List[str]) -> Optional[Dict[str, Dict[str, Any]]]:
+        """None when the database cannot be queried"""
+        if self.pool is None:
+            return None
+
+        # Ids that are not UUIDs cannot match a Django user
+        valid_ids = []
+        for user_id in user_ids:
+            try:
+                valid_ids.append(uuid.UUID(str(user_id)))
+            except ValueError:
+                continue
+        if not valid_ids:
+            return {}
+
+        now = datetime.now(timezone.utc)
+        try:
+            rows = await self.pool.fetch(USER_FEATURES_QUERY, valid_ids, now - timedelta(hours=24))
+        except Exception as e:
+            logger.error(f"Error fetching user features: {str(e)}")
+            return None
+
+        features = {}
+        for row in rows:
+            total = row["bookings_total"]
+            verification = VERIFICATION_WEIGHTS.get(row["verification_status"], 0.0)
+            if row["is_kyc_verified"]:
+                verification += 0.3
+            verification += min(float(row["trust_score"] or 0) / 100.0, 1.0) * 0.2
+
+            features[row["user_id"]] = {
+                "user_age_days": max((now - row["created_at"]).days, 0),
+                "transaction_count_24h": row["bookings_24h"],
+                # No device table exists yet; every known user counts as one device
+                "device_count": DEFAULT_USER_FEATURES["device_count"],
+                "location_changes_24h": max(row["pickup_locations_24h"] - 1, 0),
+                "payment_methods_count": max(row["payment_methods"], 1),
+                "cancellation_rate": row["bookings_cancelled"] / total if total else 0.0,
+                "verification_score": round(min(verification, 1.0), 3)
+            }
+        return features
+
+    async def get_market_data(self, location: str) -> Dict[str, Any]:
+        """Competition and demand trend for a city"""
+        entry = self.cached_entry("market_data", location)
+        if entry is not None:
+            return entry
+
+        market_data = await self.fetch_market_data(location)
+        if market_data is None:
+            return dict(DEFAULT_MARKET_DATA)
+        self.cache_entry("market_data", location, market_data, self.market_data_ttl)
+        return market_data
+
+    async def fetch_market_data(self, location: str) -> Optional[Dict[str, Any]]:
+        if self.pool is None:
+            return None
+
+        now = datetime.now(timezone.utc)
+        try:
+            row = await self.pool.fetchrow(
+                MARKET_DATA_QUERY, location, now - timedelta(days=14), now - timedelta(days=28)
+            )
+        except Exception as e:
+            logger.error(f"Error fetching market data: {str(e)}")
+            return None
+
+        count = row["competition_count"]
+        if count == 0:
+            return dict(DEFAULT_MARKET_DATA, competition_count=0, competition_level="low")
+
+        current, previous = row["current_bookings"], row["previous_bookings"]
+        if current > previous * 1.1:
+            trend = "increasing"
+        elif current < previous * 0.9:
+            trend = "decreasing"
+        else:
+            trend = "stable"
+
+        return {
+            "competition_count": count,
+            "competition_level": "low" if count < 15 else "medium" if count < 35 else "high",
+            "average_price": round(float(row["average_price"]), 2),
+            "price_variance": round(float(row["price_variance"] or 0), 2),
+            "demand_trend": trend
+        }
+
+    # Per-key entries in the shared L1/L2 cache, so batches can mix hits and misses
+    def cached_entry(self, namespace: str, key: str) -> Optional[Dict[str, Any]]:
+        if not tiered_cache.enabled:
+            return None
+        entry = tiered_cache.lookup(namespace, request_key(namespace, key))
+        return entry.value if entry is not None and entry.fresh else None
+
+    def cache_entry(self, namespace: str, key: str, value: Dict[str, Any], ttl: float):
+        if tiered_cache.enabled:
+            tiered_cache.store(namespace, request_key(namespace, key), value, ttl, 0.0)
+
+
+# Process-wide pool, opened on app startup
+data_access = DataAccess()
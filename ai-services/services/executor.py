@@ -0,0 +1,120 @@
+"""
+CPU Execution Layer for GariPamoja AI Services
+Runs declared CPU-bound service methods off the event loop in a process or thread pool
+"""
+
+import os
+import time
+import asyncio
+import importlib
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Dict, List, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+# Service instances living inside pool worker processes, keyed by class path
+_worker_services: Dict[str, Any] = {}
+
+
+def cpu_bound(method):
+    """Declare a synchronous service method safe to run in the CPU pool"""
+    method._cpu_bound = True
+    return method
+
+
+def class_path(service) -> str:
+    cls = type(service)
+    return f"{cls.__module__}:{cls.__qualname__}"
+
+
+def _init_worker(snapshots: Dict[str, Dict[str, Any]]):
+    """Pool initializer: build each service once and load the parent's model state"""
+    logging.basicConfig(level=logging.INFO)
+    for path, state in snapshots.items():
+        module_name, class_name = path.split(":")
+        service = getattr(importlib.import_module(module_name), class_name)()
+        for attr, value in state.items():
+            setattr(service, attr, value)
+        _worker_services[path] = service
+
+
+def _warm(delay: float) -> int:
+    # Holding each task briefly forces the pool to start every worker
+    time.sleep(delay)
+    return os.getpid()
+
+
+def _call_in_worker(path: str, method_name: str, args: tuple, kwargs: Dict[str, Any]):
+    return getattr(_worker_services[path], method_name)(*args, **kwargs)
+
+
+class CPUExecutor:
+    """Offloads @cpu_bound service methods; runs inline when not started"""
+
+    def __init__(self):
+        self.kind = os.getenv("AI_CPU_POOL_KIND", "process")  # process | thread | inline
+        self.max_workers = int(os.getenv("AI_CPU_POOL_WORKERS", str(max((os.cpu_count() or 2) - 1, 1))))
+        self.start_method = os.getenv("AI_CPU_POOL_START_METHOD", "spawn")
+        self.pool: Optional[Executor] = None
+        self.services: List[Any] = []
+        self.pool_paths = set()
+
+    def start(self, services: List[Any]):
+        """Create the pool and warm every worker with the given services' models"""
+        self.services = services
+        self.pool_paths = {class_path(service) for service in services}
+        if self.kind == "inline" or self.max_workers < 1:
+            return
+
+        if self.kind == "thread":
+            self.pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ai-cpu")
+        else:
+            self.pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context(self.start_method),
+                initializer=_init_worker,
+                initargs=(self.snapshot(),)
+            )
+            pids = {future.result() for future in [self.pool.submit(_warm, 0.2) for _ in range(self.max_workers)]}
+            logger.info(f"CPU process pool warmed with {len(pids)} workers")
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Model state each service ships to pool workers"""
+        return {
+            class_path(service): {attr: getattr(service, attr) for attr in getattr(service, "CPU_BOUND_STATE", ())}
+            for service in self.services
+        }
+
+    def reload(self):
+        """Restart process workers so they pick up retrained models"""
+        if isinstance(self.pool, ProcessPoolExecutor):
+            old_pool = self.pool
+            self.start(self.services)
+            old_pool.shutdown(wait=False)
+
+    async def run(self, service, method_name: str, *args, **kwargs):
+        """Run service.method_name(*args) off the event loop if it is declared CPU-bound"""
+        method = getattr(service, method_name)
+        if self.pool is None or not getattr(method, "_cpu_bound", False):
+            return method(*args, **kwargs)
+        if class_path(service) not in self.pool_paths:
+            return method(*args, **kwargs)
+
+        loop = asyncio.get_running_loop()
+        if isinstance(self.pool, ThreadPoolExecutor):
+            return await loop.run_in_executor(self.pool, partial(method, *args, **kwargs))
+        return await loop.run_in_executor(
+            self.pool, _call_in_worker, class_path(service), method_name, args, kwargs
+        )
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+
+# Process-wide executor; stays inline until start() is called (e.g. inside pool workers)
+cpu_executor = CPUExecutor()
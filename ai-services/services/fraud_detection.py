@@ -4,7 +4,7 @@ Provides risk assessment and suspicious activity detection
 """
 
 import os
-import json
+import asyncio
 import logging
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
@@ -15,11 +15,38 @@ from sklearn.preprocessing import StandardScaler
 import redis
 import hashlib
 
+from services.analytics import read_metrics
+from services.metrics import track_stage
+from services.executor import cpu_bound, cpu_executor
+from services.data_access import data_access
+from services.fraud_training import FraudEventStream, ModelRegistry
+from services import serialization
+
 logger = logging.getLogger(__name__)
 
 class FraudDetectionService:
     """AI-powered fraud detection service"""
     
+    # Analytics counters: field -> (redis key, type, default)
+    ANALYTICS_METRICS = {
+        "total_analyses": ("fraud_analyses_total", int, 0),
+        "detection_rate": ("fraud_detection_rate", float, 0.85),
+        "false_positive_rate": ("fraud_false_positive_rate", float, 0.05)
+    }
+    
+    # Attributes shipped to CPU pool workers when they start
+    CPU_BOUND_STATE = ("model", "scaler", "is_trained", "classifier")
+    
+    # IsolationForest decision_function units per logit when no classifier is published
+    ANOMALY_SCORE_SCALE = 0.1
+    
+    # Risk thresholds for the IsolationForest score; a published classifier brings its own
+    DEFAULT_RISK_THRESHOLDS = {
+        'low': 0.3,
+        'medium': 0.6,
+        'high': 0.8
+    }
+    
     def __init__(self):
         self.redis_client = redis.Redis.from_url(
             os.getenv("REDIS_URL", "redis://localhost:6379/1"),
@@ -30,13 +57,16 @@ class FraudDetectionService:
         self.model = IsolationForest(contamination=0.1, random_state=42)
         self.scaler = StandardScaler()
         self.is_trained = False
+        # Calibrated gradient-boosted classifier; preferred over the IsolationForest once published
+        self.classifier = None
+        self.model_version: Optional[int] = None
+        
+        # Scored transactions feed the background trainer (trainer.py), which publishes models here
+        self.events = FraudEventStream(self.redis_client)
+        self.registry = ModelRegistry()
         
         # Risk thresholds
-        self.risk_thresholds = {
-            'low': 0.3,
-            'medium': 0.6,
-            'high': 0.8
-        }
+        self.risk_thresholds = dict(self.DEFAULT_RISK_THRESHOLDS)
         
         # Fraud patterns
         self.fraud_patterns = {
@@ -73,10 +103,9 @@ class FraudDetectionService:
             logger.error(f"Error loading historical data: {str(e)}")
             self.historical_data = pd.DataFrame()
     
-    def generate_synthetic_data(self) -> pd.DataFrame:
+    def generate_synthetic_data(self, n_samples: int = 2000) -> pd.DataFrame:
         """Generate synthetic fraud detection data"""
         np.random.seed(42)
-        n_samples = 2000
         
         data = {
             'user_age_days': np.random.randint(1, 365, n_samples),
@@ -86,37 +115,40 @@ class FraudDetectionService:
             'location_changes_24h': np.random.randint(0, 3, n_samples),
             'payment_methods_used': np.random.randint(1, 3, n_samples),
             'booking_cancellation_rate': np.random.uniform(0, 0.5, n_samples),
-            'account_verification_score': np.random.uniform(0.3, 1.0, n_samples),
-            'is_fraud': np.random.choice([0, 1], n_samples, p=[0.95, 0.05])
+            'account_verification_score': np.random.uniform(0.3, 1.0, n_samples)
         }
         
+        # Labels follow the same red flags as the rules (new, busy, unverified accounts)
+        # at roughly a 5% base rate, so a supervised model has signal to learn
+        logits = (
+            -4.2
+            + 1.5 * (data['user_age_days'] < 14)
+            + 0.004 * (data['transaction_amount'] - 275)
+            + 0.25 * (data['transaction_count_24h'] - 5)
+            + 0.5 * (data['device_count'] - 2.5)
+            + 2.5 * (data['booking_cancellation_rate'] - 0.25)
+            - 3.0 * (data['account_verification_score'] - 0.65)
+        )
+        data['is_fraud'] = (np.random.uniform(0, 1, n_samples) < 1 / (1 + np.exp(-logits))).astype(int)
+        
         return pd.DataFrame(data)
     
     async def analyze_risk(
         self,
         user_id: str,
         transaction_data: Dict[str, Any],
-        user_behavior: Optional[Dict[str, Any]] = None
+        user_behavior: Optional[Dict[str, Any]] = None,
+        user_features: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """Analyze risk for a transaction or user"""
         try:
-            features = self.extract_features(user_id, transaction_data, user_behavior)
-            risk_score = self.calculate_risk_score(features)
-            is_anomaly = self.detect_anomaly(features)
-            risk_factors = self.identify_risk_factors(features, transaction_data)
-            recommendations = self.generate_recommendations(risk_score, risk_factors)
-            is_suspicious = risk_score > self.risk_thresholds['medium']
-            
-            self.store_analysis_result(user_id, risk_score, is_suspicious, risk_factors)
-            
-            return {
-                "risk_score": round(risk_score, 3),
-                "is_suspicious": is_suspicious,
-                "risk_factors": risk_factors,
-                "recommendations": recommendations,
-                "anomaly_detected": is_anomaly,
-                "confidence": self.calculate_confidence(features)
-            }
+            with track_stage("fraud_detection", "feature_extraction"):
+                if user_features is None:
+                    user_features = (await data_access.get_user_features([user_id]))[user_id]
+                features = self.extract_features(transaction_data, user_behavior, user_features)
+            with track_stage("fraud_detection", "model_inference"):
+                risk_score, is_anomaly = await cpu_executor.run(self, "score_features", features)
+            return self.build_result(user_id, transaction_data, features, risk_score, is_anomaly)
             
         except Exception as e:
             logger.error(f"Error analyzing risk: {str(e)}")
@@ -129,60 +161,108 @@ class FraudDetectionService:
                 "confidence": 0.0
             }
     
-    def extract_features(
+    def build_result(
         self,
         user_id: str,
         transaction_data: Dict[str, Any],
-        user_behavior: Optional[Dict[str, Any]] = None
+        features: List[float],
+        risk_score: float,
+        is_anomaly: bool
+    ) -> Dict[str, Any]:
+        """Risk factors, recommendations and bookkeeping for one scored transaction"""
+        risk_factors = self.identify_risk_factors(features, transaction_data)
+        recommendations = self.generate_recommendations(risk_score, risk_factors)
+        is_suspicious = risk_score >= self.risk_thresholds['medium']
+        
+        with track_stage("fraud_detection", "redis"):
+            self.store_analysis_result(user_id, risk_score, is_suspicious, risk_factors)
+            self.events.record(features, transaction_data.get('transaction_id'))
+        
+        return {
+            "risk_score": round(risk_score, 3),
+            "is_suspicious": is_suspicious,
+            "risk_factors": risk_factors,
+            "recommendations": recommendations,
+            "anomaly_detected": is_anomaly,
+            "confidence": self.calculate_confidence(features)
+        }
+    
+    def extract_features(
+        self,
+        transaction_data: Dict[str, Any],
+        user_behavior: Optional[Dict[str, Any]],
+        user_features: Dict[str, Any]
     ) -> List[float]:
-        """Extract features for risk analysis"""
+        """Extract features for risk analysis from the user's stored history"""
         features = []
         
         # User account features
-        user_age_days = self.get_user_age_days(user_id)
-        features.append(user_age_days)
+        features.append(user_features['user_age_days'])
         
         # Transaction features
         transaction_amount = transaction_data.get('amount', 0)
         features.append(transaction_amount)
         
         # Transaction frequency
-        transaction_count_24h = self.get_transaction_count_24h(user_id)
-        features.append(transaction_count_24h)
+        features.append(user_features['transaction_count_24h'])
         
         # Device and location features
-        device_count = self.get_device_count(user_id)
-        features.append(device_count)
-        
-        location_changes_24h = self.get_location_changes_24h(user_id)
-        features.append(location_changes_24h)
+        features.append(user_features['device_count'])
+        features.append(user_features['location_changes_24h'])
         
         # Payment features
-        payment_methods_used = self.get_payment_methods_count(user_id)
-        features.append(payment_methods_used)
+        features.append(user_features['payment_methods_count'])
         
         # Behavioral features
         if user_behavior:
             booking_cancellation_rate = user_behavior.get('cancellation_rate', 0)
             account_verification_score = user_behavior.get('verification_score', 0.5)
         else:
-            booking_cancellation_rate = self.get_cancellation_rate(user_id)
-            account_verification_score = self.get_verification_score(user_id)
+            booking_cancellation_rate = user_features['cancellation_rate']
+            account_verification_score = user_features['verification_score']
         
         features.append(booking_cancellation_rate)
         features.append(account_verification_score)
         
         return features
     
+    @cpu_bound
+    def score_features(self, features: List[float]) -> tuple:
+        """Risk score and anomaly flag for one feature vector"""
+        return self.calculate_risk_score(features), self.detect_anomaly(features)
+    
+    @cpu_bound
+    def score_batch(self, feature_rows: List[List[float]]) -> tuple:
+        """Risk scores and anomaly flags for many feature vectors in one model call each"""
+        try:
+            X = np.asarray(feature_rows, dtype=float)
+            if self.classifier is not None:
+                risk_scores = self.classifier.predict_proba(X)
+            elif self.is_trained:
+                risk_scores = self.anomaly_risk(self.model.decision_function(self.scaler.transform(X)))
+            else:
+                risk_scores = [self.rule_based_risk_scoring(features) for features in feature_rows]
+            
+            if self.is_trained:
+                anomalies = (self.model.predict(self.scaler.transform(X)) == -1).tolist()
+            else:
+                anomalies = [False] * len(feature_rows)
+            return [float(score) for score in risk_scores], anomalies
+            
+        except Exception as e:
+            logger.error(f"Error scoring batch: {str(e)}")
+            return [self.score_features(features)[0] for features in feature_rows], [False] * len(feature_rows)
+    
     def calculate_risk_score(self, features: List[float]) -> float:
         """Calculate risk score using ML model or rule-based approach"""
         try:
-            if self.is_trained and len(features) >= 8:
+            if self.classifier is not None and len(features) >= 8:
+                return self.classifier.predict_proba_one(features)
+            elif self.is_trained and len(features) >= 8:
                 features_array = np.array(features).reshape(1, -1)
                 features_scaled = self.scaler.transform(features_array)
                 anomaly_score = self.model.decision_function(features_scaled)[0]
-                risk_score = 1 / (1 + np.exp(-anomaly_score))
-                return min(max(risk_score, 0.0), 1.0)
+                return float(self.anomaly_risk(anomaly_score))
             else:
                 return self.rule_based_risk_scoring(features)
                 
@@ -190,6 +270,10 @@ class FraudDetectionService:
             logger.error(f"Error calculating risk score: {str(e)}")
             return 0.5
     
+    def anomaly_risk(self, decision):
+        """Map IsolationForest decision values to risk; negative (outlying) values mean higher risk"""
+        return 1 / (1 + np.exp(np.asarray(decision) / self.ANOMALY_SCORE_SCALE))
+    
     def rule_based_risk_scoring(self, features: List[float]) -> float:
         """Rule-based risk scoring when ML model is not available"""
         if len(features) < 8:
@@ -295,13 +379,13 @@ class FraudDetectionService:
         """Generate recommendations based on risk analysis"""
         recommendations = []
         
-        if risk_score > self.risk_thresholds['high']:
+        if risk_score >= self.risk_thresholds['high']:
             recommendations.append("Immediate manual review required")
             recommendations.append("Consider temporary account suspension")
-        elif risk_score > self.risk_thresholds['medium']:
+        elif risk_score >= self.risk_thresholds['medium']:
             recommendations.append("Enhanced monitoring recommended")
             recommendations.append("Request additional documentation")
-        elif risk_score > self.risk_thresholds['low']:
+        elif risk_score >= self.risk_thresholds['low']:
             recommendations.append("Monitor for suspicious activity")
         else:
             recommendations.append("Low risk - proceed with normal processing")
@@ -323,63 +407,6 @@ class FraudDetectionService:
         
         return min(max(confidence, 0.0), 1.0)
     
-    # Helper methods for feature extraction
-    def get_user_age_days(self, user_id: str) -> int:
-        """Get user account age in days"""
-        try:
-            return np.random.randint(1, 365)
-        except Exception as e:
-            logger.error(f"Error getting user age: {str(e)}")
-            return 30
-    
-    def get_transaction_count_24h(self, user_id: str) -> int:
-        """Get transaction count in last 24 hours"""
-        try:
-            return np.random.randint(1, 10)
-        except Exception as e:
-            logger.error(f"Error getting transaction count: {str(e)}")
-            return 1
-    
-    def get_device_count(self, user_id: str) -> int:
-        """Get number of devices used by user"""
-        try:
-            return np.random.randint(1, 5)
-        except Exception as e:
-            logger.error(f"Error getting device count: {str(e)}")
-            return 1
-    
-    def get_location_changes_24h(self, user_id: str) -> int:
-        """Get number of location changes in last 24 hours"""
-        try:
-            return np.random.randint(0, 3)
-        except Exception as e:
-            logger.error(f"Error getting location changes: {str(e)}")
-            return 0
-    
-    def get_payment_methods_count(self, user_id: str) -> int:
-        """Get number of payment methods used"""
-        try:
-            return np.random.randint(1, 3)
-        except Exception as e:
-            logger.error(f"Error getting payment methods count: {str(e)}")
-            return 1
-    
-    def get_cancellation_rate(self, user_id: str) -> float:
-        """Get user's booking cancellation rate"""
-        try:
-            return np.random.uniform(0, 0.5)
-        except Exception as e:
-            logger.error(f"Error getting cancellation rate: {str(e)}")
-            return 0.1
-    
-    def get_verification_score(self, user_id: str) -> float:
-        """Get user's verification score"""
-        try:
-            return np.random.uniform(0.3, 1.0)
-        except Exception as e:
-            logger.error(f"Error getting verification score: {str(e)}")
-            return 0.5
-    
     def store_analysis_result(
         self,
         user_id: str,
@@ -398,25 +425,49 @@ class FraudDetectionService:
             }
             
             key = f"fraud_analysis:{user_id}:{datetime.utcnow().strftime('%Y%m%d')}"
-            self.redis_client.setex(key, 2592000, json.dumps(result))
+            self.redis_client.setex(key, 2592000, serialization.dumps(result))
             
         except Exception as e:
             logger.error(f"Error storing analysis result: {str(e)}")
     
-    async def batch_analyze(self, data: List[Dict[str, Any]]):
-        """Batch analyze fraud data"""
-        try:
-            for item in data:
-                await self.analyze_risk(
-                    user_id=item.get("user_id"),
-                    transaction_data=item.get("transaction_data", {}),
-                    user_behavior=item.get("user_behavior")
+    def record_label(self, transaction_id: str, is_fraud: bool):
+        """Confirmed outcome (chargeback, dispute ruling) of a scored transaction, used from the next retrain"""
+        self.events.record_label(transaction_id, is_fraud)
+    
+    async def batch_analyze(self, data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Batch analyze fraud data, returning one result per item
+        
+        Items that cannot be scored get {"error": ...}; failures shared by the whole
+        batch (feature store, model) raise so the job is retried.
+        """
+        # One query for every user in the batch, one model call for every row
+        user_features = await data_access.get_user_features([item.get("user_id") for item in data])
+        results: List[Optional[Dict[str, Any]]] = [None] * len(data)
+        feature_rows, scored = [], []
+        for index, item in enumerate(data):
+            try:
+                feature_rows.append(self.extract_features(
+                    item.get("transaction_data", {}),
+                    item.get("user_behavior"),
+                    user_features[item.get("user_id")]
+                ))
+                scored.append(index)
+            except Exception as e:
+                logger.error(f"Error extracting fraud features: {str(e)}")
+                results[index] = {"error": str(e)}
+        
+        if feature_rows:
+            with track_stage("fraud_detection", "model_inference"):
+                risk_scores, anomalies = await cpu_executor.run(self, "score_batch", feature_rows)
+        
+            for index, features, risk_score, is_anomaly in zip(scored, feature_rows, risk_scores, anomalies):
+                item = data[index]
+                results[index] = self.build_result(
+                    item.get("user_id"), item.get("transaction_data", {}), features, risk_score, is_anomaly
                 )
-            
-            logger.info(f"Batch analyzed {len(data)} fraud detection requests")
-            
-        except Exception as e:
-            logger.error(f"Error in batch analysis: {str(e)}")
+        
+        logger.info(f"Batch analyzed {len(data)} fraud detection requests")
+        return results
     
     def is_healthy(self) -> bool:
         """Check if the service is healthy"""
@@ -451,30 +502,49 @@ class FraudDetectionService:
             return 0.05
     
     async def update_model(self):
-        """Update the fraud detection model with new data"""
+        """Switch to the latest model published by the background trainer"""
+        await asyncio.to_thread(self.load_published_model)
+    
+    def load_published_model(self) -> bool:
+        """Load the registry's current artifact if it is newer; True when the model changed"""
         try:
-            if len(self.historical_data) > 100:
-                X = self.historical_data.drop('is_fraud', axis=1)
-                y = self.historical_data['is_fraud']
-                
-                X_scaled = self.scaler.fit_transform(X)
-                self.model.fit(X_scaled)
-                self.is_trained = True
-                
-                logger.info("Fraud detection model updated successfully")
+            version = self.registry.current_version()
+            if version is None or version == self.model_version:
+                return False
+            
+            artifact = self.registry.load(version)
+            if artifact is None:
+                return False
+            
+            self.model = artifact["model"]
+            self.scaler = artifact["scaler"]
+            self.classifier = artifact.get("classifier")
+            # Thresholds are chosen on the classifier's calibrated holdout and only fit its scores
+            thresholds = artifact.get("thresholds") if self.classifier is not None else None
+            self.risk_thresholds = dict(thresholds or self.DEFAULT_RISK_THRESHOLDS)
+            self.is_trained = True
+            self.model_version = version
+            logger.info(f"Fraud detection model v{version} loaded: {artifact['metrics']}")
+            return True
             
         except Exception as e:
-            logger.error(f"Error updating fraud detection model: {str(e)}")
+            logger.error(f"Error loading published fraud model: {str(e)}")
+            return False
     
     async def get_model_status(self) -> Dict[str, Any]:
         """Get model status information"""
+        return self.build_model_status(read_metrics(self.redis_client, self.ANALYTICS_METRICS))
+    
+    def build_model_status(self, metrics: Dict[str, Any]) -> Dict[str, Any]:
+        """Compose model status from pre-fetched analytics metrics"""
         return {
             "status": "active" if self.is_trained else "training",
-            "model": "isolation_forest",
+            "model": "gradient_boosting" if self.classifier is not None else "isolation_forest",
+            "version": self.model_version,
             "last_updated": datetime.utcnow().isoformat(),
             "performance": {
-                "detection_rate": await self.get_detection_rate(),
-                "false_positive_rate": await self.get_false_positive_rate(),
-                "total_analyses": await self.get_total_analyses()
+                "detection_rate": metrics["detection_rate"],
+                "false_positive_rate": metrics["false_positive_rate"],
+                "total_analyses": metrics["total_analyses"]
             }
         } 
\ No newline at end of file
@@ -0,0 +1,341 @@
+"""
+Incremental Fraud Model Training for GariPamoja AI Services
+Streams scored transactions through Redis, keeps running scaler statistics and a
+rolling training window, and publishes validated, versioned model artifacts
+"""
+
+import os
+import copy
+import pickle
+import logging
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import redis
+from sklearn.ensemble import IsolationForest
+from sklearn.metrics import roc_auc_score
+from sklearn.preprocessing import StandardScaler
+
+from services import serialization
+from services.fraud_classifier import (
+    FraudClassifier, choose_thresholds, evaluate_classifier, threshold_metrics, train_classifier
+)
+
+logger = logging.getLogger(__name__)
+
+# Column order of FraudDetectionService.extract_features and its historical data
+FEATURE_NAMES = (
+    "user_age_days",
+    "transaction_amount",
+    "transaction_count_24h",
+    "device_count",
+    "location_changes_24h",
+    "payment_methods_used",
+    "booking_cancellation_rate",
+    "account_verification_score"
+)
+
+
+def stream_position(event_id: str) -> Tuple[int, int]:
+    """Comparable form of a Redis stream id ("ms-seq")"""
+    ms, _, seq = event_id.partition("-")
+    return int(ms), int(seq or 0)
+
+
+class FraudEventStream:
+    """Capped Redis stream of scored feature vectors, plus fraud labels keyed by transaction id
+
+    Outcomes such as chargebacks and lost disputes arrive long after a transaction was
+    scored; they are kept in a hash and joined to the window's events at training time.
+    """
+
+    STREAM = "fraud_events:stream"
+    LABELS_KEY = "fraud_labels"
+
+    def __init__(self, redis_client):
+        self.redis_client = redis_client
+        self.maxlen = int(os.getenv("FRAUD_EVENT_STREAM_MAXLEN", "200000"))
+
+    def record(self, features: List[float], transaction_id: Optional[str] = None, label: Optional[int] = None):
+        try:
+            self.redis_client.xadd(
+                self.STREAM,
+                {
+                    "features": serialization.dumps(features),
+                    "transaction_id": transaction_id or "",
+                    "label": "" if label is None else str(int(label))
+                },
+                maxlen=self.maxlen,
+                approximate=True
+            )
+        except Exception as e:
+            logger.error(f"Error recording fraud event: {str(e)}")
+
+    def read(self, after_id: str, count: int, block_ms: int) -> List[Tuple[str, List[float], Optional[int], Optional[str]]]:
+        """Up to count events after after_id as (id, features, label, transaction_id)"""
+        response = self.redis_client.xread({self.STREAM: after_id}, count=count, block=block_ms)
+        events = []
+        for _, messages in response or []:
+            for event_id, fields in messages:
+                label = fields.get("label")
+                events.append((
+                    event_id,
+                    serialization.loads(fields["features"]),
+                    int(label) if label else None,
+                    fields.get("transaction_id") or None
+                ))
+        return events
+
+    def record_label(self, transaction_id: str, is_fraud: bool):
+        """Confirmed outcome of a scored transaction; the latest outcome wins"""
+        self.redis_client.hset(self.LABELS_KEY, transaction_id, int(is_fraud))
+
+    def labels(self, transaction_ids: List[str], chunk_size: int = 1000) -> Dict[str, int]:
+        """Known labels for these transactions"""
+        found = {}
+        for start in range(0, len(transaction_ids), chunk_size):
+            chunk = transaction_ids[start:start + chunk_size]
+            for transaction_id, label in zip(chunk, self.redis_client.hmget(self.LABELS_KEY, chunk)):
+                if label is not None:
+                    found[transaction_id] = int(label)
+        return found
+
+
+class ModelRegistry:
+    """Versioned fraud model artifacts in Redis; the API polls the current version"""
+
+    CURRENT_KEY = "fraud_model:current"
+    SEQUENCE_KEY = "fraud_model:version_seq"
+
+    def __init__(self, redis_url: Optional[str] = None):
+        # Artifacts are pickled bytes, so this client must not decode responses
+        self.redis_client = redis.Redis.from_url(redis_url or os.getenv("REDIS_URL", "redis://localhost:6379/1"))
+        self.keep_versions = int(os.getenv("FRAUD_MODEL_KEEP_VERSIONS", "5"))
+
+    def artifact_key(self, version: int) -> str:
+        return f"fraud_model:artifact:{version}"
+
+    def publish(self, artifact: Dict[str, Any]) -> int:
+        version = int(self.redis_client.incr(self.SEQUENCE_KEY))
+        artifact = dict(artifact, version=version)
+
+        pipe = self.redis_client.pipeline(transaction=True)
+        pipe.set(self.artifact_key(version), pickle.dumps(artifact))
+        pipe.set(self.CURRENT_KEY, version)
+        if version > self.keep_versions:
+            # Older versions stay around briefly for rollback
+            pipe.delete(self.artifact_key(version - self.keep_versions))
+        pipe.execute()
+        return version
+
+    def current_version(self) -> Optional[int]:
+        version = self.redis_client.get(self.CURRENT_KEY)
+        return int(version) if version is not None else None
+
+    def load(self, version: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        version = version if version is not None else self.current_version()
+        if version is None:
+            return None
+        raw = self.redis_client.get(self.artifact_key(version))
+        return pickle.loads(raw) if raw is not None else None
+
+
+class FraudModelTrainer:
+    """Rolling-window training over a running StandardScaler
+
+    Every version carries an IsolationForest (anomaly flag, fallback score) and,
+    once the window holds enough labels, a calibrated gradient-boosted classifier.
+    A version trained without enough labels keeps the last published classifier.
+    """
+
+    def __init__(self, registry: ModelRegistry, events: Optional[FraudEventStream] = None):
+        self.registry = registry
+        # Source of labels that arrive after scoring; None trains on event labels only
+        self.events = events
+        self.window_size = int(os.getenv("FRAUD_TRAINING_WINDOW", "50000"))
+        self.retrain_every = int(os.getenv("FRAUD_RETRAIN_EVERY_EVENTS", "5000"))
+        self.min_train_events = int(os.getenv("FRAUD_MIN_TRAINING_EVENTS", "500"))
+        self.holdout_fraction = float(os.getenv("FRAUD_HOLDOUT_FRACTION", "0.2"))
+        self.contamination = float(os.getenv("FRAUD_CONTAMINATION", "0.1"))
+        self.max_anomaly_rate_drift = float(os.getenv("FRAUD_MAX_ANOMALY_RATE_DRIFT", "0.05"))
+        self.max_auc_drop = float(os.getenv("FRAUD_MAX_AUC_DROP", "0.02"))
+        self.min_positive_labels = int(os.getenv("FRAUD_MIN_POSITIVE_LABELS", "20"))
+        self.min_classifier_auc = float(os.getenv("FRAUD_MIN_CLASSIFIER_AUC", "0.6"))
+
+        # Scaler statistics accumulate over every event ever seen, not just the window,
+        # so scaled features mean the same thing from one model version to the next
+        self.scaler = StandardScaler()
+        self.window: deque = deque(maxlen=self.window_size)
+        self.last_event_id = "0-0"
+        self.events_since_training = 0
+        self.current_metrics: Dict[str, Any] = {}
+        self.current_classifier: Optional[FraudClassifier] = None
+        self.current_thresholds: Optional[Dict[str, float]] = None
+
+    def restore(self) -> bool:
+        """Continue from the last published artifact; False when none exists"""
+        artifact = self.registry.load()
+        if artifact is None:
+            return False
+        self.scaler = copy.deepcopy(artifact["scaler"])
+        self.last_event_id = artifact["last_event_id"]
+        self.current_metrics = artifact["metrics"]
+        self.current_classifier = artifact.get("classifier")
+        self.current_thresholds = artifact.get("thresholds")
+        logger.info(f"Resuming from fraud model v{artifact['version']} at event {self.last_event_id}")
+        return True
+
+    def ingest(self, events: Iterable[Tuple[str, List[float], Optional[int], Optional[str]]], replay: bool = False):
+        """Add a chunk of stream events to the window and the running scaler
+
+        With replay=True (rebuilding the window after a restart), events already
+        counted in the restored scaler only refill the window.
+        """
+        fresh = []
+        for event_id, features, label, transaction_id in events:
+            if len(features) != len(FEATURE_NAMES):
+                continue
+            self.window.append((features, label, transaction_id))
+            if not replay or stream_position(event_id) > stream_position(self.last_event_id):
+                fresh.append(features)
+                self.last_event_id = event_id
+
+        if fresh:
+            self.scaler.partial_fit(np.asarray(fresh, dtype=float))
+            self.events_since_training += len(fresh)
+
+    def ingest_frame(self, frame: pd.DataFrame):
+        """Seed an empty registry from a labelled DataFrame such as the synthetic history"""
+        labels = frame["is_fraud"].tolist() if "is_fraud" in frame else [None] * len(frame)
+        rows = frame[list(FEATURE_NAMES)].to_numpy(dtype=float)
+        self.window.extend((features, label, None) for features, label in zip(rows.tolist(), labels))
+        self.scaler.partial_fit(rows)
+        self.events_since_training += len(rows)
+
+    def should_train(self) -> bool:
+        return self.events_since_training >= self.retrain_every and len(self.window) >= self.min_train_events
+
+    def train(self) -> Optional[int]:
+        """Fit on the window minus its newest slice, validate on that slice, publish if acceptable"""
+        self.events_since_training = 0
+        X = np.asarray([features for features, _, _ in self.window], dtype=float)
+        labels = self.window_labels()
+
+        # Time-ordered split: validate on the most recent traffic
+        split = int(len(X) * (1 - self.holdout_fraction))
+        scaler = copy.deepcopy(self.scaler)
+        X_train, X_holdout = scaler.transform(X[:split]), scaler.transform(X[split:])
+
+        model = IsolationForest(contamination=self.contamination, random_state=42)
+        model.fit(X_train)
+
+        metrics = self.validate(model, X_holdout, labels[split:])
+        metrics["training_events"] = split
+        if not self.acceptable(metrics):
+            logger.warning(f"Rejected fraud model candidate: {metrics}")
+            return None
+
+        classifier, thresholds, classifier_metrics = self.train_supervised(X, labels)
+        if classifier is not None and not self.classifier_acceptable(classifier_metrics):
+            logger.warning(f"Rejected fraud classifier candidate: {classifier_metrics}")
+            classifier, thresholds = None, None
+        if classifier is None and self.current_classifier is not None:
+            # Too few labels (or a worse candidate): keep serving the last good classifier
+            classifier, thresholds = self.current_classifier, self.current_thresholds
+            classifier_metrics = {
+                key: value for key, value in self.current_metrics.items()
+                if key.startswith(("classifier_", "flag_"))
+            }
+        if classifier is not None:
+            metrics.update(classifier_metrics)
+
+        version = self.registry.publish({
+            "model": model,
+            "scaler": scaler,
+            "classifier": classifier,
+            "thresholds": thresholds,
+            "metrics": metrics,
+            "last_event_id": self.last_event_id,
+            "trained_at": datetime.utcnow().isoformat()
+        })
+        self.current_metrics = metrics
+        self.current_classifier, self.current_thresholds = classifier, thresholds
+        logger.info(f"Published fraud model v{version}: {metrics}")
+        return version
+
+    def window_labels(self) -> List[Optional[int]]:
+        """Label of every window event; labels ingested later override those recorded at scoring"""
+        labels = [label for _, label, _ in self.window]
+        if self.events is None:
+            return labels
+        transaction_ids = [transaction_id for _, _, transaction_id in self.window if transaction_id]
+        known = self.events.labels(transaction_ids)
+        return [
+            known.get(transaction_id, label) if transaction_id else label
+            for (_, label, transaction_id) in self.window
+        ]
+
+    def validate(self, model: IsolationForest, X_holdout: np.ndarray, labels: List[Optional[int]]) -> Dict[str, Any]:
+        metrics: Dict[str, Any] = {
+            "holdout_events": len(X_holdout),
+            "holdout_anomaly_rate": round(float(np.mean(model.predict(X_holdout) == -1)), 4)
+        }
+
+        labelled = [(i, label) for i, label in enumerate(labels) if label is not None]
+        if len({label for _, label in labelled}) == 2:
+            rows = [i for i, _ in labelled]
+            # decision_function is higher for normal points; negate it to score fraud
+            metrics["holdout_auc"] = round(float(roc_auc_score(
+                [label for _, label in labelled], -model.decision_function(X_holdout[rows])
+            )), 4)
+        return metrics
+
+    def train_supervised(
+        self,
+        X: np.ndarray,
+        labels: List[Optional[int]]
+    ) -> Tuple[Optional[FraudClassifier], Optional[Dict[str, float]], Dict[str, Any]]:
+        """Classifier and its risk thresholds on the labelled part of the window
+
+        Train, calibration and holdout slices are taken in time order; the thresholds
+        come from the calibrated holdout probabilities.
+        """
+        labelled = [i for i, label in enumerate(labels) if label is not None]
+        y = np.asarray([labels[i] for i in labelled], dtype=int)
+        if len(labelled) < self.min_train_events or y.sum() < self.min_positive_labels:
+            return None, None, {}
+
+        X = X[labelled]
+        train_end = int(len(X) * (1 - 2 * self.holdout_fraction))
+        calibration_end = int(len(X) * (1 - self.holdout_fraction))
+        slices = [(X[:train_end], y[:train_end]), (X[train_end:calibration_end], y[train_end:calibration_end]),
+                  (X[calibration_end:], y[calibration_end:])]
+        if any(len(set(part.tolist())) < 2 for _, part in slices):
+            return None, None, {}
+
+        (X_train, y_train), (X_calibration, y_calibration), (X_holdout, y_holdout) = slices
+        classifier = train_classifier(X_train, y_train, X_calibration, y_calibration)
+        metrics = evaluate_classifier(classifier, X_holdout, y_holdout)
+        probabilities = classifier.predict_proba(X_holdout)
+        thresholds = choose_thresholds(probabilities, y_holdout)
+        metrics.update(threshold_metrics(probabilities, y_holdout, thresholds["medium"]))
+        metrics["classifier_training_events"] = len(X_train)
+        return classifier, thresholds, metrics
+
+    def classifier_acceptable(self, metrics: Dict[str, Any]) -> bool:
+        floor = self.min_classifier_auc
+        previous_auc = self.current_metrics.get("classifier_auc")
+        if previous_auc is not None:
+            floor = max(floor, previous_auc - self.max_auc_drop)
+        return metrics["classifier_auc"] >= floor
+
+    def acceptable(self, metrics: Dict[str, Any]) -> bool:
+        if abs(metrics["holdout_anomaly_rate"] - self.contamination) > self.max_anomaly_rate_drift:
+            return False
+        previous_auc = self.current_metrics.get("holdout_auc")
+        if previous_auc is not None and "holdout_auc" in metrics:
+            return metrics["holdout_auc"] >= previous_auc - self.max_auc_drop
+        return True
@@ -0,0 +1,220 @@
+"""
+Durable Batch Job Queue for GariPamoja AI Services
+Persists batch jobs in a Redis stream for consumption by separate worker processes
+"""
+
+import os
+import uuid
+import logging
+from typing import Dict, List, Optional, Any
+from datetime import datetime
+
+from services import serialization
+
+logger = logging.getLogger(__name__)
+
+# Append a chunk's results only if it is the next one, so a duplicate run of the same
+# job (reclaimed while still alive) cannot store a chunk twice or skip one
+RECORD_CHUNK_SCRIPT = """
+if tonumber(redis.call("hget", KEYS[1], "completed_chunks")) ~= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call("rpush", KEYS[2], ARGV[2])
+redis.call("hset", KEYS[1], "completed_chunks", tonumber(ARGV[1]) + 1)
+redis.call("hincrby", KEYS[1], "processed_items", ARGV[3])
+redis.call("hincrby", KEYS[1], "failed_items", ARGV[4])
+return 1
+"""
+
+
+class JobQueue:
+    """Redis stream job queue with per-job progress and chunked results"""
+
+    STREAM = "ai_jobs:stream"
+    GROUP = "ai_job_workers"
+
+    TASK_TYPES = ("pricing_analysis", "fraud_analysis", "content_moderation")
+
+    # Job lifecycle
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+    def __init__(self, redis_client):
+        self.redis_client = redis_client
+        self.chunk_size = int(os.getenv("JOB_CHUNK_SIZE", "50"))
+        self.result_ttl = int(os.getenv("JOB_RESULT_TTL_SECONDS", "604800"))  # 7 days
+        self.max_attempts = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+        self.record_chunk_script = redis_client.register_script(RECORD_CHUNK_SCRIPT)
+
+    def ensure_group(self):
+        """Create the consumer group (and stream) if missing"""
+        try:
+            self.redis_client.xgroup_create(self.STREAM, self.GROUP, id="0", mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    def submit(self, task_type: str, data: List[Any], chunk_size: Optional[int] = None) -> str:
+        """Persist a job and enqueue it; returns the job id"""
+        job_id = uuid.uuid4().hex
+        chunk_size = chunk_size or self.chunk_size
+        total_chunks = (len(data) + chunk_size - 1) // chunk_size
+
+        pipe = self.redis_client.pipeline(transaction=True)
+        pipe.hset(self.job_key(job_id), mapping={
+            "job_id": job_id,
+            "task_type": task_type,
+            "status": self.QUEUED,
+            "total_items": len(data),
+            "processed_items": 0,
+            "failed_items": 0,
+            "chunk_size": chunk_size,
+            "total_chunks": total_chunks,
+            "completed_chunks": 0,
+            "attempts": 0,
+            "created_at": datetime.utcnow().isoformat()
+        })
+        pipe.set(self.payload_key(job_id), serialization.dumps(data))
+        pipe.xadd(self.STREAM, {"job_id": job_id})
+        pipe.execute()
+
+        return job_id
+
+    def get_status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Job metadata and progress, or None if unknown/expired"""
+        job = self.redis_client.hgetall(self.job_key(job_id))
+        if not job:
+            return None
+
+        for field in ("total_items", "processed_items", "failed_items", "chunk_size", "total_chunks", "completed_chunks", "attempts"):
+            job[field] = int(job.get(field, 0))
+        job["progress"] = round(job["completed_chunks"] / job["total_chunks"], 4) if job["total_chunks"] else 1.0
+        return job
+
+    def get_results(self, job_id: str, offset: int = 0, limit: int = 100) -> List[Any]:
+        """Per-item results in submission order, reading only the chunks needed
+
+        Every chunk but the last holds exactly chunk_size results (the worker rejects
+        handler output of any other length), so offsets map straight to chunks.
+        """
+        if limit <= 0:
+            return []
+        chunk_size = int(self.redis_client.hget(self.job_key(job_id), "chunk_size") or 1)
+        first_chunk = offset // chunk_size
+        last_chunk = (offset + limit - 1) // chunk_size
+
+        results = []
+        for chunk in self.redis_client.lrange(self.results_key(job_id), first_chunk, last_chunk):
+            results.extend(serialization.loads(chunk))
+
+        skip = offset - first_chunk * chunk_size
+        return results[skip:skip + limit]
+
+    def load_payload(self, job_id: str) -> List[Any]:
+        payload = self.redis_client.get(self.payload_key(job_id))
+        return serialization.loads(payload) if payload else []
+
+    def mark_running(self, job_id: str) -> Optional[Dict[str, Any]]:
+        if not self.redis_client.exists(self.job_key(job_id)):
+            return None
+        pipe = self.redis_client.pipeline(transaction=True)
+        pipe.hset(self.job_key(job_id), mapping={
+            "status": self.RUNNING,
+            "started_at": datetime.utcnow().isoformat()
+        })
+        pipe.hincrby(self.job_key(job_id), "attempts", 1)
+        pipe.execute()
+        return self.get_status(job_id)
+
+    def record_chunk(self, job_id: str, chunk_index: int, results: List[Any]) -> bool:
+        """Store one chunk's results and advance progress atomically
+
+        False when chunk_index is not the next chunk: another worker already stored it.
+        Items whose result is {"error": ...} count as failed.
+        """
+        failed = sum(1 for result in results if isinstance(result, dict) and "error" in result)
+        stored = self.record_chunk_script(
+            keys=[self.job_key(job_id), self.results_key(job_id)],
+            args=[chunk_index, serialization.dumps(results), len(results), failed]
+        )
+        return bool(int(stored))
+
+    def finish(self, job_id: str, message_id: str, error: Optional[str] = None):
+        """Mark a job terminal, acknowledge it and start the retention clock"""
+        fields = {
+            "status": self.FAILED if error else self.COMPLETED,
+            "finished_at": datetime.utcnow().isoformat()
+        }
+        if error:
+            fields["error"] = error
+
+        pipe = self.redis_client.pipeline(transaction=True)
+        pipe.hset(self.job_key(job_id), mapping=fields)
+        pipe.delete(self.payload_key(job_id))
+        pipe.expire(self.job_key(job_id), self.result_ttl)
+        pipe.expire(self.results_key(job_id), self.result_ttl)
+        pipe.xack(self.STREAM, self.GROUP, message_id)
+        pipe.xdel(self.STREAM, message_id)
+        pipe.execute()
+
+    def requeue(self, job_id: str, message_id: str, error: str):
+        """Return a failed attempt to the queue, keeping completed chunks"""
+        pipe = self.redis_client.pipeline(transaction=True)
+        pipe.hset(self.job_key(job_id), mapping={"status": self.QUEUED, "last_error": error})
+        pipe.xack(self.STREAM, self.GROUP, message_id)
+        pipe.xdel(self.STREAM, message_id)
+        pipe.xadd(self.STREAM, {"job_id": job_id})
+        pipe.execute()
+
+    def read(self, consumer: str, count: int, block_ms: int) -> List[tuple]:
+        """Claim new messages for this consumer as (message_id, job_id) pairs"""
+        response = self.redis_client.xreadgroup(
+            self.GROUP, consumer, {self.STREAM: ">"}, count=count, block=block_ms
+        )
+        return [
+            (message_id, fields["job_id"])
+            for _, messages in response or []
+            for message_id, fields in messages
+        ]
+
+    def reclaim(self, consumer: str, min_idle_ms: int, count: int) -> List[tuple]:
+        """Take over messages left pending by crashed workers"""
+        response = self.redis_client.xautoclaim(
+            self.STREAM, self.GROUP, consumer, min_idle_time=min_idle_ms, start_id="0-0", count=count
+        )
+        return [(message_id, fields["job_id"]) for message_id, fields in response[1] if fields]
+
+    def heartbeat(self, consumer: str, message_id: str) -> bool:
+        """Reset the idle time of a message this consumer still holds, so reclaim leaves it alone
+
+        False once another worker has reclaimed the message; the caller should stop.
+        """
+        pending = self.redis_client.xpending_range(
+            self.STREAM, self.GROUP, min=message_id, max=message_id, count=1
+        )
+        if not pending or pending[0]["consumer"] != consumer:
+            return False
+        self.redis_client.xclaim(
+            self.STREAM, self.GROUP, consumer, min_idle_time=0, message_ids=[message_id], justid=True
+        )
+        return True
+
+    def depth(self) -> Dict[str, int]:
+        """Waiting and in-flight message counts"""
+        try:
+            pending = self.redis_client.xpending(self.STREAM, self.GROUP)["pending"]
+            return {"waiting": max(self.redis_client.xlen(self.STREAM) - pending, 0), "in_flight": pending}
+        except Exception as e:
+            logger.error(f"Error getting job queue depth: {str(e)}")
+            return {"waiting": 0, "in_flight": 0}
+
+    def job_key(self, job_id: str) -> str:
+        return f"ai_job:{job_id}"
+
+    def payload_key(self, job_id: str) -> str:
+        return f"ai_job:{job_id}:payload"
+
+    def results_key(self, job_id: str) -> str:
+        return f"ai_job:{job_id}:results"
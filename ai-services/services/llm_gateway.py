@@ -0,0 +1,374 @@
+"""
+LLM Provider Gateway for GariPamoja
+Routes chat completions across OpenAI and Anthropic with pooling, deadlines,
+retries, hedging and circuit breaking
+"""
+
+import os
+import time
+import random
+import asyncio
+import bisect
+import logging
+from typing import Dict, List, Optional, Any
+import httpx
+import openai
+import anthropic
+
+from services.metrics import LLM_LATENCY, LLM_HEDGES, LLM_CIRCUIT_OPEN
+
+logger = logging.getLogger(__name__)
+
+
+class LLMProviderError(Exception):
+    """Raised when no provider could produce a completion"""
+
+
+class CircuitOpenError(LLMProviderError):
+    """Raised when a provider is skipped because its circuit is open"""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a half-open probe"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.failures = 0
+        self.opened_at = 0.0
+        self._state = self.CLOSED
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self.opened_at >= self.recovery_timeout:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def allow_request(self) -> bool:
+        """Return True if a call may be sent to the provider"""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._probe_in_flight:
+            # Let exactly one probe through to test recovery
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def release_probe(self):
+        """Give back a half-open probe slot whose call was abandoned"""
+        self._probe_in_flight = False
+
+    def record_success(self):
+        self.failures = 0
+        self._probe_in_flight = False
+        self._state = self.CLOSED
+
+    def record_failure(self):
+        self.failures += 1
+        self._probe_in_flight = False
+        if self._state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self._state = self.OPEN
+            self.opened_at = time.monotonic()
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram with percentile estimates"""
+
+    DEFAULT_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 8.0, 13.0, 20.0, 30.0, 60.0)
+
+    def __init__(self, buckets: Optional[tuple] = None):
+        self.buckets = tuple(buckets or self.DEFAULT_BUCKETS)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.total += 1
+        self.sum += seconds
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Upper bucket bound containing the q-th quantile"""
+        if self.total == 0:
+            return None
+        target = q * self.total
+        running = 0
+        for index, count in enumerate(self.counts):
+            running += count
+            if running >= target:
+                return self.buckets[index] if index < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.total,
+            "mean": round(self.sum / self.total, 4) if self.total else None,
+            "p50": self.percentile(0.50),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+            "buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"], self.counts))
+        }
+
+
+class OpenAIProvider:
+    """OpenAI chat completions over the shared connection pool"""
+
+    name = "openai"
+
+    def __init__(self, http_client: httpx.AsyncClient, model: str):
+        self.model = model
+        self.client = openai.AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            base_url=os.getenv("OPENAI_BASE_URL") or None,
+            http_client=http_client,
+            max_retries=0  # Retries are handled by the gateway
+        )
+
+    async def complete(
+        self,
+        messages: List[Dict[str, str]],
+        system: Optional[str],
+        max_tokens: int,
+        temperature: float,
+        timeout: float
+    ) -> str:
+        payload = [{"role": "system", "content": system}] if system else []
+        payload.extend(messages)
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=payload,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            timeout=timeout
+        )
+        return response.choices[0].message.content or ""
+
+
+class AnthropicProvider:
+    """Anthropic messages API over the shared connection pool"""
+
+    name = "anthropic"
+
+    def __init__(self, http_client: httpx.AsyncClient, model: str):
+        self.model = model
+        self.client = anthropic.AsyncAnthropic(
+            api_key=os.getenv("ANTHROPIC_API_KEY"),
+            base_url=os.getenv("ANTHROPIC_BASE_URL") or None,
+            http_client=http_client,
+            max_retries=0  # Retries are handled by the gateway
+        )
+
+    async def complete(
+        self,
+        messages: List[Dict[str, str]],
+        system: Optional[str],
+        max_tokens: int,
+        temperature: float,
+        timeout: float
+    ) -> str:
+        kwargs = {"system": system} if system else {}
+        response = await self.client.messages.create(
+            model=self.model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            timeout=timeout,
+            **kwargs
+        )
+        return response.content[0].text
+
+
+class LLMGateway:
+    """Single entry point for LLM completions with tail-latency protection"""
+
+    def __init__(self):
+        # Configuration
+        self.deadline = float(os.getenv("LLM_DEADLINE_SECONDS", "20"))
+        self.connect_timeout = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "3"))
+        self.max_retries = int(os.getenv("LLM_MAX_RETRIES", "2"))
+        self.backoff_base = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "0.25"))
+        self.backoff_cap = float(os.getenv("LLM_BACKOFF_CAP_SECONDS", "2"))
+        self.hedge_delay = float(os.getenv("LLM_HEDGE_DELAY_SECONDS", "4"))
+        self.hedging_enabled = os.getenv("LLM_HEDGING_ENABLED", "true").lower() == "true"
+
+        # One HTTP/2 connection pool shared by every provider client
+        self.http_client = httpx.AsyncClient(
+            http2=True,
+            timeout=httpx.Timeout(self.deadline, connect=self.connect_timeout),
+            limits=httpx.Limits(
+                max_connections=int(os.getenv("LLM_POOL_MAX_CONNECTIONS", "100")),
+                max_keepalive_connections=int(os.getenv("LLM_POOL_MAX_KEEPALIVE", "20")),
+                keepalive_expiry=30.0
+            )
+        )
+
+        self.providers = {
+            "openai": OpenAIProvider(self.http_client, os.getenv("OPENAI_CHAT_MODEL", "gpt-4")),
+            "anthropic": AnthropicProvider(
+                self.http_client, os.getenv("ANTHROPIC_CHAT_MODEL", "claude-3-sonnet-20240229")
+            )
+        }
+
+        failure_threshold = int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", "5"))
+        recovery_timeout = float(os.getenv("LLM_BREAKER_RECOVERY_SECONDS", "30"))
+        self.breakers = {
+            name: CircuitBreaker(failure_threshold, recovery_timeout) for name in self.providers
+        }
+        self.histograms = {name: LatencyHistogram() for name in self.providers}
+        self.errors = {name: 0 for name in self.providers}
+
+    async def complete(
+        self,
+        messages: List[Dict[str, str]],
+        system: Optional[str] = None,
+        primary: str = "openai",
+        max_tokens: int = 500,
+        temperature: float = 0.7,
+        deadline: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Get a completion, hedging to the secondary provider on slow primaries"""
+        deadline = deadline or self.deadline
+        expires_at = time.monotonic() + deadline
+        order = self.provider_order(primary)
+
+        if not order:
+            raise CircuitOpenError("All LLM providers are unavailable")
+
+        call_args = (messages, system, max_tokens, temperature, expires_at)
+
+        try:
+            if len(order) == 1 or not self.hedging_enabled:
+                return await asyncio.wait_for(self.call_with_fallback(order, *call_args), deadline)
+            return await asyncio.wait_for(self.hedged_call(order[0], order[1], *call_args), deadline)
+        except asyncio.TimeoutError:
+            raise LLMProviderError(f"LLM deadline of {deadline}s exceeded")
+
+    def provider_order(self, primary: str) -> List[str]:
+        """Providers to try, primary first, skipping open circuits"""
+        names = [primary] + [name for name in self.providers if name != primary]
+        return [name for name in names if name in self.providers and self.breakers[name].state != CircuitBreaker.OPEN]
+
+    async def call_with_fallback(self, order: List[str], *call_args) -> Dict[str, Any]:
+        last_error = None
+        for name in order:
+            try:
+                return await self.call_with_retries(name, *call_args)
+            except LLMProviderError as e:
+                last_error = e
+        raise last_error or LLMProviderError("No LLM provider available")
+
+    async def hedged_call(self, primary: str, secondary: str, *call_args) -> Dict[str, Any]:
+        """Race the primary against a delayed secondary; first success wins"""
+        primary_task = asyncio.create_task(self.call_with_retries(primary, *call_args))
+        tasks = {primary_task}
+
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_delay)
+            if not done or primary_task.exception() is not None:
+                # Primary is slow or already failed - send the hedge
+                LLM_HEDGES.labels(provider=secondary).inc()
+                tasks.add(asyncio.create_task(self.call_with_retries(secondary, *call_args)))
+
+            last_error = None
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+            raise last_error or LLMProviderError("No LLM provider available")
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def call_with_retries(
+        self,
+        name: str,
+        messages: List[Dict[str, str]],
+        system: Optional[str],
+        max_tokens: int,
+        temperature: float,
+        expires_at: float
+    ) -> Dict[str, Any]:
+        provider = self.providers[name]
+        breaker = self.breakers[name]
+        last_error = None
+
+        for attempt in range(self.max_retries + 1):
+            remaining = expires_at - time.monotonic()
+            if remaining <= 0:
+                break
+            if not breaker.allow_request():
+                raise CircuitOpenError(f"Circuit open for {name}")
+
+            started = time.monotonic()
+            try:
+                text = await provider.complete(messages, system, max_tokens, temperature, remaining)
+            except asyncio.CancelledError:
+                # Lost a hedge race; not the provider's fault
+                breaker.release_probe()
+                raise
+            except Exception as e:
+                elapsed = time.monotonic() - started
+                self.histograms[name].observe(elapsed)
+                LLM_LATENCY.labels(provider=name, outcome="error").observe(elapsed)
+                self.errors[name] += 1
+                breaker.record_failure()
+                LLM_CIRCUIT_OPEN.labels(provider=name).set(int(breaker.state == CircuitBreaker.OPEN))
+                last_error = e
+                logger.warning(f"LLM provider {name} attempt {attempt + 1} failed: {str(e)}")
+
+                if not self.is_retryable(e):
+                    break
+                backoff = random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+                if time.monotonic() + backoff >= expires_at:
+                    break
+                await asyncio.sleep(backoff)
+                continue
+
+            elapsed = time.monotonic() - started
+            self.histograms[name].observe(elapsed)
+            LLM_LATENCY.labels(provider=name, outcome="success").observe(elapsed)
+            breaker.record_success()
+            LLM_CIRCUIT_OPEN.labels(provider=name).set(0)
+            return {"text": text, "provider": name, "latency": round(elapsed, 4)}
+
+        raise LLMProviderError(f"{name} failed: {str(last_error) if last_error else 'deadline exceeded'}")
+
+    def is_retryable(self, error: Exception) -> bool:
+        """Retry timeouts, connection errors, rate limits and 5xx responses"""
+        if isinstance(error, (httpx.TimeoutException, httpx.TransportError, asyncio.TimeoutError)):
+            return True
+        for module in (openai, anthropic):
+            if isinstance(error, (module.APITimeoutError, module.APIConnectionError, module.RateLimitError)):
+                return True
+            if isinstance(error, module.APIStatusError):
+                return error.status_code >= 500
+        return False
+
+    def is_healthy(self) -> bool:
+        """Healthy while at least one provider circuit is not open"""
+        return any(breaker.state != CircuitBreaker.OPEN for breaker in self.breakers.values())
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-provider latency, error and circuit state"""
+        return {
+            name: {
+                "circuit": self.breakers[name].state,
+                "errors": self.errors[name],
+                "latency": self.histograms[name].snapshot()
+            }
+            for name in self.providers
+        }
+
+    async def aclose(self):
+        await self.http_client.aclose()
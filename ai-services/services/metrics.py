@@ -0,0 +1,142 @@
+"""
+Prometheus Instrumentation for GariPamoja AI Services
+Shared metric definitions and timing helpers; labels are kept low-cardinality
+"""
+
+import os
+import time
+import asyncio
+import logging
+from contextlib import contextmanager
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    CONTENT_TYPE_LATEST,
+    generate_latest,
+)
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0)
+
+# HTTP layer - route is the path template, never the raw URL
+REQUEST_LATENCY = Histogram(
+    "ai_http_request_duration_seconds",
+    "HTTP request latency",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "ai_http_requests_in_progress",
+    "HTTP requests currently being served",
+    ["route"]
+)
+
+# Service stages (feature_extraction, model_inference, redis, llm, rag_retrieval, ...)
+STAGE_LATENCY = Histogram(
+    "ai_stage_duration_seconds",
+    "Latency of individual service stages",
+    ["service", "stage"],
+    buckets=STAGE_BUCKETS
+)
+
+CACHE_REQUESTS = Counter(
+    "ai_cache_requests_total",
+    "Cache lookups by outcome",
+    ["cache", "result"]
+)
+
+BATCH_SIZE = Histogram(
+    "ai_batch_size",
+    "Items per batch submitted for processing",
+    ["task_type"],
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+)
+
+QUEUE_DEPTH = Gauge(
+    "ai_queue_depth",
+    "Work items waiting or in flight",
+    ["queue"]
+)
+
+# Single-flight: role is leader, follower (same process) or remote_follower (another worker)
+COALESCED_REQUESTS = Counter(
+    "ai_coalesced_requests_total",
+    "Requests by single-flight role",
+    ["operation", "role"]
+)
+
+# Admission control: shed reason is user_rate, endpoint_rate or queue_deadline
+ADMISSION_SHED = Counter(
+    "ai_admission_shed_total",
+    "Requests rejected by rate limits or load shedding",
+    ["priority", "reason"]
+)
+ADMISSION_WAIT = Histogram(
+    "ai_admission_queue_seconds",
+    "Time spent waiting for a concurrency slot",
+    ["priority"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0)
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    "ai_admission_in_flight",
+    "Requests holding a concurrency slot",
+    ["priority"]
+)
+
+EVENT_LOOP_LAG = Histogram(
+    "ai_event_loop_lag_seconds",
+    "Delay between scheduled and actual event loop wake-ups",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+
+LLM_LATENCY = Histogram(
+    "ai_llm_request_duration_seconds",
+    "LLM provider call latency",
+    ["provider", "outcome"],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 8.0, 13.0, 20.0, 30.0, 60.0)
+)
+LLM_HEDGES = Counter(
+    "ai_llm_hedged_requests_total",
+    "Hedged requests sent to a secondary provider",
+    ["provider"]
+)
+LLM_CIRCUIT_OPEN = Gauge(
+    "ai_llm_circuit_open",
+    "1 while a provider circuit breaker is open",
+    ["provider"]
+)
+
+
+@contextmanager
+def track_stage(service: str, stage: str):
+    """Time a block of work as a service stage"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.labels(service=service, stage=stage).observe(time.perf_counter() - started)
+
+
+async def monitor_event_loop_lag(interval: float = 0.5):
+    """Sample how late the loop wakes us up; runs until cancelled"""
+    loop = asyncio.get_running_loop()
+    while True:
+        scheduled = loop.time() + interval
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(loop.time() - scheduled, 0.0))
+
+
+def render_metrics() -> tuple:
+    """Exposition payload and content type, multiprocess-aware"""
+    registry = REGISTRY
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
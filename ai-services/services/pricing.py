@@ -15,11 +15,27 @@ from sklearn.preprocessing import StandardScaler
 import redis
 import requests
 
+from services.analytics import read_metrics
+from services.metrics import track_stage
+from services.executor import cpu_bound, cpu_executor
+from services.cache import cached, tiered_cache
+from services.data_access import data_access, DEFAULT_MARKET_DATA
+
 logger = logging.getLogger(__name__)
 
 class PricingService:
     """AI-powered dynamic pricing service"""
     
+    # Analytics counters: field -> (redis key, type, default)
+    ANALYTICS_METRICS = {
+        "total_suggestions": ("pricing_suggestions_total", int, 0),
+        "average_accuracy": ("pricing_accuracy", float, 0.75),
+        "revenue_impact": ("pricing_revenue_impact", float, 0.15)
+    }
+    
+    # Attributes shipped to CPU pool workers when they start
+    CPU_BOUND_STATE = ("model", "scaler", "is_trained")
+    
     def __init__(self):
         self.redis_client = redis.Redis.from_url(
             os.getenv("REDIS_URL", "redis://localhost:6379/1"),
@@ -65,12 +81,11 @@ class PricingService:
             logger.error(f"Error loading historical data: {str(e)}")
             self.historical_data = pd.DataFrame()
     
-    def generate_synthetic_data(self) -> pd.DataFrame:
+    def generate_synthetic_data(self, n_samples: int = 1000) -> pd.DataFrame:
         """Generate synthetic pricing data for model training"""
         np.random.seed(42)
         
-        # Generate 1000 historical bookings
-        n_samples = 1000
+        # Generate historical bookings (1000 by default)
         
         data = {
             'car_type': np.random.choice(['sedan', 'suv', 'luxury', 'sports'], n_samples),
@@ -90,6 +105,7 @@ class PricingService:
         
         return pd.DataFrame(data)
     
+    @cached("pricing", ttl=300, stale_ttl=600, cacheable=lambda response: bool(response.get("factors")))
     async def suggest_price(
         self,
         car_id: str,
@@ -101,42 +117,7 @@ class PricingService:
     ) -> Dict[str, Any]:
         """Suggest optimal price for car rental"""
         try:
-            # Parse dates
-            start_dt = datetime.strptime(start_date, "%Y-%m-%d")
-            end_dt = datetime.strptime(end_date, "%Y-%m-%d")
-            duration_days = (end_dt - start_dt).days
-            
-            # Calculate demand factors
-            demand_score = self.calculate_demand_score(
-                start_dt, end_dt, location, demand_factors
-            )
-            
-            # Get market data
-            market_data = await self.get_market_data(location, car_id)
-            
-            # Calculate optimal price
-            suggested_price = self.calculate_optimal_price(
-                base_price, demand_score, market_data, duration_days
-            )
-            
-            # Generate recommendations
-            recommendations = self.generate_recommendations(
-                suggested_price, base_price, demand_score, market_data
-            )
-            
-            return {
-                "suggested_price": round(suggested_price, 2),
-                "confidence": self.calculate_confidence(demand_score, market_data),
-                "factors": {
-                    "demand_score": demand_score,
-                    "seasonal_factor": self.get_seasonal_factor(start_dt),
-                    "location_premium": self.get_location_premium(location),
-                    "duration_discount": self.get_duration_discount(duration_days),
-                    "market_competition": market_data.get("competition_level", "medium")
-                },
-                "recommendations": recommendations
-            }
-            
+            return await self.price_suggestion(car_id, base_price, location, start_date, end_date, demand_factors)
         except Exception as e:
             logger.error(f"Error suggesting price: {str(e)}")
             return {
@@ -146,6 +127,56 @@ class PricingService:
                 "recommendations": ["Unable to calculate optimal price"]
             }
     
+    async def price_suggestion(
+        self,
+        car_id: str,
+        base_price: float,
+        location: str,
+        start_date: str,
+        end_date: str,
+        demand_factors: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Optimal price for car rental; raises when it cannot be computed"""
+        # Parse dates
+        start_dt = datetime.strptime(start_date, "%Y-%m-%d")
+        end_dt = datetime.strptime(end_date, "%Y-%m-%d")
+        duration_days = (end_dt - start_dt).days
+        
+        # Calculate demand factors
+        with track_stage("pricing", "feature_extraction"):
+            demand_score = self.calculate_demand_score(
+                start_dt, end_dt, location, demand_factors
+            )
+        
+        # Get market data
+        with track_stage("pricing", "market_data"):
+            market_data = await self.get_market_data(location, car_id)
+        
+        # Calculate optimal price
+        with track_stage("pricing", "model_inference"):
+            suggested_price = await cpu_executor.run(
+                self, "calculate_optimal_price",
+                base_price, demand_score, market_data, duration_days
+            )
+        
+        # Generate recommendations
+        recommendations = self.generate_recommendations(
+            suggested_price, base_price, demand_score, market_data
+        )
+        
+        return {
+            "suggested_price": round(suggested_price, 2),
+            "confidence": self.calculate_confidence(demand_score, market_data),
+            "factors": {
+                "demand_score": demand_score,
+                "seasonal_factor": self.get_seasonal_factor(start_dt),
+                "location_premium": self.get_location_premium(location),
+                "duration_discount": self.get_duration_discount(duration_days),
+                "market_competition": market_data.get("competition_level", "medium")
+            },
+            "recommendations": recommendations
+        }
+    
     def calculate_demand_score(
         self,
         start_date: datetime,
@@ -237,25 +268,13 @@ class PricingService:
     async def get_market_data(self, location: str, car_id: str) -> Dict[str, Any]:
         """Get market data for pricing analysis"""
         try:
-            # This would typically query the database
-            # For now, return synthetic data
-            return {
-                "competition_count": np.random.randint(10, 50),
-                "competition_level": np.random.choice(["low", "medium", "high"]),
-                "average_price": np.random.uniform(80, 150),
-                "price_variance": np.random.uniform(10, 30),
-                "demand_trend": np.random.choice(["increasing", "stable", "decreasing"])
-            }
+            # Competition and demand are per city; the car itself does not change them
+            return await data_access.get_market_data(location)
         except Exception as e:
             logger.error(f"Error getting market data: {str(e)}")
-            return {
-                "competition_count": 20,
-                "competition_level": "medium",
-                "average_price": 100,
-                "price_variance": 20,
-                "demand_trend": "stable"
-            }
+            return dict(DEFAULT_MARKET_DATA)
     
+    @cpu_bound
     def calculate_optimal_price(
         self,
         base_price: float,
@@ -389,23 +408,25 @@ class PricingService:
         
         return recommendations
     
-    async def batch_analyze(self, data: List[Dict[str, Any]]):
-        """Batch analyze pricing data"""
-        try:
-            for item in data:
-                await self.suggest_price(
+    async def batch_analyze(self, data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Batch analyze pricing data, returning one result per item; failed items get {"error": ...}"""
+        results = []
+        for item in data:
+            try:
+                results.append(await self.price_suggestion(
                     car_id=item.get("car_id"),
                     base_price=item.get("base_price"),
                     location=item.get("location"),
                     start_date=item.get("start_date"),
                     end_date=item.get("end_date"),
                     demand_factors=item.get("demand_factors")
-                )
-            
-            logger.info(f"Batch analyzed {len(data)} pricing requests")
-            
-        except Exception as e:
-            logger.error(f"Error in batch analysis: {str(e)}")
+                ))
+            except Exception as e:
+                logger.error(f"Error in batch analysis: {str(e)}")
+                results.append({"error": str(e)})
+        
+        logger.info(f"Batch analyzed {len(data)} pricing requests")
+        return results
     
     def is_healthy(self) -> bool:
         """Check if the service is healthy"""
@@ -449,6 +470,7 @@ class PricingService:
                 
                 self.model.fit(X, y)
                 self.is_trained = True
+                tiered_cache.invalidate_namespace("pricing")
                 
                 logger.info("Pricing model updated successfully")
             
@@ -457,13 +479,17 @@ class PricingService:
     
     async def get_model_status(self) -> Dict[str, Any]:
         """Get model status information"""
+        return self.build_model_status(read_metrics(self.redis_client, self.ANALYTICS_METRICS))
+    
+    def build_model_status(self, metrics: Dict[str, Any]) -> Dict[str, Any]:
+        """Compose model status from pre-fetched analytics metrics"""
         return {
             "status": "active" if self.is_trained else "training",
             "model": "random_forest",
             "last_updated": datetime.utcnow().isoformat(),
             "performance": {
-                "accuracy": await self.get_average_accuracy(),
-                "revenue_impact": await self.get_revenue_impact(),
-                "total_suggestions": await self.get_total_suggestions()
+                "accuracy": metrics["average_accuracy"],
+                "revenue_impact": metrics["revenue_impact"],
+                "total_suggestions": metrics["total_suggestions"]
             }
         } 
\ No newline at end of file
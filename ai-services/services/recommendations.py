@@ -14,11 +14,26 @@ from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.feature_extraction.text import TfidfVectorizer
 import redis
 
+from services.analytics import read_metrics
+from services.metrics import track_stage
+from services.executor import cpu_bound, cpu_executor
+from services.cache import cached, tiered_cache
+
 logger = logging.getLogger(__name__)
 
 class RecommendationService:
     """AI-powered recommendation service"""
     
+    # Analytics counters: field -> (redis key, type, default)
+    ANALYTICS_METRICS = {
+        "total_recommendations": ("recommendations_total", int, 0),
+        "conversion_rate": ("recommendations_conversion_rate", float, 0.25),
+        "average_rating": ("recommendations_average_rating", float, 4.2)
+    }
+    
+    # Attributes shipped to CPU pool workers when they start
+    CPU_BOUND_STATE = ("recommendation_data", "car_similarity_matrix")
+    
     def __init__(self):
         self.redis_client = redis.Redis.from_url(
             os.getenv("REDIS_URL", "redis://localhost:6379/1"),
@@ -43,14 +58,13 @@ class RecommendationService:
             logger.error(f"Error loading recommendation data: {str(e)}")
             self.recommendation_data = pd.DataFrame()
     
-    def generate_synthetic_data(self) -> pd.DataFrame:
+    def generate_synthetic_data(self, n_samples: int = 1000, n_cars: int = 100) -> pd.DataFrame:
         """Generate synthetic recommendation data"""
         np.random.seed(42)
-        n_samples = 1000
         
         data = {
             'user_id': [f"user_{i}" for i in range(n_samples)],
-            'car_id': [f"car_{np.random.randint(1, 100)}" for _ in range(n_samples)],
+            'car_id': [f"car_{np.random.randint(1, n_cars)}" for _ in range(n_samples)],
             'rating': np.random.randint(1, 6, n_samples),
             'booking_count': np.random.randint(1, 10, n_samples),
             'car_type': np.random.choice(['sedan', 'suv', 'luxury', 'sports'], n_samples),
@@ -96,6 +110,7 @@ class RecommendationService:
         except Exception as e:
             logger.error(f"Error building similarity matrices: {str(e)}")
     
+    @cached("recommendations", ttl=120, stale_ttl=300, cacheable=lambda response: response.get("confidence", 0) > 0)
     async def get_recommendations(
         self,
         user_id: str,
@@ -106,16 +121,15 @@ class RecommendationService:
     ) -> Dict[str, Any]:
         """Get personalized car recommendations"""
         try:
-            # Get user preferences
-            user_prefs = self.get_user_preferences(user_id, preferences)
-            
             # Get available cars
-            available_cars = await self.get_available_cars(location, budget, dates)
+            with track_stage("recommendations", "candidate_retrieval"):
+                available_cars = await self.get_available_cars(location, budget, dates)
             
-            # Generate recommendations
-            recommendations = self.generate_recommendations(
-                user_id, user_prefs, available_cars
-            )
+            # Preference extraction and scoring run together off the event loop
+            with track_stage("recommendations", "model_inference"):
+                user_prefs, recommendations = await cpu_executor.run(
+                    self, "rank_cars", user_id, preferences, available_cars
+                )
             
             # Calculate confidence and reasoning
             confidence = self.calculate_confidence(user_id, user_prefs)
@@ -135,6 +149,17 @@ class RecommendationService:
                 "reasoning": "Unable to generate recommendations"
             }
     
+    @cpu_bound
+    def rank_cars(
+        self,
+        user_id: str,
+        preferences: Optional[Dict[str, Any]],
+        available_cars: List[Dict[str, Any]]
+    ) -> tuple:
+        """User preferences and the ranked recommendations built from them"""
+        user_prefs = self.get_user_preferences(user_id, preferences)
+        return user_prefs, self.generate_recommendations(user_id, user_prefs, available_cars)
+    
     def get_user_preferences(
         self,
         user_id: str,
@@ -393,8 +418,15 @@ class RecommendationService:
             logger.error(f"Error generating reasoning: {str(e)}")
             return "Personalized recommendations based on your preferences"
     
+    # Many viewers of one car page ask for the same neighbours at once; misses are computed once
+    @cached("similar_cars", ttl=3600, stale_ttl=3600, negative_ttl=60, is_negative=lambda cars: not cars)
     async def get_similar_cars(self, car_id: str, limit: int = 5) -> List[Dict[str, Any]]:
         """Get similar cars based on content-based filtering"""
+        return await cpu_executor.run(self, "find_similar_cars", car_id, limit)
+    
+    @cpu_bound
+    def find_similar_cars(self, car_id: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """Nearest cars in the similarity matrix"""
         try:
             if self.car_similarity_matrix is None:
                 return []
@@ -424,7 +456,7 @@ class RecommendationService:
                 similar_car_id = car_features.iloc[idx]['car_id']
                 similar_cars.append({
                     'car_id': similar_car_id,
-                    'similarity_score': round(similarity_scores[idx], 3)
+                    'similarity_score': round(float(similarity_scores[idx]), 3)
                 })
             
             return similar_cars
@@ -471,19 +503,25 @@ class RecommendationService:
         """Update the recommendation model with new data"""
         try:
             # This would typically retrain with new user interactions
+            tiered_cache.invalidate_namespace("recommendations")
+            tiered_cache.invalidate_namespace("similar_cars")
             logger.info("Recommendation model updated successfully")
         except Exception as e:
             logger.error(f"Error updating recommendation model: {str(e)}")
     
     async def get_model_status(self) -> Dict[str, Any]:
         """Get model status information"""
+        return self.build_model_status(read_metrics(self.redis_client, self.ANALYTICS_METRICS))
+    
+    def build_model_status(self, metrics: Dict[str, Any]) -> Dict[str, Any]:
+        """Compose model status from pre-fetched analytics metrics"""
         return {
             "status": "active",
             "model": "collaborative_filtering",
             "last_updated": datetime.utcnow().isoformat(),
             "performance": {
-                "total_recommendations": await self.get_total_recommendations(),
-                "conversion_rate": await self.get_conversion_rate(),
-                "average_rating": await self.get_average_rating()
+                "total_recommendations": metrics["total_recommendations"],
+                "conversion_rate": metrics["conversion_rate"],
+                "average_rating": metrics["average_rating"]
             }
         } 
\ No newline at end of file
@@ -0,0 +1,40 @@
+"""
+JSON Serialization for GariPamoja AI Services
+orjson-backed encoding for HTTP responses and Redis payloads, numpy-aware
+"""
+
+from decimal import Decimal
+from typing import Any, Union
+
+import numpy as np
+import orjson
+from fastapi.responses import ORJSONResponse
+
+OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def default(obj: Any) -> Any:
+    """Fallback for types orjson does not encode natively"""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode to JSON bytes; Redis stores them as-is"""
+    return orjson.dumps(obj, default=default, option=OPTIONS)
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    return orjson.loads(data)
+
+
+class JSONResponse(ORJSONResponse):
+    """Default response class: orjson with the numpy fallback above"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
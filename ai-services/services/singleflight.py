@@ -0,0 +1,127 @@
+"""
+Request Coalescing for GariPamoja AI Services
+Identical in-flight computations run once; concurrent callers share the leader's result
+"""
+
+import os
+import time
+import uuid
+import asyncio
+import hashlib
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+import orjson
+
+from services import serialization
+from services.metrics import COALESCED_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+# Delete the lock only if we still own it
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+def request_key(name: str, params: Any) -> str:
+    """Canonical key: operation name plus a digest of the sorted-key JSON params"""
+    encoded = orjson.dumps(params, default=serialization.default, option=orjson.OPT_SORT_KEYS | serialization.OPTIONS)
+    return f"{name}:{hashlib.sha1(encoded).hexdigest()}"
+
+
+class SingleFlight:
+    """Per-process coalescing, optionally extended across workers with a Redis lock"""
+
+    def __init__(self, redis_client=None):
+        self.redis_client = redis_client
+        self.distributed = redis_client is not None and os.getenv("SINGLEFLIGHT_REDIS_ENABLED", "false").lower() == "true"
+        self.lock_ttl_ms = int(os.getenv("SINGLEFLIGHT_LOCK_TTL_MS", "10000"))
+        # Followers in other workers may poll just after the leader finishes
+        self.result_ttl_ms = int(os.getenv("SINGLEFLIGHT_RESULT_TTL_MS", "2000"))
+        self.poll_interval = float(os.getenv("SINGLEFLIGHT_POLL_SECONDS", "0.02"))
+
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def do(self, name: str, params: Any, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Return compute()'s result, sharing it with identical concurrent calls"""
+        key = request_key(name, params)
+        task = self._inflight.get(key)
+        if task is None:
+            COALESCED_REQUESTS.labels(operation=name, role="leader").inc()
+            task = asyncio.ensure_future(self._lead(name, key, compute))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            COALESCED_REQUESTS.labels(operation=name, role="follower").inc()
+
+        # Shielded so one caller disconnecting does not cancel the work for the rest
+        return await asyncio.shield(task)
+
+    async def _lead(self, name: str, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        if not self.distributed:
+            return await compute()
+
+        try:
+            return await self._lead_distributed(name, key, compute)
+        except _ComputeError as e:
+            raise e.error
+        except Exception as e:
+            logger.error(f"Distributed single-flight unavailable for {name}: {str(e)}")
+            return await compute()
+
+    async def _lead_distributed(self, name: str, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        lock_key = f"singleflight:lock:{key}"
+        result_key = f"singleflight:result:{key}"
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.lock_ttl_ms / 1000.0
+
+        while True:
+            cached = self.redis_client.get(result_key)
+            if cached is not None:
+                COALESCED_REQUESTS.labels(operation=name, role="remote_follower").inc()
+                return serialization.loads(cached)
+
+            if self.redis_client.set(lock_key, token, nx=True, px=self.lock_ttl_ms):
+                try:
+                    result = await self._compute(compute)
+                    self.publish(result_key, result)
+                    return result
+                finally:
+                    self.release(lock_key, token)
+
+            if time.monotonic() >= deadline:
+                # Remote leader is stuck or gone; stop waiting on it
+                return await self._compute(compute)
+            await asyncio.sleep(self.poll_interval)
+
+    async def _compute(self, compute: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            return await compute()
+        except Exception as e:
+            raise _ComputeError(e)
+
+    def publish(self, result_key: str, result: Any):
+        try:
+            self.redis_client.set(result_key, serialization.dumps(result), px=self.result_ttl_ms)
+        except Exception as e:
+            # Remote followers will time out and compute for themselves
+            logger.error(f"Error publishing single-flight result: {str(e)}")
+
+    def release(self, lock_key: str, token: str):
+        try:
+            self.redis_client.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+        except Exception as e:
+            # The lock expires on its own after lock_ttl_ms
+            logger.error(f"Error releasing single-flight lock: {str(e)}")
+
+
+class _ComputeError(Exception):
+    """Carries the computation's own error past the Redis fallback handler"""
+
+    def __init__(self, error: Exception):
+        super().__init__(str(error))
+        self.error = error
@@ -0,0 +1,37 @@
+"""
+Tiered cache tests: a stale entry is refreshed once in the background while it keeps being served
+"""
+
+import asyncio
+import time
+
+from benchmarks import fixtures
+from services.cache import TieredCache
+
+
+def test_stale_entry_schedules_one_refresh():
+    cache = TieredCache(fixtures.make_redis())
+    cache.enabled = True
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"answer": len(calls)}
+
+    async def scenario():
+        assert await cache.get_or_compute("test", {"q": 1}, compute, ttl=60, stale_ttl=60) == {"answer": 1}
+        for key in list(cache.l1.entries):
+            cache.l1.entries[key].fresh_until = time.time() - 1
+        cache.redis_client.flushdb()
+
+        served = [await cache.get_or_compute("test", {"q": 1}, compute, ttl=60, stale_ttl=60) for _ in range(5)]
+        assert served == [{"answer": 1}] * 5
+        assert len(cache.refreshing) == 1
+
+        await asyncio.gather(*cache.refreshing.values())
+        assert await cache.get_or_compute("test", {"q": 1}, compute, ttl=60, stale_ttl=60) == {"answer": 2}
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
+    assert cache.refreshing == {}
@@ -0,0 +1,23 @@
+"""
+Content moderation tests: cached classifications still update the author's history
+"""
+
+import asyncio
+
+from benchmarks import fixtures
+from services.cache import tiered_cache
+
+
+def test_history_is_updated_on_cache_hits(monkeypatch):
+    redis_client = fixtures.make_redis()
+    monkeypatch.setattr(tiered_cache, "enabled", True)
+    monkeypatch.setattr(tiered_cache, "redis_client", redis_client)
+    monkeypatch.setattr(tiered_cache.singleflight, "redis_client", redis_client)
+    service = fixtures.build_moderation_service(1, redis_client)
+    content = "Call me on 0712345678 for a cheaper deal outside the app, no fees at all"
+
+    for _ in range(3):
+        result = asyncio.run(service.check_content(content, "message", "user-1"))
+        assert not result["is_appropriate"]
+
+    assert redis_client.hgetall("moderation_history:user-1") == {"total": "3", "flagged": "3"}
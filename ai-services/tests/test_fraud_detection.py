@@ -0,0 +1,72 @@
+"""
+Fraud detection tests: calibrated thresholds must still flag obvious fraud
+"""
+
+import numpy as np
+import pytest
+
+from benchmarks import fixtures
+from services.fraud_classifier import choose_thresholds
+
+# Brand-new, unverified account on several devices with a large booking and many cancellations
+FRAUDULENT = [2, 490, 9, 4, 2, 2, 0.49, 0.31]
+# Year-old verified account making a small booking from one device
+ORDINARY = [200, 150, 2, 1, 0, 1, 0.05, 0.95]
+
+
+@pytest.fixture(scope="module")
+def service():
+    return fixtures.build_fraud_service(5000, fixtures.make_redis())
+
+
+def score(service, features):
+    risk_score = service.calculate_risk_score(features)
+    return service.build_result("user-1", {"amount": features[1]}, features, risk_score, False)
+
+
+def test_published_model_uses_holdout_thresholds(service):
+    assert service.classifier is not None
+    assert service.risk_thresholds != service.DEFAULT_RISK_THRESHOLDS
+    assert 0 < service.risk_thresholds["low"] <= service.risk_thresholds["medium"] <= service.risk_thresholds["high"]
+
+
+@pytest.mark.parametrize("scale", [1000, 2000])
+def test_benchmark_fixture_publishes_a_model_at_small_scales(scale):
+    service = fixtures.build_fraud_service(scale, fixtures.make_redis())
+
+    assert service.model_version is not None
+
+
+def test_clearly_fraudulent_booking_is_flagged(service):
+    result = score(service, FRAUDULENT)
+
+    assert result["is_suspicious"]
+    assert "Low risk - proceed with normal processing" not in result["recommendations"]
+
+
+def test_ordinary_booking_is_not_flagged(service):
+    assert not score(service, ORDINARY)["is_suspicious"]
+
+
+def test_flag_rate_stays_within_review_capacity(service):
+    metrics = service.registry.load()["metrics"]
+
+    assert 0 < metrics["flag_rate"] <= 0.05
+    assert metrics["flag_recall"] > 0
+
+
+PROBABILITIES = np.array([0.9, 0.8, 0.8, 0.4, 0.3, 0.2, 0.1, 0.05, 0.05, 0.01])
+LABELS = np.array([1, 1, 0, 1, 0, 1, 0, 0, 1, 0])
+
+
+def test_choose_thresholds_meets_targets():
+    thresholds = choose_thresholds(PROBABILITIES, LABELS, target_recall=0.8, target_precision=0.7, max_flag_rate=1.0)
+
+    # 0.2 is the highest cut-off catching four of the five frauds; tied 0.8 scores are kept together
+    assert thresholds == {"low": 0.1, "medium": 0.2, "high": 0.4}
+
+
+def test_choose_thresholds_caps_flag_rate():
+    thresholds = choose_thresholds(PROBABILITIES, LABELS, target_recall=0.8, target_precision=0.7, max_flag_rate=0.3)
+
+    assert thresholds == {"low": 0.4, "medium": 0.8, "high": 0.8}
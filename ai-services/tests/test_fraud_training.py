@@ -0,0 +1,40 @@
+"""
+Fraud training tests: late labels reach the classifier, and label droughts keep the last one
+"""
+
+from benchmarks import fixtures
+from services.fraud_training import FraudEventStream
+
+
+def test_labels_join_events_by_transaction_id():
+    events = FraudEventStream(fixtures.make_redis())
+    for index in range(3):
+        events.record([float(index)] * 8, transaction_id=f"tx-{index}")
+    events.record_label("tx-1", True)
+    events.record_label("tx-2", False)
+
+    trainer = fixtures.build_fraud_trainer(10, events.redis_client)
+    trainer.events = events
+    trainer.window.clear()
+    trainer.ingest(events.read("0-0", 10, block_ms=None))
+
+    assert trainer.window_labels() == [None, 1, 0]
+
+
+def test_classifier_survives_a_label_drought():
+    redis_client = fixtures.make_redis()
+    trainer = fixtures.build_fraud_trainer(3000, redis_client)
+    assert trainer.train() is not None
+    published = trainer.registry.load()
+    assert published["classifier"] is not None
+
+    # A window of unlabelled traffic cannot train a classifier
+    trainer.window = type(trainer.window)(
+        ((features, None, None) for features, _, _ in trainer.window), maxlen=trainer.window.maxlen
+    )
+    assert trainer.train() is not None
+
+    artifact = trainer.registry.load()
+    assert artifact["classifier"].calibration_y == published["classifier"].calibration_y
+    assert artifact["thresholds"] == published["thresholds"]
+    assert artifact["metrics"]["classifier_auc"] == published["metrics"]["classifier_auc"]
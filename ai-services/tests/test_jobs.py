@@ -0,0 +1,40 @@
+"""
+Batch job queue tests: chunk writes are idempotent and reclaimed jobs stop their old worker
+"""
+
+import pytest
+
+from benchmarks import fixtures
+from services.jobs import JobQueue
+
+
+@pytest.fixture
+def queue():
+    queue = JobQueue(fixtures.make_redis())
+    queue.ensure_group()
+    return queue
+
+
+def test_duplicate_chunk_is_stored_once(queue):
+    job_id = queue.submit("pricing_analysis", list(range(5)), chunk_size=2)
+
+    assert queue.record_chunk(job_id, 0, [{"n": 0}, {"n": 1}])
+    assert not queue.record_chunk(job_id, 0, [{"n": 0}, {"n": 1}])
+    assert not queue.record_chunk(job_id, 2, [{"n": 4}])
+    assert queue.record_chunk(job_id, 1, [{"n": 2}, {"error": "bad item"}])
+
+    status = queue.get_status(job_id)
+    assert status["completed_chunks"] == 2
+    assert status["processed_items"] == 4
+    assert status["failed_items"] == 1
+    assert queue.get_results(job_id, 1, 2) == [{"n": 1}, {"n": 2}]
+
+
+def test_heartbeat_fails_after_reclaim(queue):
+    queue.submit("pricing_analysis", [1])
+    [(message_id, _)] = queue.read("worker-a", 1, block_ms=None)
+
+    assert queue.heartbeat("worker-a", message_id)
+    assert queue.reclaim("worker-b", 0, 1)[0][0] == message_id
+    assert not queue.heartbeat("worker-a", message_id)
+    assert queue.heartbeat("worker-b", message_id)
@@ -0,0 +1,77 @@
+"""
+GariPamoja AI Services - Fraud Model Trainer
+Consumes scored transactions from the Redis stream and publishes retrained models
+outside the API process
+"""
+
+import os
+import time
+import logging
+import redis
+from prometheus_client import start_http_server
+
+from services.fraud_detection import FraudDetectionService
+from services.fraud_training import FraudEventStream, FraudModelTrainer, ModelRegistry
+from services.metrics import track_stage
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class TrainingWorker:
+    """Reads events in chunks and retrains whenever enough new ones arrived"""
+
+    def __init__(self):
+        self.redis_client = redis.Redis.from_url(
+            os.getenv("REDIS_URL", "redis://localhost:6379/1"),
+            decode_responses=True
+        )
+        self.events = FraudEventStream(self.redis_client)
+        self.trainer = FraudModelTrainer(ModelRegistry(), self.events)
+        self.chunk_size = int(os.getenv("FRAUD_TRAINING_CHUNK_SIZE", "1000"))
+        self.block_ms = int(os.getenv("FRAUD_TRAINING_BLOCK_MS", "5000"))
+        self.bootstrap = os.getenv("FRAUD_TRAINING_BOOTSTRAP", "true").lower() == "true"
+
+    def prepare(self):
+        """Restore the published scaler and rebuild the window from the capped stream"""
+        restored = self.trainer.restore()
+        resume_from = self.trainer.last_event_id
+
+        cursor = "0-0"
+        while True:
+            events = self.events.read(cursor, self.chunk_size, block_ms=None)
+            if not events:
+                break
+            self.trainer.ingest(events, replay=restored)
+            cursor = events[-1][0]
+        logger.info(f"Training window rebuilt with {len(self.trainer.window)} events (resumed at {resume_from})")
+
+        if not restored and self.bootstrap and len(self.trainer.window) < self.trainer.min_train_events:
+            # Nothing real to learn from yet; start from the service's labelled history
+            self.trainer.ingest_frame(FraudDetectionService().historical_data)
+
+        if not restored and len(self.trainer.window) >= self.trainer.min_train_events:
+            with track_stage("fraud_training", "train"):
+                self.trainer.train()
+
+    def run(self):
+        self.prepare()
+        logger.info(f"Fraud trainer started (window {self.trainer.window_size}, retrain every {self.trainer.retrain_every})")
+
+        while True:
+            try:
+                events = self.events.read(self.trainer.last_event_id, self.chunk_size, self.block_ms)
+                if events:
+                    self.trainer.ingest(events)
+                if self.trainer.should_train():
+                    with track_stage("fraud_training", "train"):
+                        self.trainer.train()
+            except Exception as e:
+                logger.error(f"Error in fraud training loop: {str(e)}")
+                time.sleep(1.0)
+
+
+if __name__ == "__main__":
+    start_http_server(int(os.getenv("FRAUD_TRAINER_METRICS_PORT", "9102")))
+    TrainingWorker().run()
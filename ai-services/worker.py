@@ -0,0 +1,137 @@
+"""
+GariPamoja AI Services - Batch Job Worker
+Consumes /batch/process jobs from the Redis stream outside the API process
+"""
+
+import os
+import socket
+import asyncio
+import logging
+import redis
+from prometheus_client import start_http_server
+
+from services.pricing import PricingService
+from services.fraud_detection import FraudDetectionService
+from services.content_moderation import ContentModerationService
+from services.jobs import JobQueue
+from services.data_access import data_access
+from services.metrics import QUEUE_DEPTH, track_stage
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class JobWorker:
+    """Runs queued batch jobs chunk by chunk with a concurrency limit"""
+
+    def __init__(self):
+        self.redis_client = redis.Redis.from_url(
+            os.getenv("REDIS_URL", "redis://localhost:6379/1"),
+            decode_responses=True
+        )
+        self.queue = JobQueue(self.redis_client)
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}"
+
+        self.concurrency = int(os.getenv("JOB_WORKER_CONCURRENCY", "2"))
+        self.block_ms = int(os.getenv("JOB_WORKER_BLOCK_MS", "5000"))
+        self.reclaim_idle_ms = int(os.getenv("JOB_RECLAIM_IDLE_MS", "300000"))
+        self.slots = asyncio.Semaphore(self.concurrency)
+
+        pricing_service = PricingService()
+        self.fraud_detection_service = FraudDetectionService()
+        content_moderation_service = ContentModerationService()
+        self.handlers = {
+            "pricing_analysis": pricing_service.batch_analyze,
+            "fraud_analysis": self.fraud_detection_service.batch_analyze,
+            "content_moderation": content_moderation_service.batch_moderate
+        }
+        self.fraud_model_poll_seconds = float(os.getenv("FRAUD_MODEL_POLL_SECONDS", "30"))
+        self.fraud_model_watcher = None
+
+    async def watch_fraud_model(self):
+        """Pick up models published by trainer.py, as the API does"""
+        while True:
+            await asyncio.sleep(self.fraud_model_poll_seconds)
+            await asyncio.to_thread(self.fraud_detection_service.load_published_model)
+
+    async def run(self):
+        """Main consume loop"""
+        self.queue.ensure_group()
+        await data_access.start()
+        # Score fraud jobs with the published classifier and thresholds, not the rule fallback
+        await self.fraud_detection_service.update_model()
+        self.fraud_model_watcher = asyncio.create_task(self.watch_fraud_model())
+        logger.info(f"Job worker {self.consumer} started with concurrency {self.concurrency}")
+
+        running = set()
+        while True:
+            # Wait for a free slot before claiming more work
+            await self.slots.acquire()
+            self.slots.release()
+            free = max(self.concurrency - len(running), 1)
+
+            messages = await asyncio.to_thread(self.queue.reclaim, self.consumer, self.reclaim_idle_ms, free)
+            if not messages:
+                messages = await asyncio.to_thread(self.queue.read, self.consumer, free, self.block_ms)
+
+            for message_id, job_id in messages:
+                await self.slots.acquire()
+                task = asyncio.create_task(self.run_job(message_id, job_id))
+                running.add(task)
+                task.add_done_callback(running.discard)
+
+            depth = self.queue.depth()
+            QUEUE_DEPTH.labels(queue="batch_jobs_waiting").set(depth["waiting"])
+            QUEUE_DEPTH.labels(queue="batch_jobs_in_flight").set(depth["in_flight"])
+
+    async def run_job(self, message_id: str, job_id: str):
+        try:
+            job = self.queue.mark_running(job_id)
+            if job is None:
+                # Expired or deleted; nothing left to do
+                self.queue.finish(job_id, message_id, error="Job metadata missing")
+                return
+
+            handler = self.handlers.get(job["task_type"])
+            if handler is None:
+                self.queue.finish(job_id, message_id, error=f"Unsupported task type {job['task_type']}")
+                return
+
+            data = self.queue.load_payload(job_id)
+            chunk_size = job["chunk_size"] or 1
+
+            # Resume after the last stored chunk if this is a retry or reclaim
+            for chunk_index in range(job["completed_chunks"], job["total_chunks"]):
+                # Each chunk proves this worker alive, so long jobs are not reclaimed mid-run
+                if not self.queue.heartbeat(self.consumer, message_id):
+                    logger.warning(f"Job {job_id} was reclaimed by another worker; stopping")
+                    return
+
+                chunk = data[chunk_index * chunk_size:(chunk_index + 1) * chunk_size]
+                with track_stage("batch_worker", job["task_type"]):
+                    results = await handler(chunk)
+                if len(results) != len(chunk):
+                    raise ValueError(f"{job['task_type']} returned {len(results)} results for {len(chunk)} items")
+                if not self.queue.record_chunk(job_id, chunk_index, results):
+                    logger.warning(f"Job {job_id} chunk {chunk_index} was already stored by another worker; stopping")
+                    return
+
+            self.queue.finish(job_id, message_id)
+            logger.info(f"Job {job_id} completed ({job['total_items']} items)")
+
+        except Exception as e:
+            logger.error(f"Error processing job {job_id}: {str(e)}")
+            status = self.queue.get_status(job_id) or {}
+            if status.get("attempts", 0) >= self.queue.max_attempts:
+                self.queue.finish(job_id, message_id, error=str(e))
+            else:
+                self.queue.requeue(job_id, message_id, str(e))
+
+        finally:
+            self.slots.release()
+
+
+if __name__ == "__main__":
+    start_http_server(int(os.getenv("JOB_WORKER_METRICS_PORT", "9101")))
+    asyncio.run(JobWorker().run())
@@ -0,0 +1,86 @@
+"""
+Availability engine: booking conflicts and free-car search over [start, end) intervals.
+
+Bookings in BLOCKING_STATUSES hold their car's interval. Overlap checks use the
+partial (car, start_date, end_date) index on those bookings. On PostgreSQL new
+or moved bookings are serialized per car by locking the car row, so two
+concurrent requests cannot both take the same dates. SQLite ignores
+select_for_update; there its single-writer lock makes the later of two
+conflicting transactions fail with "database is locked" rather than queue.
+"""
+
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+from django.db.models import Exists, OuterRef
+
+from bookings.models import Booking
+from cars.models import Car, CarAvailabilityRange
+
+BLOCKING_STATUSES = ('pending', 'confirmed', 'active')
+
+
+class BookingConflict(ValidationError):
+    """The car is already booked or blocked for part of the requested interval"""
+
+
+def overlapping_bookings(start, end):
+    """Blocking bookings that intersect [start, end)"""
+    return Booking.objects.filter(status__in=BLOCKING_STATUSES, start_date__lt=end, end_date__gt=start)
+
+
+def blocked_days(start, end):
+    """Host-blocked calendar ranges touching any day of [start, end)"""
+    first_day = timezone.localdate(start)
+    last_day = timezone.localdate(end - timedelta(microseconds=1))
+    return CarAvailabilityRange.objects.filter(is_available=False, start_date__lte=last_day, end_date__gt=first_day)
+
+
+def is_available(car_id, start, end, exclude_booking=None):
+    """Is the car free over [start, end)?"""
+    bookings = overlapping_bookings(start, end).filter(car_id=car_id)
+    if exclude_booking is not None:
+        bookings = bookings.exclude(pk=exclude_booking)
+    return not bookings.exists() and not blocked_days(start, end).filter(car_id=car_id).exists()
+
+
+def availability_map(car_ids, start, end):
+    """{car_id: free over [start, end)} for many cars in two queries"""
+    car_ids = list(car_ids)
+    busy = set(overlapping_bookings(start, end).filter(car_id__in=car_ids).values_list('car_id', flat=True))
+    busy.update(blocked_days(start, end).filter(car_id__in=car_ids).values_list('car_id', flat=True))
+    busy = {str(car_id) for car_id in busy}
+    return {car_id: str(car_id) not in busy for car_id in car_ids}
+
+
+def available_cars(start, end, city=None, queryset=None):
+    """Active cars free over [start, end), as one anti-join query"""
+    cars = queryset if queryset is not None else Car.objects.all()
+    cars = cars.filter(is_active=True)
+    if city:
+        cars = cars.filter(city__iexact=city)
+    return cars.filter(
+        ~Exists(overlapping_bookings(start, end).filter(car=OuterRef('pk'))),
+        ~Exists(blocked_days(start, end).filter(car=OuterRef('pk')))
+    )
+
+
+def ensure_available(car_id, start, end, exclude_booking=None):
+    """Lock the car row and raise BookingConflict if [start, end) is taken
+
+    Must run inside the transaction that saves the booking; the lock is held
+    until it commits, so concurrent bookings for the same car queue up here.
+    The row lock is a no-op on SQLite (see the module docstring).
+    """
+    if end <= start:
+        raise ValidationError('Booking must end after it starts')
+    list(Car.objects.select_for_update().filter(pk=car_id).values_list('pk', flat=True))
+    if not is_available(car_id, start, end, exclude_booking=exclude_booking):
+        raise BookingConflict('Car is not available for the selected dates')
+
+
+def conflicting_bookings(car_id, start, end):
+    """Bookings in the way, for error messages and host tooling"""
+    return overlapping_bookings(start, end).filter(car_id=car_id).order_by('start_date')
+
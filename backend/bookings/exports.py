@@ -0,0 +1,175 @@
+"""
+Streaming booking and payment exports (CSV or NDJSON).
+
+Rows are read with .iterator(chunk_size=...) (a server-side cursor on Postgres)
+and encoded one at a time, so a response holds one chunk of rows in memory no
+matter how long the date range is. Behind a transaction-mode pooler server-side
+cursors are disabled (DB_POOLER) and the driver would buffer the whole result,
+so rows are instead fetched in CHUNK_SIZE keyset pages on (created_at, id).
+Large exports can instead run as a Celery job that streams the same rows into
+default_storage (bookings.tasks).
+"""
+
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.db import connections
+from django.db.models import F, Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from bookings.models import Booking
+
+CHUNK_SIZE = 2000
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+# (column, queryset expression) per export kind
+COLUMNS = {
+    'bookings': (
+        ('id', 'id'),
+        ('created_at', 'created_at'),
+        ('status', 'status'),
+        ('car_id', 'car_id'),
+        ('license_plate', 'car__license_plate'),
+        ('city', 'car__city'),
+        ('renter_email', 'renter__email'),
+        ('host_email', 'host__email'),
+        ('start_date', 'start_date'),
+        ('end_date', 'end_date'),
+        ('total_days', 'total_days'),
+        ('daily_rate', 'daily_rate'),
+        ('total_amount', 'total_amount'),
+        ('cancellation_date', 'cancellation_date'),
+        ('renter_rating', 'renter_rating'),
+    ),
+    # Payments are recorded on the booking; this is its money side
+    'payments': (
+        ('booking_id', 'id'),
+        ('created_at', 'created_at'),
+        ('status', 'status'),
+        ('renter_id', 'renter_id'),
+        ('host_id', 'host_id'),
+        ('subtotal', 'subtotal'),
+        ('commission', 'commission'),
+        ('security_deposit', 'security_deposit'),
+        ('total_amount', 'total_amount'),
+        ('host_payout', 'subtotal'),
+        ('insurance_claim_amount', 'insurance_claim_amount'),
+    ),
+}
+
+
+class ExportError(ValueError):
+    """Unusable export parameters"""
+
+
+def parse_range(params):
+    """(start, end) dates from ?start= and ?end=, both inclusive; either may be missing"""
+    bounds = []
+    for name in ('start', 'end'):
+        value = params.get(name)
+        day = parse_date(value) if value else None
+        if value and day is None:
+            raise ExportError(f'{name} must be a YYYY-MM-DD date')
+        bounds.append(day)
+    start, end = bounds
+    if start and end and end < start:
+        raise ExportError('end must not be before start')
+    return start, end
+
+
+def start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def export_queryset(kind, start=None, end=None, user=None):
+    """Rows of one export kind created between the start and end dates, as tuples in COLUMNS order, oldest first
+
+    Staff see every booking; anyone else only the bookings they rent or host.
+    """
+    if kind not in COLUMNS:
+        raise ExportError(f'Unknown export: {kind}')
+    bookings = Booking.objects.all()
+    if user is not None and not user.is_staff:
+        bookings = bookings.filter(Q(renter=user) | Q(host=user))
+    if start:
+        bookings = bookings.filter(created_at__gte=start_of_day(start))
+    if end:
+        bookings = bookings.filter(created_at__lt=start_of_day(end + timedelta(days=1)))
+
+    expressions = dict(zip(column_names(kind), (F(source) for _, source in COLUMNS[kind])))
+    return bookings.order_by('created_at', 'id').annotate(**expressions).values_list(*expressions)
+
+
+def column_names(kind):
+    return [f'column_{index}' for index in range(len(COLUMNS[kind]))]
+
+
+class Echo:
+    """File-like object whose write() hands back the line csv.writer produced"""
+
+    def write(self, value):
+        return value
+
+
+def encode_rows(kind, rows, fmt):
+    """Generator of encoded lines (header first for CSV)"""
+    columns = [column for column, _ in COLUMNS[kind]]
+    if fmt == 'csv':
+        writer = csv.writer(Echo())
+        yield writer.writerow(columns)
+        for row in rows:
+            yield writer.writerow(row)
+    else:
+        for row in rows:
+            yield json.dumps(dict(zip(columns, row)), default=str) + '\n'
+
+
+def stream(kind, queryset, fmt):
+    if connections[queryset.db].settings_dict.get('DISABLE_SERVER_SIDE_CURSORS'):
+        rows = keyset_rows(kind, queryset)
+    else:
+        rows = queryset.iterator(chunk_size=CHUNK_SIZE)
+    return encode_rows(kind, rows, fmt)
+
+
+def keyset_rows(kind, queryset):
+    """Generator of export_queryset rows, one CHUNK_SIZE query at a time after the last (created_at, id)
+
+    Each page is a range scan of booking_created_idx, and no cursor outlives its query.
+    """
+    keyed = queryset.values_list('created_at', 'id', *column_names(kind))
+    after = Q()
+    while True:
+        page = list(keyed.filter(after)[:CHUNK_SIZE])
+        for row in page:
+            yield row[2:]
+        if len(page) < CHUNK_SIZE:
+            return
+        created_at, pk = page[-1][:2]
+        after = Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+
+
+def streaming_response(request, kind):
+    """StreamingHttpResponse for ?format=csv|ndjson&start=&end=; raises ExportError on bad parameters"""
+    fmt = request.query_params.get('format', 'csv')
+    if fmt not in FORMATS:
+        raise ExportError(f"format must be one of {', '.join(FORMATS)}")
+    start, end = parse_range(request.query_params)
+    queryset = export_queryset(kind, start, end, request.user)
+    # The body is produced after the view returns; pin the alias the router chose for this request
+    queryset = queryset.using(queryset.db)
+
+    response = StreamingHttpResponse(stream(kind, queryset, fmt), content_type=FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{export_filename(kind, fmt, start, end)}"'
+    return response
+
+
+def export_filename(kind, fmt, start, end):
+    span = '_'.join(bound.isoformat() for bound in (start, end) if bound) or 'all'
+    return f'{kind}_{span}.{fmt}'
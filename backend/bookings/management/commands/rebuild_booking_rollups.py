@@ -0,0 +1,47 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from bookings import rollups
+from bookings.models import Booking
+from cars.models import Car
+
+
+class Command(BaseCommand):
+    help = "Recompute daily car, host and city booking rollups from bookings"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='First day (YYYY-MM-DD); defaults to the first booking')
+        parser.add_argument('--end', help='Last day (YYYY-MM-DD); defaults to the last booking')
+        parser.add_argument('--chunk-days', type=int, default=31, help='Days rebuilt per transaction')
+
+    def handle(self, *args, **options):
+        # Bookings saved before they recorded their city take their car's current one
+        backfilled = Booking.objects.filter(city='').update(
+            city=Subquery(Car.objects.filter(pk=OuterRef('car_id')).values('city')[:1])
+        )
+        if backfilled:
+            self.stdout.write(f"Recorded the city of {backfilled} bookings")
+
+        first = Booking.objects.order_by('start_date').values_list('start_date', flat=True).first()
+        last = Booking.objects.order_by('-start_date').values_list('start_date', flat=True).first()
+        if first is None and not (options['start'] and options['end']):
+            self.stdout.write("No bookings to roll up")
+            return
+
+        start = parse_date(options['start']) if options['start'] else timezone.localdate(first)
+        end = parse_date(options['end']) if options['end'] else timezone.localdate(last)
+        if start is None or end is None or end < start:
+            raise CommandError("--start and --end must be YYYY-MM-DD dates with start <= end")
+
+        cars = 0
+        chunk = timedelta(days=options['chunk_days'])
+        while start <= end:
+            chunk_end = min(start + chunk - timedelta(days=1), end)
+            cars += rollups.rebuild(start, chunk_end)
+            start = chunk_end + timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {cars} car-day rollups"))
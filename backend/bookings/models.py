@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
 from decimal import Decimal
@@ -31,6 +32,8 @@ class Booking(models.Model):
     pickup_longitude = models.DecimalField(max_digits=9, decimal_places=6, blank=True, null=True)
     dropoff_latitude = models.DecimalField(max_digits=9, decimal_places=6, blank=True, null=True)
     dropoff_longitude = models.DecimalField(max_digits=9, decimal_places=6, blank=True, null=True)
+    # The car's city when booked; rollups key on it so later car moves don't rewrite history
+    city = models.CharField(max_length=100, blank=True, editable=False)
     
     # Pricing
     daily_rate = models.DecimalField(max_digits=8, decimal_places=2)
@@ -62,11 +65,37 @@ class Booking(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
+        indexes = [
+            # Cursor pagination of each user's bookings (garipamoja.pagination)
+            models.Index(fields=['renter', '-created_at', '-id'], name='booking_renter_recent_idx'),
+            models.Index(fields=['host', '-created_at', '-id'], name='booking_host_recent_idx'),
+            # Date-range exports (bookings.exports)
+            models.Index(fields=['created_at', 'id'], name='booking_created_idx'),
+            # Days touched since the last nightly rollup backfill (bookings.rollups.touched_days)
+            models.Index(fields=['updated_at'], name='booking_updated_idx'),
+            models.Index(
+                fields=['car', '-created_at', '-id'],
+                condition=models.Q(renter_rating__isnull=False),
+                name='booking_car_review_idx'
+            ),
+            # Interval lookups for the availability engine; only bookings that hold the car
+            models.Index(
+                fields=['car', 'start_date', 'end_date'],
+                condition=models.Q(status__in=('pending', 'confirmed', 'active')),
+                name='booking_car_interval_idx'
+            ),
+        ]
     
     def __str__(self):
         return f"Booking {self.id} - {self.car.full_name} by {self.renter.email}"
     
+    # Fields that change the car's aggregates, its booked intervals or the analytics rollups
+    TRACKED_FIELDS = (
+        'car', 'car_id', 'host', 'host_id', 'city', 'status', 'renter_rating', 'start_date', 'end_date',
+        'total_days', 'subtotal', 'commission'
+    )
+    
     def save(self, *args, **kwargs):
         # Calculate totals if not set
         if not self.subtotal:
@@ -75,7 +104,50 @@ class Booking(models.Model):
             self.commission = self.subtotal * Decimal('0.20')  # 20% commission
         if not self.total_amount:
             self.total_amount = self.subtotal + self.commission + self.security_deposit
-        super().save(*args, **kwargs)
+        
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not set(update_fields) & set(self.TRACKED_FIELDS):
+            super().save(*args, **kwargs)
+            return
+        
+        from bookings.availability import BLOCKING_STATUSES, ensure_available
+        from bookings.rollups import ROLLUP_FIELDS, record_change
+        
+        with transaction.atomic():
+            previous = None
+            if not self._state.adding:
+                previous = Booking.objects.select_for_update().filter(pk=self.pk).values(
+                    'end_date', *ROLLUP_FIELDS
+                ).first()
+            
+            interval = {'car_id': self.car_id, 'start_date': self.start_date, 'end_date': self.end_date}
+            takes_car = self.status in BLOCKING_STATUSES and (
+                previous is None
+                or previous['status'] not in BLOCKING_STATUSES
+                or any(previous[field] != value for field, value in interval.items())
+            )
+            if takes_car:
+                ensure_available(self.car_id, self.start_date, self.end_date, exclude_booking=self.pk)
+            
+            if previous is None or previous['car_id'] != self.car_id:
+                self.city = self.car.city
+                if kwargs.get('update_fields') is not None:
+                    kwargs['update_fields'] = [*kwargs['update_fields'], 'city']
+            
+            super().save(*args, **kwargs)
+            record_change(previous, self.rollup_state())
+            
+            stats = {'car_id': self.car_id, 'status': self.status, 'renter_rating': self.renter_rating}
+            if previous and all(previous[field] == value for field, value in stats.items()):
+                return
+            if previous:
+                apply_car_stats(previous['car_id'], previous['status'], previous['renter_rating'], -1)
+            apply_car_stats(self.car_id, self.status, self.renter_rating, 1)
+    
+    def rollup_state(self):
+        from bookings.rollups import ROLLUP_FIELDS
+        
+        return {field: getattr(self, field) for field in ROLLUP_FIELDS}
     
     @property
     def is_active(self):
@@ -97,6 +169,70 @@ class Booking(models.Model):
             return duration.total_seconds() / 3600
         return 0
 
+def apply_car_stats(car_id, status, renter_rating, sign):
+    """Add (sign=1) or remove (sign=-1) one booking's contribution to its car's aggregates"""
+    if status != 'completed' or car_id is None:
+        return
+    from cars.cache import invalidate_car
+    from cars.models import Car
+    
+    updates = {'completed_bookings_count': F('completed_bookings_count') + sign}
+    if renter_rating:
+        updates['rating_sum'] = F('rating_sum') + sign * renter_rating
+        updates['rating_count'] = F('rating_count') + sign
+    Car.objects.filter(pk=car_id).update(**updates)
+    # update() sends no signals, so the cached detail page is retired here
+    transaction.on_commit(lambda: invalidate_car(car_id))
+
+class BookingRollup(models.Model):
+    """One day of booking metrics; maintained by bookings.rollups
+
+    A booking counts toward the local day its rental starts. Confirmed, active and
+    completed bookings count as bookings with their nights, subtotal and commission.
+    """
+    date = models.DateField()
+    
+    # Signed: rollups apply negative deltas, which must not fail on a row that has drifted low
+    bookings = models.IntegerField(default=0)
+    nights = models.IntegerField(default=0)
+    subtotal = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    commission = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    completed = models.IntegerField(default=0)
+    cancellations = models.IntegerField(default=0)
+    rating_sum = models.BigIntegerField(default=0)
+    rating_count = models.IntegerField(default=0)
+    # Set by every delta, so the nightly backfill also revisits days that lost bookings
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        abstract = True
+
+class DailyCarRollup(BookingRollup):
+    car = models.ForeignKey('cars.Car', on_delete=models.CASCADE, related_name='daily_rollups')
+    host = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='car_rollups')
+    
+    class Meta:
+        unique_together = ('car', 'date')
+        indexes = [
+            models.Index(fields=['host', 'date'], name='car_rollup_host_date_idx'),
+        ]
+
+class DailyHostRollup(BookingRollup):
+    host = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='daily_rollups')
+    
+    class Meta:
+        unique_together = ('host', 'date')
+
+class DailyCityRollup(BookingRollup):
+    city = models.CharField(max_length=100)
+    
+    class Meta:
+        unique_together = ('city', 'date')
+        indexes = [
+            models.Index(fields=['date'], name='city_rollup_date_idx'),
+            models.Index(fields=['updated_at'], name='city_rollup_updated_idx'),
+        ]
+
 class BookingMessage(models.Model):
     """Messages between host and renter"""
     booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='messages')
@@ -109,7 +245,10 @@ class BookingMessage(models.Model):
     read_at = models.DateTimeField(blank=True, null=True)
     
     class Meta:
-        ordering = ['created_at']
+        ordering = ['created_at', 'id']
+        indexes = [
+            models.Index(fields=['booking', 'created_at', 'id'], name='booking_message_thread_idx'),
+        ]
     
     def __str__(self):
         return f"Message from {self.sender.email} to {self.recipient.email}"
@@ -0,0 +1,225 @@
+"""
+Daily booking rollups per car, host and city.
+
+Booking.save and the deletion signal (bookings.signals) turn each state change
+into a signed delta of one booking's contribution and apply it to the three
+rollup rows of its start day, in the same transaction. Each booking carries the city it was booked in, so moving
+a car later does not shift past bookings between city rows. rebuild() recomputes
+a range of days from bookings; the nightly task runs it over every day touched
+since the previous run (touched_days) to correct any drift. Dashboards read
+rollup rows only, so their cost depends on the days and entities they cover, not
+on how many bookings exist.
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from bookings.models import Booking, DailyCarRollup, DailyCityRollup, DailyHostRollup
+
+# Booking fields a contribution depends on
+ROLLUP_FIELDS = ('car_id', 'host_id', 'city', 'status', 'renter_rating', 'start_date', 'total_days', 'subtotal', 'commission')
+REALIZED_STATUSES = ('confirmed', 'active', 'completed')
+METRICS = ('bookings', 'nights', 'subtotal', 'commission', 'completed', 'cancellations', 'rating_sum', 'rating_count')
+ROLLUP_MODELS = (DailyCarRollup, DailyHostRollup, DailyCityRollup)
+# Field that identifies a rollup row within its model, besides the date
+ROLLUP_KEYS = {DailyCarRollup: 'car_id', DailyHostRollup: 'host_id', DailyCityRollup: 'city'}
+DEFAULT_DAYS = 30
+MAX_DAYS = 366
+
+
+def contribution(state):
+    """(day, car_id, host_id, city, {metric: value}) one booking adds to the rollups, or None"""
+    if state is None or state['start_date'] is None:
+        return None
+    status = state['status']
+    metrics = {}
+    if status in REALIZED_STATUSES:
+        metrics.update(
+            bookings=1,
+            nights=state['total_days'] or 0,
+            subtotal=state['subtotal'] or 0,
+            commission=state['commission'] or 0
+        )
+    if status == 'completed':
+        metrics['completed'] = 1
+        if state['renter_rating']:
+            metrics.update(rating_sum=state['renter_rating'], rating_count=1)
+    if status == 'cancelled':
+        metrics['cancellations'] = 1
+    if not metrics:
+        return None
+    return timezone.localdate(state['start_date']), state['car_id'], state['host_id'], state['city'], metrics
+
+
+def record_change(previous, current):
+    """Move a booking's contribution from its previous state to its current one (None: absent)"""
+    before, after = contribution(previous), contribution(current)
+    if before == after:
+        return
+    if before:
+        apply(before, -1)
+    if after:
+        apply(after, 1)
+
+
+def apply(entry, sign):
+    day, car_id, host_id, city, metrics = entry
+    updates = {metric: F(metric) + sign * value for metric, value in metrics.items()}
+    updates['updated_at'] = timezone.now()
+    rows = (
+        (DailyCarRollup, {'car_id': car_id}, {'host_id': host_id}),
+        (DailyHostRollup, {'host_id': host_id}, {}),
+        (DailyCityRollup, {'city': city}, {}),
+    )
+    for model, key, extra in rows:
+        # Create-if-missing then increment: safe against a concurrent first write of the same day.
+        # Removals never create: a missing row holds nothing to remove, and during a cascade
+        # its car or host may already be gone.
+        if sign > 0:
+            model.objects.bulk_create([model(date=day, **key, **extra)], ignore_conflicts=True)
+        model.objects.filter(date=day, **key).update(**updates)
+
+
+def start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def rebuild(start, end):
+    """Recompute every rollup for local days start..end (inclusive) from bookings
+
+    The bookings of the range are locked before they are aggregated, and rollup rows
+    are overwritten in place rather than deleted, so a booking saved concurrently
+    either waits for the rebuild or applies its delta on top of the rebuilt row.
+    """
+    realized = Q(status__in=REALIZED_STATUSES)
+    completed = Q(status='completed')
+    bookings = Booking.objects.filter(
+        start_date__gte=start_of_day(start), start_date__lt=start_of_day(end + timedelta(days=1))
+    )
+
+    with transaction.atomic():
+        # Same lock order as Booking.save: the bookings first, then their rollup rows
+        list(bookings.select_for_update().values_list('pk', flat=True))
+        existing = {
+            model: {
+                (row.date, getattr(row, ROLLUP_KEYS[model])): row
+                for row in model.objects.select_for_update().filter(date__gte=start, date__lte=end)
+            }
+            for model in ROLLUP_MODELS
+        }
+
+        groups = (
+            bookings.annotate(day=TruncDate('start_date', tzinfo=timezone.get_current_timezone()))
+            .values('day', 'car_id', 'host_id', 'city')
+            .annotate(
+                bookings=Count('pk', filter=realized),
+                nights=Sum('total_days', filter=realized),
+                subtotal=Sum('subtotal', filter=realized),
+                commission=Sum('commission', filter=realized),
+                completed=Count('pk', filter=completed),
+                cancellations=Count('pk', filter=Q(status='cancelled')),
+                rating_sum=Sum('renter_rating', filter=completed),
+                rating_count=Count('renter_rating', filter=completed)
+            )
+            .order_by()
+        )
+
+        computed = {model: {} for model in ROLLUP_MODELS}
+        for group in groups:
+            metrics = {metric: group[metric] or 0 for metric in METRICS}
+            targets = (
+                (DailyCarRollup, group['car_id'], {'host_id': group['host_id']}),
+                (DailyHostRollup, group['host_id'], {}),
+                (DailyCityRollup, group['city'], {}),
+            )
+            for model, key, extra in targets:
+                row = computed[model].setdefault((group['day'], key), dict({metric: 0 for metric in METRICS}, **extra))
+                for metric, value in metrics.items():
+                    row[metric] += value
+
+        for model in ROLLUP_MODELS:
+            rows, stored = computed[model], existing[model]
+            # Rows with no bookings left are zeroed, not deleted, so waiting updates still find them
+            for key, row in stored.items():
+                for field, value in rows.get(key, {metric: 0 for metric in METRICS}).items():
+                    setattr(row, field, value)
+            fields = list(METRICS) + (['host'] if model is DailyCarRollup else [])
+            model.objects.bulk_update(stored.values(), fields, batch_size=1000)
+            model.objects.bulk_create(
+                [
+                    model(date=day, **{ROLLUP_KEYS[model]: key}, **row)
+                    for (day, key), row in rows.items() if (day, key) not in stored
+                ],
+                batch_size=1000,
+                ignore_conflicts=True
+            )
+    return len(computed[DailyCarRollup])
+
+
+def touched_days(since):
+    """Local days whose rollups may have changed since `since`, sorted
+
+    The start days of bookings saved since then, plus the days of rollup rows a
+    delta has touched, which covers bookings moved away or deleted. Every delta
+    touches the car, host and city rows of its day alike, so the city rows suffice.
+    """
+    booked = (
+        Booking.objects.filter(updated_at__gte=since)
+        .annotate(day=TruncDate('start_date', tzinfo=timezone.get_current_timezone()))
+        .values_list('day', flat=True)
+        .order_by()
+        .distinct()
+    )
+    applied = DailyCityRollup.objects.filter(updated_at__gte=since).values_list('date', flat=True).order_by().distinct()
+    return sorted(set(booked) | set(applied))
+
+
+def day_ranges(days):
+    """Group sorted days into inclusive (start, end) runs of consecutive days"""
+    ranges = []
+    for day in days:
+        if ranges and ranges[-1][1] + timedelta(days=1) == day:
+            ranges[-1] = (ranges[-1][0], day)
+        else:
+            ranges.append((day, day))
+    return ranges
+
+
+def sums():
+    return {metric: Sum(metric) for metric in METRICS}
+
+
+def with_derived(row):
+    """Zero-fill a row of summed metrics and add the average rating"""
+    row = {key: (value if value is not None else 0) for key, value in row.items()}
+    row['average_rating'] = round(row['rating_sum'] / row['rating_count'], 2) if row['rating_count'] else None
+    return row
+
+
+def totals(rollups):
+    return with_derived(rollups.aggregate(**sums()))
+
+
+def daily_series(rollups):
+    return [with_derived(row) for row in rollups.values('date').annotate(**sums()).order_by('date')]
+
+
+def breakdown(rollups, field):
+    return [with_derived(row) for row in rollups.values(field).annotate(**sums()).order_by('-subtotal')]
+
+
+def date_range(params):
+    """(start, end) local dates from ?start=&end=, inclusive; the last DEFAULT_DAYS by default"""
+    message = f'start and end must be YYYY-MM-DD dates at most {MAX_DAYS} days apart'
+    end = parse_date(params['end']) if params.get('end') else timezone.localdate()
+    if end is None:
+        raise ValueError(message)
+    start = parse_date(params['start']) if params.get('start') else end - timedelta(days=DEFAULT_DAYS - 1)
+    if start is None or not 0 <= (end - start).days < MAX_DAYS:
+        raise ValueError(message)
+    return start, end
@@ -0,0 +1,13 @@
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+from bookings.models import Booking, apply_car_stats
+from bookings.rollups import record_change
+
+
+@receiver(pre_delete, sender=Booking)
+def booking_deleted(sender, instance, **kwargs):
+    # Sent for instance deletes, QuerySet.delete() and cascades from users and cars alike,
+    # inside the deletion's transaction
+    apply_car_stats(instance.car_id, instance.status, instance.renter_rating, -1)
+    record_change(instance.rollup_state(), None)
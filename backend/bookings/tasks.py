@@ -0,0 +1,41 @@
+import tempfile
+import uuid
+from datetime import timedelta
+
+from celery import shared_task
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from bookings import rollups
+from bookings.exports import export_filename, export_queryset, stream
+
+
+@shared_task
+def export_to_storage(kind, fmt, start=None, end=None, user_id=None):
+    """Write an export to default_storage through a temporary file; returns where it went"""
+    start, end = parse_date(start) if start else None, parse_date(end) if end else None
+    user = get_user_model().objects.get(pk=user_id) if user_id else None
+
+    with tempfile.TemporaryFile() as buffer:
+        for line in stream(kind, export_queryset(kind, start, end, user), fmt):
+            buffer.write(line.encode('utf-8'))
+        size = buffer.tell()
+        buffer.seek(0)
+        path = default_storage.save(f'exports/{uuid.uuid4()}/{export_filename(kind, fmt, start, end)}', File(buffer))
+
+    return {'user_id': user_id, 'path': path, 'url': default_storage.url(path), 'size': size}
+
+
+@shared_task
+def rebuild_recent_rollups(days=3):
+    """Nightly backfill: recompute every rollup day touched in the last few days from bookings
+
+    Days are chosen by when bookings and rollups changed, not by when bookings start,
+    so late completions, ratings and cancellations, future bookings and deletions are
+    all covered. The overlap between runs leaves room for a missed night.
+    """
+    since = timezone.now() - timedelta(days=days)
+    return sum(rollups.rebuild(start, end) for start, end in rollups.day_ranges(rollups.touched_days(since)))
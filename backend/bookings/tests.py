@@ -1,3 +1,233 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.exceptions import ValidationError
 from django.test import TestCase
+from django.utils import timezone
+
+from bookings import exports, rollups
+from bookings.tasks import rebuild_recent_rollups
+from bookings.availability import BookingConflict, available_cars, ensure_available, is_available
+from bookings.models import Booking, DailyCarRollup, DailyCityRollup, DailyHostRollup
+from cars import calendar
+from cars.tests import make_booking, make_car, make_user
+
+
+class AvailabilityTests(TestCase):
+    def setUp(self):
+        self.renter = make_user('renter')
+        self.car = make_car(make_user('owner'), 'UBA 001A')
+        # Days 10..12 of the booking window
+        self.booking = make_booking(self.car, self.renter, 10, days=2)
+
+    def test_overlapping_booking_conflicts(self):
+        with self.assertRaises(BookingConflict):
+            make_booking(self.car, self.renter, 11, days=2)
+        with self.assertRaises(BookingConflict):
+            make_booking(self.car, self.renter, 9, days=5)
+
+        self.assertEqual(Booking.objects.filter(car=self.car).count(), 1)
+
+    def test_adjacent_bookings_are_allowed(self):
+        make_booking(self.car, self.renter, 8, days=2)
+        make_booking(self.car, self.renter, 12, days=3)
+
+        self.assertEqual(Booking.objects.filter(car=self.car).count(), 3)
+
+    def test_cancelled_bookings_do_not_block(self):
+        self.booking.status = 'cancelled'
+        self.booking.save()
+        replacement = make_booking(self.car, self.renter, 10, days=2)
+
+        self.assertFalse(is_available(self.car.pk, self.booking.start_date, self.booking.end_date))
+        self.assertTrue(is_available(
+            self.car.pk, self.booking.start_date, self.booking.end_date, exclude_booking=replacement.pk
+        ))
+
+    def test_reactivating_into_a_taken_interval_conflicts(self):
+        self.booking.status = 'cancelled'
+        self.booking.save()
+        make_booking(self.car, self.renter, 10, days=2)
+
+        self.booking.status = 'confirmed'
+        with self.assertRaises(BookingConflict):
+            self.booking.save()
+
+    def test_moving_a_booking_into_another_conflicts(self):
+        later = make_booking(self.car, self.renter, 20, days=2)
+        later.start_date = self.booking.start_date + timedelta(days=1)
+        later.end_date = later.start_date + timedelta(days=2)
+
+        with self.assertRaises(BookingConflict):
+            later.save()
+        later.refresh_from_db()
+        self.assertEqual(later.start_date, self.booking.start_date + timedelta(days=10))
+
+    def test_moving_a_booking_within_its_own_interval_is_allowed(self):
+        self.booking.end_date += timedelta(days=1)
+        self.booking.total_days = 3
+        self.booking.save()
+
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.total_days, 3)
+
+    def test_host_blocked_days_conflict(self):
+        start = timezone.now() + timedelta(days=30)
+        calendar.set_availability(
+            self.car.pk, timezone.localdate(start), timezone.localdate(start) + timedelta(days=3), is_available=False
+        )
+
+        with self.assertRaises(BookingConflict):
+            make_booking(self.car, self.renter, 31, days=1)
+        self.assertNotIn(self.car, available_cars(start, start + timedelta(days=1)))
+
+    def test_empty_interval_is_rejected(self):
+        with self.assertRaises(ValidationError):
+            ensure_available(self.car.pk, self.booking.start_date, self.booking.start_date)
+
+    def test_other_cars_are_unaffected(self):
+        other = make_car(self.car.owner, 'UBA 002A')
+        make_booking(other, self.renter, 10, days=2)
+
+        self.assertFalse(available_cars(self.booking.start_date, self.booking.end_date).exists())
+        self.assertEqual(
+            list(available_cars(self.booking.end_date, self.booking.end_date + timedelta(days=1)).order_by('pk')),
+            sorted([self.car, other], key=lambda car: car.pk)
+        )
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        self.renter = make_user('renter')
+        self.owner = make_user('owner')
+        self.car = make_car(self.owner, 'UBB 001A')
+        self.other_car = make_car(make_user('other_owner'), 'UBB 002A', city='Entebbe')
+
+    def snapshot(self):
+        """{(model, date, key): metrics} for every rollup row with a non-zero metric"""
+        rows = {}
+        for model in rollups.ROLLUP_MODELS:
+            key = rollups.ROLLUP_KEYS[model]
+            for row in model.objects.values('date', key, *rollups.METRICS):
+                metrics = {metric: row[metric] for metric in rollups.METRICS}
+                if any(metrics.values()):
+                    rows[(model.__name__, row['date'], str(row[key]))] = metrics
+        return rows
+
+    def assertMatchesRebuild(self):
+        incremental = self.snapshot()
+        self.assertTrue(incremental)
+        today = timezone.localdate()
+        rollups.rebuild(today, today + timedelta(days=60))
+        self.assertEqual(self.snapshot(), incremental)
+
+    def test_deltas_match_rebuild(self):
+        first = make_booking(self.car, self.renter, 1, days=3)
+        second = make_booking(self.car, self.renter, 5)
+        third = make_booking(self.other_car, self.renter, 1, status='pending')
+        self.assertMatchesRebuild()
+
+        first.status = 'completed'
+        first.renter_rating = 4
+        first.save()
+        second.status = 'cancelled'
+        second.save()
+        third.status = 'confirmed'
+        third.save()
+        self.assertMatchesRebuild()
+
+        # Moving a booking to another day and car moves its contribution too
+        third.car = self.car
+        third.host = self.owner
+        third.start_date += timedelta(days=10)
+        third.end_date += timedelta(days=10)
+        third.save()
+        first.renter_rating = 2
+        first.save(update_fields=['renter_rating'])
+        self.assertMatchesRebuild()
+
+        second.delete()
+        third.delete()
+        self.assertMatchesRebuild()
+
+    def test_cascaded_deletes_withdraw_contributions(self):
+        make_booking(self.car, self.renter, 1, status='completed', renter_rating=4)
+        make_booking(self.other_car, make_user('other_renter'), 2)
+
+        self.renter.delete()
+        self.assertMatchesRebuild()
+        self.assertEqual(set(DailyCityRollup.objects.exclude(bookings=0).values_list('city', flat=True)), {'Entebbe'})
+
+        # Deleting a host cascades through their cars to the bookings and the rollups themselves
+        self.other_car.owner.delete()
+        self.assertEqual(self.snapshot(), {})
+
+    def test_nightly_backfill_repairs_touched_days(self):
+        make_booking(self.car, self.renter, 20, status='completed', renter_rating=4)
+        deleted = make_booking(self.other_car, make_user('other_renter'), 40)
+        deleted.delete()
+        for model in (DailyCarRollup, DailyHostRollup, DailyCityRollup):
+            model.objects.update(bookings=99)
+
+        rebuild_recent_rollups()
+
+        self.assertMatchesRebuild()
+        self.assertEqual(set(DailyCityRollup.objects.exclude(bookings=0).values_list('city', flat=True)), {'Kampala'})
+
+    def test_day_ranges_join_consecutive_days(self):
+        today = timezone.localdate()
+        days = [today, today + timedelta(days=1), today + timedelta(days=3)]
+
+        self.assertEqual(
+            rollups.day_ranges(days),
+            [(today, today + timedelta(days=1)), (today + timedelta(days=3), today + timedelta(days=3))]
+        )
+
+    def test_totals_count_realized_bookings(self):
+        make_booking(self.car, self.renter, 1, days=3, status='completed', renter_rating=5)
+        make_booking(self.car, self.renter, 5, status='cancelled')
+        make_booking(self.car, self.renter, 8, status='pending')
+
+        totals = rollups.totals(DailyCityRollup.objects.filter(city='Kampala'))
+
+        self.assertEqual(
+            {key: totals[key] for key in ('bookings', 'nights', 'completed', 'cancellations', 'average_rating')},
+            {'bookings': 1, 'nights': 3, 'completed': 1, 'cancellations': 1, 'average_rating': 5.0}
+        )
+
+    def test_city_is_fixed_when_booked(self):
+        booking = make_booking(self.car, self.renter, 1, status='completed')
+        self.car.city = 'Jinja'
+        self.car.save()
+
+        booking.renter_rating = 3
+        booking.save()
+        self.assertMatchesRebuild()
+
+        cities = set(DailyCityRollup.objects.exclude(completed=0).values_list('city', flat=True))
+        self.assertEqual(cities, {'Kampala'})
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        renter = make_user('renter')
+        car = make_car(make_user('owner'), 'UBC 001A')
+        for start in range(0, 14, 2):
+            make_booking(car, renter, start + 1)
+        # Pages of two end inside runs of equal timestamps
+        moment = timezone.now().replace(microsecond=0)
+        for index, pk in enumerate(Booking.objects.order_by('start_date').values_list('pk', flat=True)):
+            Booking.objects.filter(pk=pk).update(created_at=moment + timedelta(seconds=index // 3))
+
+    @mock.patch('bookings.exports.CHUNK_SIZE', 2)
+    def test_keyset_pages_match_a_single_query(self):
+        for kind in exports.COLUMNS:
+            queryset = exports.export_queryset(kind)
+
+            self.assertEqual(list(exports.keyset_rows(kind, queryset)), list(queryset))
+
+    @mock.patch('bookings.exports.CHUNK_SIZE', 7)
+    def test_exact_final_page(self):
+        queryset = exports.export_queryset('bookings')
 
-# Create your tests here.
+        self.assertEqual(len(list(exports.keyset_rows('bookings', queryset))), 7)
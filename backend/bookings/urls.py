@@ -32,6 +32,9 @@ urlpatterns = [
     path('payments/<int:pk>/process/', views.BookingPaymentProcessView.as_view(), name='booking-payment-process'),
     path('payments/<int:pk>/status/', views.BookingPaymentStatusView.as_view(), name='booking-payment-status'),
     
+    # Booking messages
+    path('messages/<uuid:pk>/', views.BookingMessagesView.as_view(), name='booking-messages'),
+    
     # Booking disputes and support
     path('disputes/<int:pk>/', views.BookingDisputeView.as_view(), name='booking-dispute'),
     path('disputes/<int:pk>/create/', views.BookingDisputeCreateView.as_view(), name='booking-dispute-create'),
@@ -1,3 +1,290 @@
-from django.shortcuts import render
+from datetime import datetime
 
-# Create your views here.
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.shortcuts import get_object_or_404, render
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils import timezone
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from garipamoja.pagination import InvalidCursor, paginate_request
+
+from bookings import availability, exports, rollups
+from bookings.models import Booking, DailyCarRollup, DailyCityRollup
+from users.models import UserNotification
+
+
+def parse_instant(value):
+    """ISO datetime, or a date meaning midnight in the current timezone"""
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            return None
+        parsed = datetime(day.year, day.month, day.day)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+class BookingAvailabilityView(APIView):
+    """Bulk availability: which of these cars, or which cars in a city, are free over [start, end)"""
+    permission_classes = [permissions.AllowAny]
+    
+    MAX_RESULTS = 500
+    
+    def get(self, request):
+        params = request.query_params
+        car_ids = [car_id for car_id in params.get('car_ids', '').split(',') if car_id]
+        return self.respond(params.get('start'), params.get('end'), params.get('city'), car_ids, params.get('limit'))
+    
+    def post(self, request):
+        data = request.data
+        return self.respond(data.get('start'), data.get('end'), data.get('city'), data.get('car_ids') or [], data.get('limit'))
+    
+    def respond(self, start, end, city, car_ids, limit):
+        start, end = parse_instant(start), parse_instant(end)
+        if start is None or end is None or end <= start:
+            return Response({'detail': 'start and end are required and end must be after start'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        
+        if car_ids:
+            try:
+                free = availability.availability_map(car_ids[:self.MAX_RESULTS], start, end)
+            except ValidationError:
+                return Response({'detail': 'car_ids must be car UUIDs'}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({'start': start, 'end': end, 'availability': {str(k): v for k, v in free.items()}})
+        
+        try:
+            limit = min(int(limit or 100), self.MAX_RESULTS)
+        except ValueError:
+            limit = 100
+        cars = availability.available_cars(start, end, city=city).order_by('daily_rate').values(
+            'id', 'city', 'daily_rate', 'latitude', 'longitude'
+        )[:limit]
+        return Response({'start': start, 'end': end, 'city': city, 'cars': list(cars)})
+
+
+def booking_summary(booking):
+    return {
+        'id': str(booking.pk),
+        'car': {'id': str(booking.car_id), 'name': booking.car.full_name},
+        'renter_id': str(booking.renter_id),
+        'host_id': str(booking.host_id),
+        'start_date': booking.start_date,
+        'end_date': booking.end_date,
+        'status': booking.status,
+        'total_days': booking.total_days,
+        'total_amount': booking.total_amount,
+        'created_at': booking.created_at
+    }
+
+
+class BookingListView(APIView):
+    """The signed-in user's bookings, newest first; ?role=renter|host narrows them
+
+    All booking lists are cursor-paginated (?cursor=, ?page_size=).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    # Subclasses pin a status
+    statuses = None
+    
+    def get(self, request):
+        role = request.query_params.get('role')
+        if role == 'renter':
+            bookings = Booking.objects.filter(renter=request.user)
+        elif role == 'host':
+            bookings = Booking.objects.filter(host=request.user)
+        elif role in (None, ''):
+            bookings = Booking.objects.filter(Q(renter=request.user) | Q(host=request.user))
+        else:
+            return Response({'detail': 'role must be renter or host'}, status=status.HTTP_400_BAD_REQUEST)
+        if self.statuses:
+            bookings = bookings.filter(status__in=self.statuses)
+        
+        try:
+            rows, next_cursor = paginate_request(request, bookings.select_related('car__brand', 'car__model'))
+        except InvalidCursor as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'results': [booking_summary(booking) for booking in rows], 'next': next_cursor})
+
+
+class BookingHistoryView(BookingListView):
+    pass
+
+
+class ActiveBookingsView(BookingListView):
+    statuses = ('confirmed', 'active')
+
+
+class CompletedBookingsView(BookingListView):
+    statuses = ('completed',)
+
+
+class CancelledBookingsView(BookingListView):
+    statuses = ('cancelled',)
+
+
+class BookingMessagesView(APIView):
+    """Messages of one booking, oldest first; cursor-paginated"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request, pk):
+        booking = get_object_or_404(Booking.objects.filter(Q(renter=request.user) | Q(host=request.user)), pk=pk)
+        try:
+            rows, next_cursor = paginate_request(request, booking.messages.all(), descending=False)
+        except InvalidCursor as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'results': [
+                {
+                    'id': message.pk,
+                    'sender_id': str(message.sender_id),
+                    'message': message.message,
+                    'is_read': message.is_read,
+                    'created_at': message.created_at
+                }
+                for message in rows
+            ],
+            'next': next_cursor
+        })
+
+
+class BookingNotificationView(APIView):
+    """The signed-in user's booking notifications, newest first; cursor-paginated"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    NOTIFICATION_TYPES = ('booking_request', 'booking_confirmed', 'booking_cancelled')
+    
+    def get(self, request):
+        notifications = UserNotification.objects.filter(user=request.user, notification_type__in=self.NOTIFICATION_TYPES)
+        if request.query_params.get('unread'):
+            notifications = notifications.filter(is_read=False)
+        try:
+            rows, next_cursor = paginate_request(request, notifications)
+        except InvalidCursor as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'results': [
+                {
+                    'id': str(notification.pk),
+                    'type': notification.notification_type,
+                    'title': notification.title,
+                    'message': notification.message,
+                    'data': notification.data,
+                    'is_read': notification.is_read,
+                    'created_at': notification.created_at
+                }
+                for notification in rows
+            ],
+            'next': next_cursor
+        })
+
+
+
+class BookingCSVExportView(APIView):
+    """Stream an export as CSV (default) or NDJSON, optionally between ?start= and ?end= dates"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    kind = 'bookings'
+    
+    def get(self, request):
+        try:
+            return exports.streaming_response(request, self.kind)
+        except exports.ExportError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class BookingExportView(APIView):
+    """Background exports written to storage: POST queues one, GET ?job= reports on it"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    kind = 'bookings'
+    
+    def post(self, request):
+        from bookings.tasks import export_to_storage
+        
+        fmt = request.data.get('format', 'csv')
+        try:
+            if fmt not in exports.FORMATS:
+                raise exports.ExportError(f"format must be one of {', '.join(exports.FORMATS)}")
+            start, end = exports.parse_range(request.data)
+        except exports.ExportError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        job = export_to_storage.delay(
+            self.kind, fmt,
+            start.isoformat() if start else None,
+            end.isoformat() if end else None,
+            str(request.user.pk)
+        )
+        return Response({'job': job.id, 'status': job.status}, status=status.HTTP_202_ACCEPTED)
+    
+    def get(self, request):
+        from celery.result import AsyncResult
+        
+        job_id = request.query_params.get('job')
+        if not job_id:
+            return Response({'detail': 'job is required'}, status=status.HTTP_400_BAD_REQUEST)
+        job = AsyncResult(job_id)
+        if not job.successful():
+            return Response({'job': job_id, 'status': job.status})
+        if job.result.get('user_id') != str(request.user.pk):
+            return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'job': job_id, 'status': job.status, 'url': job.result['url'], 'size': job.result['size']})
+
+
+
+class BookingStatsView(APIView):
+    """Platform booking totals for ?start=&end= (default: the last 30 days), from the daily rollups"""
+    permission_classes = [permissions.IsAdminUser]
+    
+    def get(self, request):
+        try:
+            start, end = rollups.date_range(request.query_params)
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        days = DailyCityRollup.objects.filter(date__gte=start, date__lte=end)
+        return Response({'start': start, 'end': end, 'totals': rollups.totals(days)})
+
+
+class BookingRevenueView(APIView):
+    """Daily subtotal and commission, optionally for one ?city="""
+    permission_classes = [permissions.IsAdminUser]
+    
+    def get(self, request):
+        try:
+            start, end = rollups.date_range(request.query_params)
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        days = DailyCityRollup.objects.filter(date__gte=start, date__lte=end)
+        if request.query_params.get('city'):
+            days = days.filter(city__iexact=request.query_params['city'])
+        return Response({'start': start, 'end': end, 'totals': rollups.totals(days), 'days': rollups.daily_series(days)})
+
+
+class BookingAnalyticsView(APIView):
+    """Per-city breakdown and top cars by subtotal"""
+    permission_classes = [permissions.IsAdminUser]
+    
+    TOP_CARS = 20
+    
+    def get(self, request):
+        try:
+            start, end = rollups.date_range(request.query_params)
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        cities = DailyCityRollup.objects.filter(date__gte=start, date__lte=end)
+        cars = DailyCarRollup.objects.filter(date__gte=start, date__lte=end)
+        return Response({
+            'start': start,
+            'end': end,
+            'totals': rollups.totals(cities),
+            'cities': rollups.breakdown(cities, 'city'),
+            'top_cars': rollups.breakdown(cars, 'car_id')[:self.TOP_CARS]
+        })
@@ -0,0 +1,139 @@
+"""
+Cached read models for cars: detail pages, brand/model catalogs and listing pages.
+
+Keys are versioned by namespace (garipamoja.cache); cars.signals bumps the
+namespaces when cars, images, brands or models change.
+"""
+
+from garipamoja.cache import bump, get_or_set, make_key
+from garipamoja.pagination import paginate
+
+from cars.models import Car, CarBrand, CarModel
+
+DETAIL_TIMEOUT = 3600
+CATALOG_TIMEOUT = 86400
+LISTING_TIMEOUT = 120
+
+
+def car_namespace(car_id):
+    return f'car:{car_id}'
+
+
+def invalidate_car(car_id):
+    """The car's detail page and every listing page it may appear on"""
+    bump(car_namespace(car_id), 'listings')
+
+
+def car_owner(car_id):
+    """The car's owner id, cached until the car changes"""
+    def load():
+        return Car.objects.filter(pk=car_id).values_list('owner_id', flat=True).first()
+
+    return get_or_set(make_key([car_namespace(car_id)], 'owner'), load, DETAIL_TIMEOUT)
+
+
+def car_detail(car_id):
+    """Detail page data for an active car, or None
+
+    The page shows the owner's name and verification, so it is also versioned by
+    the owner's user namespace, which users.signals bumps on profile changes.
+    """
+    def load():
+        car = (
+            Car.objects.select_related('owner', 'brand', 'model')
+            .prefetch_related('images')
+            .filter(pk=car_id, is_active=True)
+            .first()
+        )
+        return serialize_car(car) if car is not None else None
+
+    owner_id = car_owner(car_id)
+    if owner_id is None:
+        return None
+    return get_or_set(
+        make_key([car_namespace(car_id), f'user:{owner_id}', 'catalog'], 'detail'), load, DETAIL_TIMEOUT
+    )
+
+
+def serialize_car(car):
+    return {
+        'id': str(car.pk),
+        'name': car.full_name,
+        'brand': {'id': car.brand_id, 'name': car.brand.name},
+        'model': {'id': car.model_id, 'name': car.model.name, 'year': car.model.year},
+        'owner': {'id': str(car.owner_id), 'name': car.owner.full_name, 'is_verified': car.owner.is_verified},
+        'year': car.year,
+        'fuel_type': car.fuel_type,
+        'transmission': car.transmission,
+        'car_type': car.car_type,
+        'color': car.color,
+        'mileage': car.mileage,
+        'engine_size': car.engine_size,
+        'seats': car.seats,
+        'doors': car.doors,
+        'condition': car.condition,
+        'features': car.features,
+        'description': car.description,
+        'city': car.city,
+        'latitude': car.latitude,
+        'longitude': car.longitude,
+        'daily_rate': car.daily_rate,
+        'weekly_rate': car.weekly_rate,
+        'monthly_rate': car.monthly_rate,
+        'security_deposit': car.security_deposit,
+        'is_verified': car.is_verified,
+        'average_rating': car.average_rating,
+        'rating_count': car.rating_count,
+        'total_bookings': car.total_bookings,
+        'images': [
+            {'url': image.image.url, 'caption': image.caption, 'is_primary': image.is_primary}
+            for image in car.images.all()
+        ]
+    }
+
+
+def listing_card(car):
+    """Summary of a car loaded with Car.objects.for_listing()"""
+    return {
+        'id': str(car.pk),
+        'name': car.full_name,
+        'city': car.city,
+        'car_type': car.car_type,
+        'fuel_type': car.fuel_type,
+        'transmission': car.transmission,
+        'latitude': car.latitude,
+        'longitude': car.longitude,
+        'daily_rate': car.daily_rate,
+        'average_rating': car.average_rating,
+        'image': car.primary_images[0].image.url if car.primary_images else None
+    }
+
+
+def brand_catalog():
+    def load():
+        return list(CarBrand.objects.order_by('name').values('id', 'name', 'country_of_origin'))
+
+    return get_or_set(make_key(['catalog'], 'brands'), load, CATALOG_TIMEOUT)
+
+
+def model_catalog(brand_id=None):
+    def load():
+        models = CarModel.objects.order_by('name', 'year')
+        if brand_id is not None:
+            models = models.filter(brand_id=brand_id)
+        return list(models.values('id', 'brand_id', 'name', 'year'))
+
+    return get_or_set(make_key(['catalog'], 'models', brand_id or 'all'), load, CATALOG_TIMEOUT)
+
+
+def listing_page(cursor, page_size, city=None):
+    """{'results', 'next'} for the page of active cars after cursor, newest first"""
+    def load():
+        cars = Car.objects.filter(is_active=True)
+        if city:
+            cars = cars.filter(city__iexact=city)
+        rows, next_cursor = paginate(cars.for_listing(), cursor, page_size)
+        return {'results': [listing_card(car) for car in rows], 'next': next_cursor}
+
+    key = make_key(['listings', 'catalog'], (city or '').lower(), page_size, cursor or 'first')
+    return get_or_set(key, load, LISTING_TIMEOUT)
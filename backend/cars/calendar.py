@@ -0,0 +1,122 @@
+"""
+Range-based car calendar: availability and price exceptions stored as [start, end) date ranges.
+
+Updates split the ranges they cut through and merge touching ranges with the same
+settings, so a host blocking a year is one row. Calendars are materialized per day
+from one range query and one booking query.
+"""
+
+from datetime import date, datetime, time, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from cars.models import Car, CarAvailabilityRange
+
+# A day no range covers: available, daily rate, no notes
+DEFAULT_SETTINGS = (True, None, '')
+
+
+def set_availability(car_id, start, end, is_available=True, price_override=None, notes=''):
+    """Apply settings to every day in [start, end), splitting and merging neighbouring ranges"""
+    if end <= start:
+        raise ValueError('end must be after start')
+    settings = (is_available, price_override, notes)
+
+    with transaction.atomic():
+        # Serialize calendar edits per car so ranges never overlap
+        list(Car.objects.select_for_update().filter(pk=car_id).values_list('pk', flat=True))
+
+        # Overlapping ranges plus the ones touching either end (merge candidates)
+        neighbours = list(CarAvailabilityRange.objects.filter(
+            car_id=car_id, start_date__lte=end, end_date__gte=start
+        ))
+
+        segments = []
+        for existing in neighbours:
+            if existing.start_date < start:
+                segments.append((existing.start_date, min(existing.end_date, start), existing.settings))
+            if existing.end_date > end:
+                segments.append((max(existing.start_date, end), existing.end_date, existing.settings))
+        if settings != DEFAULT_SETTINGS:
+            segments.append((start, end, settings))
+
+        merged = merge_segments(segments)
+        CarAvailabilityRange.objects.filter(pk__in=[existing.pk for existing in neighbours]).delete()
+        CarAvailabilityRange.objects.bulk_create([
+            CarAvailabilityRange(
+                car_id=car_id, start_date=seg_start, end_date=seg_end,
+                is_available=seg_settings[0], price_override=seg_settings[1], notes=seg_settings[2]
+            )
+            for seg_start, seg_end, seg_settings in merged
+        ])
+    return merged
+
+
+def clear_availability(car_id, start, end):
+    """Back to the defaults for [start, end)"""
+    return set_availability(car_id, start, end)
+
+
+def merge_segments(segments):
+    """Sort non-overlapping (start, end, settings) segments and join touching ones with equal settings"""
+    merged = []
+    for seg_start, seg_end, seg_settings in sorted(segments, key=lambda segment: segment[0]):
+        if merged and merged[-1][1] == seg_start and merged[-1][2] == seg_settings:
+            merged[-1] = (merged[-1][0], seg_end, seg_settings)
+        else:
+            merged.append((seg_start, seg_end, seg_settings))
+    return merged
+
+
+def materialize(car, start, end):
+    """Per-day calendar for [start, end): availability, price and booking status"""
+    from bookings.availability import overlapping_bookings
+
+    ranges = list(CarAvailabilityRange.objects.filter(
+        car=car, start_date__lt=end, end_date__gt=start
+    ).order_by('start_date'))
+    bookings = overlapping_bookings(start_of_day(start), start_of_day(end)).filter(car=car).values_list(
+        'start_date', 'end_date'
+    )
+
+    # Booked days: every calendar day a booking's [start, end) touches
+    booked = set()
+    for booked_from, booked_to in bookings:
+        day = max(timezone.localdate(booked_from), start)
+        last = min(timezone.localdate(booked_to - timedelta(microseconds=1)), end - timedelta(days=1))
+        while day <= last:
+            booked.add(day)
+            day += timedelta(days=1)
+
+    days = []
+    index = 0
+    day = start
+    while day < end:
+        while index < len(ranges) and ranges[index].end_date <= day:
+            index += 1
+        current = ranges[index] if index < len(ranges) and ranges[index].start_date <= day else None
+        is_available, price_override, notes = current.settings if current else DEFAULT_SETTINGS
+        days.append({
+            'date': day,
+            'is_available': is_available and day not in booked,
+            'is_booked': day in booked,
+            'price': price_override if price_override is not None else car.daily_rate,
+            'notes': notes
+        })
+        day += timedelta(days=1)
+    return days
+
+
+def start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def month_calendar(car, year, month):
+    start = date(year, month, 1)
+    end = date(year + month // 12, month % 12 + 1, 1)
+    return materialize(car, start, end)
+
+
+def year_calendar(car, year):
+    return materialize(car, date(year, 1, 1), date(year + 1, 1, 1))
@@ -0,0 +1,114 @@
+"""
+Geohash bucketing and radius search for car locations (no PostGIS required).
+
+Each car stores the geohash of its coordinates in an indexed column. A radius
+query covers its bounding box with a handful of geohash prefixes (index range
+scans), narrows to the exact box on latitude/longitude, then refines and sorts
+the survivors with a vectorized haversine.
+"""
+
+import math
+from decimal import Decimal
+
+import numpy as np
+from django.db.models import Q
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9  # ~5 m cells; searches use shorter prefixes
+MAX_PREFIX_CELLS = 24
+EARTH_RADIUS_KM = 6371.0088
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    latitude, longitude = float(latitude), float(longitude)
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < precision:
+        # Bits alternate longitude, latitude, starting with longitude
+        target, value = (lon_range, longitude) if even else (lat_range, latitude)
+        middle = (target[0] + target[1]) / 2
+        if value >= middle:
+            bits = bits * 2 + 1
+            target[0] = middle
+        else:
+            bits = bits * 2
+            target[1] = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(BASE32[bits])
+            bits, bit_count = 0, 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """(height, width) in degrees of a geohash cell"""
+    lat_bits = 5 * precision // 2
+    lon_bits = 5 * precision - lat_bits
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """(min_lat, max_lat, min_lon, max_lon) enclosing the circle; no antimeridian wrap"""
+    lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = max(math.cos(math.radians(latitude)), 1e-6)
+    lon_delta = min(math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat)), 180.0)
+    return (
+        max(latitude - lat_delta, -90.0), min(latitude + lat_delta, 90.0),
+        max(longitude - lon_delta, -180.0), min(longitude + lon_delta, 180.0)
+    )
+
+
+def covering_prefixes(box):
+    """Geohash prefixes whose cells cover the box, at the finest precision that needs few cells"""
+    min_lat, max_lat, min_lon, max_lon = box
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        rows = math.floor(max_lat / height) - math.floor(min_lat / height) + 1
+        cols = math.floor(max_lon / width) - math.floor(min_lon / width) + 1
+        if rows * cols <= MAX_PREFIX_CELLS:
+            break
+
+    prefixes = set()
+    for row in range(rows):
+        lat = min(min_lat + row * height, max_lat)
+        for col in range(cols):
+            lon = min(min_lon + col * width, max_lon)
+            prefixes.add(encode_geohash(lat, lon, precision))
+        prefixes.add(encode_geohash(lat, max_lon, precision))
+    for col in range(cols):
+        prefixes.add(encode_geohash(max_lat, min(min_lon + col * width, max_lon), precision))
+    prefixes.add(encode_geohash(max_lat, max_lon, precision))
+    return sorted(prefixes)
+
+
+def haversine_km(latitude, longitude, latitudes, longitudes):
+    """Distances from one point to arrays of points"""
+    lat1, lon1 = math.radians(latitude), math.radians(longitude)
+    lat2, lon2 = np.radians(latitudes), np.radians(longitudes)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def nearby(queryset, latitude, longitude, radius_km, limit=50):
+    """[(car_id, distance_km)] within radius_km, nearest first"""
+    box = bounding_box(latitude, longitude, radius_km)
+    cells = Q()
+    for prefix in covering_prefixes(box):
+        cells |= Q(geohash__startswith=prefix)
+
+    candidates = list(queryset.filter(
+        cells,
+        latitude__gte=Decimal(str(box[0])), latitude__lte=Decimal(str(box[1])),
+        longitude__gte=Decimal(str(box[2])), longitude__lte=Decimal(str(box[3]))
+    ).values_list('pk', 'latitude', 'longitude'))
+    if not candidates:
+        return []
+
+    ids = [candidate[0] for candidate in candidates]
+    points = np.array([(float(candidate[1]), float(candidate[2])) for candidate in candidates])
+    distances = haversine_km(latitude, longitude, points[:, 0], points[:, 1])
+
+    inside = np.flatnonzero(distances <= radius_km)
+    nearest = inside[np.argsort(distances[inside], kind='stable')][:limit]
+    return [(ids[i], float(distances[i])) for i in nearest]
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from cars.geo import encode_geohash
+from cars.models import Car
+
+
+class Command(BaseCommand):
+    help = "Compute the geohash column for cars saved before it existed or edited with queryset.update()"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Cars written per bulk update')
+        parser.add_argument('--all', action='store_true', help='Recompute every car, not only those missing a geohash')
+
+    def handle(self, *args, **options):
+        cars = Car.objects.filter(latitude__isnull=False, longitude__isnull=False).order_by('pk')
+        if not options['all']:
+            cars = cars.filter(geohash='')
+
+        batch, updated = [], 0
+        for car in cars.only('pk', 'latitude', 'longitude', 'geohash').iterator(chunk_size=options['batch_size']):
+            car.geohash = encode_geohash(car.latitude, car.longitude)
+            batch.append(car)
+            if len(batch) >= options['batch_size']:
+                updated += Car.objects.bulk_update(batch, ['geohash'])
+                batch = []
+        if batch:
+            updated += Car.objects.bulk_update(batch, ['geohash'])
+
+        self.stdout.write(self.style.SUCCESS(f'Updated geohash for {updated} cars'))
@@ -0,0 +1,52 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from cars.calendar import DEFAULT_SETTINGS, merge_segments
+from cars.models import CarAvailability, CarAvailabilityRange
+
+
+class Command(BaseCommand):
+    help = "Convert per-day CarAvailability rows into CarAvailabilityRange runs"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--delete-legacy', action='store_true', help='Delete the per-day rows once converted')
+
+    def handle(self, *args, **options):
+        rows = CarAvailability.objects.order_by('car_id', 'date').values_list(
+            'car_id', 'date', 'is_available', 'price_override', 'notes'
+        ).iterator(chunk_size=5000)
+
+        cars = ranges = 0
+        car_id, segments = None, []
+        for row_car_id, day, is_available, price_override, notes in rows:
+            if row_car_id != car_id:
+                if car_id is not None:
+                    ranges += self.replace_ranges(car_id, segments, options['delete_legacy'])
+                    cars += 1
+                car_id, segments = row_car_id, []
+            settings = (is_available, price_override, notes)
+            if settings != DEFAULT_SETTINGS:
+                segments.append((day, day + timedelta(days=1), settings))
+        if car_id is not None:
+            ranges += self.replace_ranges(car_id, segments, options['delete_legacy'])
+            cars += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Converted {cars} cars into {ranges} availability ranges"))
+
+    def replace_ranges(self, car_id, segments, delete_legacy):
+        """Swap one car's ranges for the runs built from its day rows"""
+        merged = merge_segments(segments)
+        with transaction.atomic():
+            CarAvailabilityRange.objects.filter(car_id=car_id).delete()
+            CarAvailabilityRange.objects.bulk_create([
+                CarAvailabilityRange(
+                    car_id=car_id, start_date=start, end_date=end,
+                    is_available=settings[0], price_override=settings[1], notes=settings[2]
+                )
+                for start, end, settings in merged
+            ])
+            if delete_legacy:
+                CarAvailability.objects.filter(car_id=car_id).delete()
+        return len(merged)
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from bookings.models import Booking
+from cars.models import Car
+
+
+class Command(BaseCommand):
+    help = "Recompute every car's rating and completed-booking aggregates from bookings"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Cars updated per transaction')
+        parser.add_argument('--car', action='append', dest='car_ids', help='Only rebuild these car ids')
+
+    def handle(self, *args, **options):
+        completed = Booking.objects.filter(car=OuterRef('pk'), status='completed').order_by().values('car')
+
+        def aggregate(expression):
+            return Coalesce(
+                Subquery(completed.annotate(value=expression).values('value'), output_field=IntegerField()),
+                Value(0)
+            )
+
+        cars = Car.objects.order_by('pk')
+        if options['car_ids']:
+            cars = cars.filter(pk__in=options['car_ids'])
+
+        car_ids = list(cars.values_list('pk', flat=True))
+        batch_size = options['batch_size']
+        for start in range(0, len(car_ids), batch_size):
+            # One UPDATE ... SET col = (subquery) per batch keeps row locks short
+            with transaction.atomic():
+                Car.objects.filter(pk__in=car_ids[start:start + batch_size]).update(
+                    completed_bookings_count=aggregate(Count('pk')),
+                    rating_sum=aggregate(Sum('renter_rating')),
+                    rating_count=aggregate(Count('renter_rating'))
+                )
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt aggregates for {len(car_ids)} cars"))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from cars import search
+from cars.models import Car
+
+
+class Command(BaseCommand):
+    help = "Rebuild the car search index and warm the unfiltered facet counts"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Cars reindexed per transaction')
+        parser.add_argument('--car', action='append', dest='car_ids', help='Only reindex these car ids')
+
+    def handle(self, *args, **options):
+        cars = Car.objects.all()
+        if options['car_ids']:
+            cars = cars.filter(pk__in=options['car_ids'])
+
+        indexed = search.reindex(cars, batch_size=options['batch_size'])
+        search.search()
+
+        self.stdout.write(self.style.SUCCESS(f"Reindexed {indexed} cars"))
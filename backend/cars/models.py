@@ -3,6 +3,8 @@ from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
 import uuid
 
+from cars.geo import encode_geohash
+
 class CarBrand(models.Model):
     """Car brand/manufacturer"""
     name = models.CharField(max_length=100, unique=True)
@@ -24,9 +26,19 @@ class CarModel(models.Model):
     def __str__(self):
         return f"{self.brand.name} {self.name} {self.year}"
 
+class CarQuerySet(models.QuerySet):
+    def for_listing(self):
+        """Everything a listing card renders, in a constant number of queries"""
+        return self.select_related('owner', 'brand', 'model').prefetch_related(
+            models.Prefetch('images', queryset=CarImage.objects.filter(is_primary=True), to_attr='primary_images')
+        )
+
 class Car(models.Model):
     """Car listing model"""
     
+    # Maintained by Booking.save and bookings.signals; rebuild with `manage.py rebuild_car_stats`
+    AGGREGATE_FIELDS = ('rating_sum', 'rating_count', 'completed_bookings_count')
+    
     FUEL_TYPES = (
         ('petrol', 'Petrol'),
         ('diesel', 'Diesel'),
@@ -88,6 +100,7 @@ class Car(models.Model):
     address = models.TextField()
     latitude = models.DecimalField(max_digits=9, decimal_places=6, blank=True, null=True)
     longitude = models.DecimalField(max_digits=9, decimal_places=6, blank=True, null=True)
+    geohash = models.CharField(max_length=12, blank=True, db_index=True, editable=False)
     
     # Pricing
     daily_rate = models.DecimalField(max_digits=8, decimal_places=2)
@@ -105,30 +118,65 @@ class Car(models.Model):
     registration_expiry = models.DateField(blank=True, null=True)
     inspection_expiry = models.DateField(blank=True, null=True)
     
+    # Booking aggregates
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    completed_bookings_count = models.PositiveIntegerField(default=0)
+    
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = CarQuerySet.as_manager()
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['latitude', 'longitude'], name='car_coordinates_idx'),
+            # Cursor pagination of listings and of each host's cars (garipamoja.pagination)
+            models.Index(fields=['-created_at', '-id'], condition=models.Q(is_active=True), name='car_active_recent_idx'),
+            models.Index(fields=['owner', '-created_at', '-id'], name='car_owner_recent_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.brand.name} {self.model.name} - {self.license_plate}"
     
+    def save(self, *args, **kwargs):
+        self.geohash = (
+            encode_geohash(self.latitude, self.longitude)
+            if self.latitude is not None and self.longitude is not None else ''
+        )
+        # Never write back aggregates loaded earlier; bookings update them with F() expressions
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = list(update_fields) + ['geohash']
+        if not self._state.adding and update_fields is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.AGGREGATE_FIELDS
+            ]
+        super().save(*args, **kwargs)
+        
+        from cars.search import index_car
+        index_car(self)
+    
+    def delete(self, *args, **kwargs):
+        from cars.search import invalidate
+        
+        result = super().delete(*args, **kwargs)
+        invalidate()
+        return result
+    
     @property
     def full_name(self):
         return f"{self.brand.name} {self.model.name} {self.year}"
     
     @property
     def average_rating(self):
-        from bookings.models import Booking
-        bookings = Booking.objects.filter(car=self, status='completed')
-        if bookings.exists():
-            ratings = [booking.renter_rating for booking in bookings if booking.renter_rating]
-            return sum(ratings) / len(ratings) if ratings else 0
-        return 0
+        return self.rating_sum / self.rating_count if self.rating_count else 0
     
     @property
     def total_bookings(self):
-        from bookings.models import Booking
-        return Booking.objects.filter(car=self, status='completed').count()
+        return self.completed_bookings_count
 
 class CarImage(models.Model):
     """Car images"""
@@ -147,7 +195,10 @@ class CarImage(models.Model):
         return f"Image for {self.car.full_name}"
 
 class CarAvailability(models.Model):
-    """Car availability calendar"""
+    """Legacy per-day availability rows; superseded by CarAvailabilityRange
+
+    Convert with `manage.py migrate_availability_ranges`.
+    """
     car = models.ForeignKey(Car, on_delete=models.CASCADE, related_name='availability')
     date = models.DateField()
     is_available = models.BooleanField(default=True)
@@ -160,6 +211,56 @@ class CarAvailability(models.Model):
     def __str__(self):
         return f"{self.car.full_name} - {self.date}"
 
+class CarAvailabilityRange(models.Model):
+    """Availability exception over [start_date, end_date)
+
+    Days not covered by any range are available at the car's daily rate. Ranges of
+    one car never overlap, and touching ranges with identical settings are merged;
+    cars.calendar.set_availability maintains both rules.
+    """
+    car = models.ForeignKey(Car, on_delete=models.CASCADE, related_name='availability_ranges')
+    start_date = models.DateField()
+    end_date = models.DateField(help_text='First day after the range')
+    is_available = models.BooleanField(default=True)
+    price_override = models.DecimalField(max_digits=8, decimal_places=2, blank=True, null=True)
+    notes = models.TextField(blank=True)
+    
+    class Meta:
+        ordering = ['start_date']
+        indexes = [
+            models.Index(fields=['car', 'start_date', 'end_date'], name='car_availability_range_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(check=models.Q(end_date__gt=models.F('start_date')), name='availability_range_not_empty'),
+        ]
+    
+    def __str__(self):
+        return f"{self.car.full_name} - {self.start_date} to {self.end_date}"
+    
+    @property
+    def settings(self):
+        return (self.is_available, self.price_override, self.notes)
+
+class CarSearchTerm(models.Model):
+    """Inverted index posting: a normalized term and its weight in one car's listing
+    
+    Written by cars.search.index_car; rebuild with `manage.py reindex_car_search`.
+    """
+    term = models.CharField(max_length=64)
+    car = models.ForeignKey(Car, on_delete=models.CASCADE, related_name='search_terms')
+    weight = models.PositiveSmallIntegerField(default=1)
+    
+    class Meta:
+        unique_together = ('term', 'car')
+        indexes = [
+            models.Index(fields=['car'], name='car_search_term_car_idx'),
+            # Prefix (term__startswith) lookups; the unique index can't serve LIKE 'x%' under non-C collations
+            models.Index(fields=['term'], opclasses=['varchar_pattern_ops'], name='car_search_term_prefix_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.term} -> {self.car_id}"
+
 class CarFeature(models.Model):
     """Car features catalog"""
     name = models.CharField(max_length=100, unique=True)
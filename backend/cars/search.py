@@ -0,0 +1,206 @@
+"""
+Car search: a weighted inverted index over listings, facet counts and cached results.
+
+Every car's brand, model, features, city and description are tokenized into
+CarSearchTerm postings, kept current by Car.save. A query intersects the posting
+lists of its terms through the (term, car) index (the last term also matches as a
+prefix), ranks by summed weight and counts facets over the matching cars with
+one grouped query per facet. Results are cached in the versioned "car_search"
+namespace (garipamoja.cache), which every index write bumps, so nothing stale
+outlives a listing change.
+"""
+
+import hashlib
+import json
+import re
+
+from django.db import transaction
+from django.db.models import Count, ExpressionWrapper, F, FloatField, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, NullIf
+
+from garipamoja.cache import bump, get_or_set, make_key
+
+from cars.models import Car, CarSearchTerm
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+STOP_WORDS = frozenset(('a', 'an', 'and', 'for', 'in', 'is', 'of', 'on', 'the', 'to', 'with'))
+MAX_TERM_LENGTH = 64
+MAX_QUERY_TERMS = 8
+
+# Postings weigh where a term appears in the listing
+FIELD_WEIGHTS = {'brand': 5, 'model': 5, 'car_type': 3, 'features': 3, 'city': 2, 'color': 2, 'description': 1}
+
+FACET_FIELDS = ('car_type', 'fuel_type', 'transmission', 'city')
+# Daily rate bands as (label, lower bound inclusive, upper bound exclusive)
+PRICE_BANDS = (
+    ('under_2000', None, 2000),
+    ('2000_5000', 2000, 5000),
+    ('5000_10000', 5000, 10000),
+    ('10000_plus', 10000, None),
+)
+SORTS = {
+    'relevance': ('-score', '-created_at', 'pk'),
+    'price_low': ('daily_rate', 'pk'),
+    'price_high': ('-daily_rate', 'pk'),
+    # Best average first; among equal averages the more-rated car, unrated cars last
+    'rating': (F('rating_average').desc(nulls_last=True), '-rating_count', 'pk'),
+    'newest': ('-created_at', 'pk'),
+}
+
+RATING_AVERAGE = ExpressionWrapper(F('rating_sum') * 1.0 / NullIf(F('rating_count'), 0), output_field=FloatField())
+
+CACHE_TIMEOUT = 300
+
+
+def tokenize(text):
+    return [
+        token[:MAX_TERM_LENGTH] for token in TOKEN_PATTERN.findall(str(text).lower())
+        if len(token) > 1 and token not in STOP_WORDS
+    ]
+
+
+def document_terms(car):
+    """{term: weight} for one car, the highest field weight winning"""
+    fields = {
+        'brand': car.brand.name,
+        'model': car.model.name,
+        'car_type': car.get_car_type_display(),
+        'features': ' '.join(str(feature) for feature in car.features or []),
+        'city': car.city,
+        'color': car.color,
+        'description': car.description,
+    }
+    terms = {}
+    for field, text in fields.items():
+        for token in tokenize(text):
+            terms[token] = max(terms.get(token, 0), FIELD_WEIGHTS[field])
+    return terms
+
+
+def index_car(car):
+    """Rewrite one car's postings if its searchable text changed; always invalidates cached results"""
+    terms = document_terms(car)
+    with transaction.atomic():
+        current = dict(CarSearchTerm.objects.filter(car=car).values_list('term', 'weight'))
+        if current != terms:
+            CarSearchTerm.objects.filter(car=car).delete()
+            CarSearchTerm.objects.bulk_create([
+                CarSearchTerm(term=term, car=car, weight=weight) for term, weight in terms.items()
+            ])
+    invalidate()
+
+
+def reindex(queryset=None, batch_size=500):
+    """Rebuild postings for many cars, batch by batch; returns the number of cars indexed"""
+    cars = (queryset if queryset is not None else Car.objects.all()).select_related('brand', 'model').order_by('pk')
+    indexed = 0
+    batch = []
+    for car in cars.iterator(chunk_size=batch_size):
+        batch.append(car)
+        if len(batch) >= batch_size:
+            indexed += write_postings(batch)
+            batch = []
+    if batch:
+        indexed += write_postings(batch)
+    invalidate()
+    return indexed
+
+
+def write_postings(cars):
+    with transaction.atomic():
+        CarSearchTerm.objects.filter(car__in=cars).delete()
+        CarSearchTerm.objects.bulk_create([
+            CarSearchTerm(term=term, car=car, weight=weight)
+            for car in cars
+            for term, weight in document_terms(car).items()
+        ], batch_size=1000)
+    return len(cars)
+
+
+def invalidate():
+    """Retire every cached search result once the current transaction commits"""
+    transaction.on_commit(lambda: bump('car_search'))
+
+
+def price_band_filter(label):
+    for band, lower, upper in PRICE_BANDS:
+        if band == label:
+            condition = Q()
+            if lower is not None:
+                condition &= Q(daily_rate__gte=lower)
+            if upper is not None:
+                condition &= Q(daily_rate__lt=upper)
+            return condition
+    raise ValueError(f'Unknown price band: {label}')
+
+
+def filtered_cars(filters):
+    """Active cars narrowed by facet values and price bounds"""
+    cars = Car.objects.filter(is_active=True)
+    for field in FACET_FIELDS:
+        if filters.get(field):
+            lookup = f'{field}__iexact' if field == 'city' else field
+            cars = cars.filter(**{lookup: filters[field]})
+    if filters.get('price_band'):
+        cars = cars.filter(price_band_filter(filters['price_band']))
+    if filters.get('min_price') is not None:
+        cars = cars.filter(daily_rate__gte=filters['min_price'])
+    if filters.get('max_price') is not None:
+        cars = cars.filter(daily_rate__lte=filters['max_price'])
+    return cars
+
+
+def matching_cars(cars, query):
+    """Cars containing every query term (the last one as a prefix), annotated with a relevance score"""
+    terms = tokenize(query)[:MAX_QUERY_TERMS]
+    if not terms:
+        return cars.annotate(score=Value(0, output_field=IntegerField()))
+
+    *exact, prefix = terms
+    for term in exact:
+        cars = cars.filter(pk__in=CarSearchTerm.objects.filter(term=term).values('car'))
+    cars = cars.filter(pk__in=CarSearchTerm.objects.filter(term__startswith=prefix).values('car'))
+
+    score = CarSearchTerm.objects.filter(
+        Q(term__in=exact) | Q(term__startswith=prefix), car=OuterRef('pk')
+    ).order_by().values('car').annotate(total=Sum('weight')).values('total')
+    return cars.annotate(score=Coalesce(Subquery(score, output_field=IntegerField()), Value(0)))
+
+
+def facet_counts(cars):
+    """{facet: {value: count}} over the given cars"""
+    cars = cars.order_by()
+    facets = {}
+    for field in FACET_FIELDS:
+        facets[field] = {
+            row[field]: row['count']
+            for row in cars.values(field).annotate(count=Count('pk')).order_by('-count', field)
+        }
+    bands = cars.aggregate(**{
+        band: Count('pk', filter=price_band_filter(band)) for band, _, _ in PRICE_BANDS
+    })
+    facets['price_band'] = {band: bands[band] for band, _, _ in PRICE_BANDS}
+    return facets
+
+
+def cache_key(query, filters, sort, offset, limit):
+    params = json.dumps([query, filters, sort, offset, limit], sort_keys=True, default=str)
+    return make_key(['car_search'], hashlib.sha1(params.encode()).hexdigest())
+
+
+def search(query='', filters=None, sort='relevance', offset=0, limit=20):
+    """{'count', 'ids', 'facets'} for one page of results; ids are car primary keys as strings"""
+    filters = {key: value for key, value in (filters or {}).items() if value not in (None, '')}
+    if sort not in SORTS:
+        raise ValueError(f'Unknown sort: {sort}')
+
+    def load():
+        base = filtered_cars(filters)
+        cars = matching_cars(base, query).annotate(rating_average=RATING_AVERAGE)
+        return {
+            'count': cars.count(),
+            'ids': [str(car_id) for car_id in cars.order_by(*SORTS[sort]).values_list('pk', flat=True)[offset:offset + limit]],
+            'facets': facet_counts(base.filter(pk__in=cars.values('pk')) if tokenize(query) else base),
+        }
+
+    return get_or_set(cache_key(query.strip().lower(), filters, sort, offset, limit), load, CACHE_TIMEOUT)
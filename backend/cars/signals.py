@@ -0,0 +1,33 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from garipamoja.cache import bump
+
+from cars.cache import invalidate_car
+from cars.models import Car, CarBrand, CarImage, CarModel
+
+# Versions are bumped once the change commits, and garipamoja.cache fills entries from
+# the primary, so a concurrent read cannot re-cache the old row (from before the commit,
+# or from a lagging replica) under the new version. Ids are captured first: delete()
+# clears instance.pk.
+
+
+@receiver([post_save, post_delete], sender=Car)
+def car_changed(sender, instance, **kwargs):
+    car_id, owner_id = instance.pk, instance.owner_id
+    # Host profiles show active listing counts
+    transaction.on_commit(lambda: (invalidate_car(car_id), bump(f'user:{owner_id}')))
+
+
+@receiver([post_save, post_delete], sender=CarImage)
+def car_image_changed(sender, instance, **kwargs):
+    car_id = instance.car_id
+    transaction.on_commit(lambda: invalidate_car(car_id))
+
+
+@receiver([post_save, post_delete], sender=CarBrand)
+@receiver([post_save, post_delete], sender=CarModel)
+def catalog_changed(sender, instance, **kwargs):
+    # Brand and model names appear on every detail page and listing card
+    transaction.on_commit(lambda: bump('catalog'))
@@ -1,3 +1,260 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from uuid import uuid4
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from bookings.models import Booking
+from garipamoja import db_router
+from garipamoja.cache import get_or_set, make_key
+from cars import cache as car_cache, calendar, search
+from cars.models import Car, CarAvailabilityRange, CarBrand, CarModel
+from cars.views import CarCalendarView, NearbyCarsView
+
+
+def make_user(name):
+    return get_user_model().objects.create_user(username=name, email=f'{name}@example.com', password='secret')
+
+
+def make_car(owner, plate, **fields):
+    brand, _ = CarBrand.objects.get_or_create(name='Toyota')
+    model, _ = CarModel.objects.get_or_create(brand=brand, name='Corolla', year=2018)
+    values = dict(
+        owner=owner, brand=brand, model=model, license_plate=plate, year=2018, fuel_type='petrol',
+        transmission='automatic', car_type='sedan', color='White', mileage=50000, engine_size=Decimal('1.8'),
+        description='Clean family sedan', city='Kampala', address='Plot 1', daily_rate=Decimal('100000')
+    )
+    values.update(fields)
+    return Car.objects.create(**values)
+
+
+def make_booking(car, renter, start_in_days, days=2, status='confirmed', **fields):
+    start = timezone.now().replace(microsecond=0) + timedelta(days=start_in_days)
+    return Booking.objects.create(
+        car=car, renter=renter, host=car.owner, start_date=start, end_date=start + timedelta(days=days),
+        pickup_location=car.city, dropoff_location=car.city, daily_rate=car.daily_rate, total_days=days,
+        security_deposit=Decimal('0'), status=status, **fields
+    )
+
+
+class CarStatsTests(TestCase):
+    def setUp(self):
+        self.owner = make_user('owner')
+        self.renter = make_user('renter')
+        self.car = make_car(self.owner, 'UAB 001A')
+
+    def stats(self):
+        return Car.objects.filter(pk=self.car.pk).values('rating_sum', 'rating_count', 'completed_bookings_count').get()
+
+    def assertStats(self, rating_sum, rating_count, completed):
+        """The incrementally maintained aggregates, and the same after rebuild_car_stats"""
+        expected = {'rating_sum': rating_sum, 'rating_count': rating_count, 'completed_bookings_count': completed}
+        self.assertEqual(self.stats(), expected)
+        call_command('rebuild_car_stats', stdout=StringIO())
+        self.assertEqual(self.stats(), expected)
+
+    def test_aggregates_follow_booking_lifecycle(self):
+        first = make_booking(self.car, self.renter, 1)
+        second = make_booking(self.car, self.renter, 5)
+        self.assertStats(0, 0, 0)
+
+        first.status = 'completed'
+        first.save()
+        self.assertStats(0, 0, 1)
+
+        first.renter_rating = 4
+        first.save(update_fields=['renter_rating'])
+        second.status = 'completed'
+        second.renter_rating = 5
+        second.save()
+        self.assertStats(9, 2, 2)
+
+        # Re-rating replaces the old rating instead of adding to it
+        first.renter_rating = 2
+        first.save()
+        self.assertStats(7, 2, 2)
+
+        # Un-completing withdraws the booking and its rating
+        first.status = 'disputed'
+        first.save()
+        self.assertStats(5, 1, 1)
+
+        second.delete()
+        self.assertStats(0, 0, 0)
+
+    def test_cascaded_and_bulk_deletes_withdraw_bookings(self):
+        make_booking(self.car, self.renter, 1, status='completed', renter_rating=5)
+        other_renter = make_user('other_renter')
+        make_booking(self.car, other_renter, 5, status='completed', renter_rating=3)
+        self.assertStats(8, 2, 2)
+
+        self.renter.delete()
+        self.assertStats(3, 1, 1)
+
+        Booking.objects.filter(car=self.car).delete()
+        self.assertStats(0, 0, 0)
+
+    def test_saves_of_untracked_fields_leave_aggregates_alone(self):
+        booking = make_booking(self.car, self.renter, 1, status='completed', renter_rating=5)
+        booking.renter_comment = 'Great car'
+        booking.save(update_fields=['renter_comment'])
+        booking.save()
+
+        self.assertStats(5, 1, 1)
+
+    def test_car_edits_do_not_overwrite_aggregates(self):
+        make_booking(self.car, self.renter, 1, status='completed', renter_rating=3)
+        # self.car still holds the zero aggregates loaded before the booking
+        self.car.color = 'Blue'
+        self.car.save()
+
+        self.assertStats(3, 1, 1)
+
+
+class CarCalendarTests(TestCase):
+    def setUp(self):
+        self.car = make_car(make_user('owner'), 'UAC 001A')
+
+    def day(self, number):
+        return date(2030, 1, number)
+
+    def stored(self):
+        return list(
+            CarAvailabilityRange.objects.filter(car=self.car).order_by('start_date')
+            .values_list('start_date', 'end_date', 'is_available', 'price_override')
+        )
+
+    def test_unblocking_the_middle_splits_the_range(self):
+        calendar.set_availability(self.car.pk, self.day(10), self.day(20), is_available=False)
+        calendar.clear_availability(self.car.pk, self.day(13), self.day(15))
+
+        self.assertEqual(self.stored(), [
+            (self.day(10), self.day(13), False, None),
+            (self.day(15), self.day(20), False, None),
+        ])
+
+    def test_blocking_the_gap_merges_into_one_range(self):
+        calendar.set_availability(self.car.pk, self.day(10), self.day(13), is_available=False)
+        calendar.set_availability(self.car.pk, self.day(15), self.day(20), is_available=False)
+        calendar.set_availability(self.car.pk, self.day(13), self.day(15), is_available=False)
+
+        self.assertEqual(self.stored(), [(self.day(10), self.day(20), False, None)])
+
+    def test_touching_ranges_with_other_settings_stay_apart(self):
+        calendar.set_availability(self.car.pk, self.day(10), self.day(20), is_available=False)
+        calendar.set_availability(self.car.pk, self.day(12), self.day(14), price_override=Decimal('80000'))
+
+        self.assertEqual(self.stored(), [
+            (self.day(10), self.day(12), False, None),
+            (self.day(12), self.day(14), True, Decimal('80000')),
+            (self.day(14), self.day(20), False, None),
+        ])
+
+        calendar.clear_availability(self.car.pk, self.day(1), self.day(31))
+        self.assertEqual(self.stored(), [])
+
+    def test_materialize_applies_ranges_per_day(self):
+        calendar.set_availability(self.car.pk, self.day(10), self.day(12), is_available=False)
+        calendar.set_availability(self.car.pk, self.day(12), self.day(13), price_override=Decimal('80000'))
+
+        days = calendar.materialize(self.car, self.day(9), self.day(14))
+
+        self.assertEqual(
+            [(day['date'], day['is_available'], day['price']) for day in days],
+            [
+                (self.day(9), True, Decimal('100000')),
+                (self.day(10), False, Decimal('100000')),
+                (self.day(11), False, Decimal('100000')),
+                (self.day(12), True, Decimal('80000')),
+                (self.day(13), True, Decimal('100000')),
+            ]
+        )
+
+    def test_calendar_view_rejects_years_without_a_following_year(self):
+        view = CarCalendarView.as_view()
+        for query in ('?year=10000', '?year=9999&month=12', '?year=0', '?year=2030&month=13'):
+            response = view(APIRequestFactory().get(f'/{query}'), pk=self.car.pk)
+            self.assertEqual(response.status_code, 400, query)
+
+        response = view(APIRequestFactory().get('/?year=9998&month=12'), pk=self.car.pk)
+        self.assertEqual(len(response.data['days']), 31)
+
+    def test_empty_range_is_rejected(self):
+        with self.assertRaises(ValueError):
+            calendar.set_availability(self.car.pk, self.day(10), self.day(10), is_available=False)
+
+
+class CarCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_cache_fills_read_from_the_primary(self):
+        token = db_router.use_replica.set(True)
+        try:
+            filled_on_replica = get_or_set(make_key(['test'], 'fill'), db_router.use_replica.get)
+            still_on_replica = db_router.use_replica.get()
+        finally:
+            db_router.use_replica.reset(token)
+
+        self.assertFalse(filled_on_replica)
+        self.assertTrue(still_on_replica)
+
+    def test_detail_follows_owner_profile_changes(self):
+        owner = make_user('owner')
+        car = make_car(owner, 'UAD 001A')
+        self.assertFalse(car_cache.car_detail(car.pk)['owner']['is_verified'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            owner.first_name = 'Amina'
+            owner.verification_status = 'verified'
+            owner.save()
+
+        detail = car_cache.car_detail(car.pk)
+        self.assertEqual(detail['owner']['name'], owner.full_name)
+        self.assertTrue(detail['owner']['is_verified'])
+
+
+class NearbyCarsViewTests(TestCase):
+    def test_cars_deleted_after_the_geo_lookup_are_skipped(self):
+        car = make_car(make_user('owner'), 'UAE 001A', latitude=Decimal('0.3476'), longitude=Decimal('32.5825'))
+        matches = [(uuid4(), 0.5), (car.pk, 1.25)]
+
+        with mock.patch('cars.views.geo.nearby', return_value=matches):
+            response = NearbyCarsView.as_view()(APIRequestFactory().get('/?lat=0.3476&lon=32.5825'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(result['id'], result['distance_km']) for result in response.data['results']], [(str(car.pk), 1.25)])
+
+
+class CarSearchTests(TestCase):
+    def setUp(self):
+        self.owner = make_user('owner')
+
+    def rate(self, car, rating_sum, rating_count):
+        Car.objects.filter(pk=car.pk).update(rating_sum=rating_sum, rating_count=rating_count)
+
+    def test_rating_sort_orders_by_average(self):
+        few_top = make_car(self.owner, 'UAA 001A')
+        many_good = make_car(self.owner, 'UAA 002A')
+        unrated = make_car(self.owner, 'UAA 003A')
+        more_top = make_car(self.owner, 'UAA 004A')
+        self.rate(few_top, 9, 2)
+        self.rate(many_good, 40, 10)
+        self.rate(more_top, 18, 4)
+
+        ids = search.search(sort='rating')['ids']
+
+        self.assertEqual(ids, [str(car.pk) for car in (more_top, few_top, many_good, unrated)])
+
+    def test_prefix_query_matches_indexed_terms(self):
+        car = make_car(self.owner, 'UAA 005A', color='Silver')
+        make_car(self.owner, 'UAA 006A')
 
-# Create your tests here.
+        self.assertEqual(search.search('silv')['ids'], [str(car.pk)])
@@ -6,7 +6,7 @@ app_name = 'cars'
 urlpatterns = [
     # Car listing endpoints
     path('listings/', views.CarListingView.as_view(), name='car-listing'),
-    path('listings/<int:pk>/', views.CarDetailView.as_view(), name='car-detail'),
+    path('listings/<uuid:pk>/', views.CarDetailView.as_view(), name='car-detail'),
     path('listings/<int:pk>/update/', views.CarUpdateView.as_view(), name='car-update'),
     path('listings/<int:pk>/delete/', views.CarDeleteView.as_view(), name='car-delete'),
     path('listings/<int:pk>/images/', views.CarImagesView.as_view(), name='car-images'),
@@ -18,14 +18,14 @@ urlpatterns = [
     
     # Car availability
     path('listings/<int:pk>/availability/', views.CarAvailabilityView.as_view(), name='car-availability'),
-    path('listings/<int:pk>/calendar/', views.CarCalendarView.as_view(), name='car-calendar'),
+    path('listings/<uuid:pk>/calendar/', views.CarCalendarView.as_view(), name='car-calendar'),
     
     # Car verification
     path('listings/<int:pk>/verify/', views.CarVerificationView.as_view(), name='car-verify'),
     path('listings/<int:pk>/verification-status/', views.CarVerificationStatusView.as_view(), name='car-verification-status'),
     
     # Car reviews and ratings
-    path('listings/<int:pk>/reviews/', views.CarReviewsView.as_view(), name='car-reviews'),
+    path('listings/<uuid:pk>/reviews/', views.CarReviewsView.as_view(), name='car-reviews'),
     path('listings/<int:pk>/reviews/create/', views.CarReviewCreateView.as_view(), name='car-review-create'),
     path('reviews/<int:pk>/', views.ReviewDetailView.as_view(), name='review-detail'),
     
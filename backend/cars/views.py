@@ -1,3 +1,253 @@
-from django.shortcuts import render
+from datetime import MAXYEAR
+from decimal import Decimal, InvalidOperation
+from uuid import UUID
 
-# Create your views here.
+from django.shortcuts import get_object_or_404, render
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from garipamoja.pagination import InvalidCursor, page_size_param, paginate_request
+
+from cars import cache, calendar, geo, search
+from cars.cache import listing_card
+from cars.models import Car
+
+
+class CarListingView(APIView):
+    """Active cars, newest first, optionally in one city; cursor-paginated"""
+    permission_classes = [permissions.AllowAny]
+    
+    def get(self, request):
+        params = request.query_params
+        try:
+            listing = cache.listing_page(params.get('cursor'), page_size_param(params), city=params.get('city'))
+        except InvalidCursor as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(listing)
+
+
+class MyCarsView(APIView):
+    """The signed-in host's cars, newest first; cursor-paginated"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        try:
+            rows, next_cursor = paginate_request(request, Car.objects.filter(owner=request.user).for_listing())
+        except InvalidCursor as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'results': [dict(listing_card(car), is_active=car.is_active) for car in rows],
+            'next': next_cursor
+        })
+
+
+class MyCarsStatsView(APIView):
+    """The signed-in host's booking totals and per-car breakdown, from the daily rollups"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        from bookings import rollups
+        from bookings.models import DailyCarRollup, DailyHostRollup
+        
+        try:
+            start, end = rollups.date_range(request.query_params)
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        days = DailyHostRollup.objects.filter(host=request.user, date__gte=start, date__lte=end)
+        cars = DailyCarRollup.objects.filter(host=request.user, date__gte=start, date__lte=end)
+        return Response({
+            'start': start,
+            'end': end,
+            'totals': rollups.totals(days),
+            'cars': rollups.breakdown(cars, 'car_id')
+        })
+
+
+class MyCarsEarningsView(APIView):
+    """The signed-in host's daily earnings (booking subtotals; commission is charged on top)"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        from bookings import rollups
+        from bookings.models import DailyHostRollup
+        
+        try:
+            start, end = rollups.date_range(request.query_params)
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        days = rollups.daily_series(DailyHostRollup.objects.filter(host=request.user, date__gte=start, date__lte=end))
+        return Response({
+            'start': start,
+            'end': end,
+            'earnings': sum(day['subtotal'] for day in days),
+            'days': [{'date': day['date'], 'earnings': day['subtotal'], 'bookings': day['bookings'], 'nights': day['nights']} for day in days]
+        })
+
+
+class CarReviewsView(APIView):
+    """Renter reviews of a car, newest first; cursor-paginated"""
+    permission_classes = [permissions.AllowAny]
+    
+    def get(self, request, pk):
+        from bookings.models import Booking
+        
+        reviews = Booking.objects.filter(car_id=pk, renter_rating__isnull=False).select_related('renter')
+        try:
+            rows, next_cursor = paginate_request(request, reviews)
+        except InvalidCursor as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'results': [
+                {
+                    'rating': booking.renter_rating,
+                    'comment': booking.renter_comment,
+                    'reviewer': {'id': str(booking.renter_id), 'name': booking.renter.full_name},
+                    'created_at': booking.created_at
+                }
+                for booking in rows
+            ],
+            'next': next_cursor
+        })
+
+
+class CarDetailView(APIView):
+    """One active car with its images, brand, model and host"""
+    permission_classes = [permissions.AllowAny]
+    
+    def get(self, request, pk):
+        car = cache.car_detail(pk)
+        if car is None:
+            return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(car)
+
+
+class CarBrandView(APIView):
+    permission_classes = [permissions.AllowAny]
+    
+    def get(self, request):
+        return Response(cache.brand_catalog())
+
+
+class CarModelView(APIView):
+    """Car models, optionally of one brand (?brand=<id>)"""
+    permission_classes = [permissions.AllowAny]
+    
+    def get(self, request):
+        brand = request.query_params.get('brand')
+        if brand is not None and not brand.isdigit():
+            return Response({'detail': 'brand must be a brand id'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(cache.model_catalog(int(brand) if brand else None))
+
+
+class CarCalendarView(APIView):
+    """Per-day availability and prices for a month (default), a year, or start/end dates"""
+    permission_classes = [permissions.AllowAny]
+    
+    MAX_DAYS = 366
+    
+    def get(self, request, pk):
+        car = get_object_or_404(Car, pk=pk)
+        params = request.query_params
+        
+        if params.get('start') or params.get('end'):
+            start, end = parse_date(params.get('start') or ''), parse_date(params.get('end') or '')
+            if start is None or end is None or not 0 < (end - start).days <= self.MAX_DAYS:
+                return Response({'detail': f'start and end must be dates at most {self.MAX_DAYS} days apart'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            days = calendar.materialize(car, start, end)
+        else:
+            today = timezone.localdate()
+            try:
+                year = int(params.get('year', today.year))
+                month = int(params['month']) if 'month' in params else None
+                # The calendar ends on the first day of the next month or year, which must be a date too
+                if not 1 <= year < MAXYEAR or month is not None and not 1 <= month <= 12:
+                    raise ValueError
+            except ValueError:
+                return Response({'detail': f'year must be 1-{MAXYEAR - 1} and month 1-12'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            
+            if month is None and 'year' not in params:
+                month = today.month
+            days = calendar.month_calendar(car, year, month) if month else calendar.year_calendar(car, year)
+        
+        return Response({'car': str(car.pk), 'days': days})
+
+
+
+class NearbyCarsView(APIView):
+    """Active cars within radius_km of lat/lon, nearest first"""
+    permission_classes = [permissions.AllowAny]
+    
+    DEFAULT_RADIUS_KM = 10
+    MAX_RADIUS_KM = 100
+    MAX_LIMIT = 100
+    
+    def get(self, request):
+        params = request.query_params
+        try:
+            latitude, longitude = float(params['lat']), float(params['lon'])
+            radius_km = float(params.get('radius_km', self.DEFAULT_RADIUS_KM))
+            limit = int(params.get('limit', 50))
+        except (KeyError, ValueError):
+            return Response({'detail': 'lat and lon are required; radius_km and limit must be numbers'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            return Response({'detail': 'lat/lon out of range'}, status=status.HTTP_400_BAD_REQUEST)
+        if not 0 < radius_km <= self.MAX_RADIUS_KM or not 0 < limit <= self.MAX_LIMIT:
+            return Response({'detail': f'radius_km must be in (0, {self.MAX_RADIUS_KM}] and limit in (0, {self.MAX_LIMIT}]'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        
+        matches = geo.nearby(Car.objects.filter(is_active=True), latitude, longitude, radius_km, limit=limit)
+        cars = Car.objects.for_listing().in_bulk([car_id for car_id, _ in matches])
+        # A car deleted since the geo lookup is skipped, as in CarFilterView
+        results = [
+            dict(listing_card(cars[car_id]), distance_km=round(distance_km, 3))
+            for car_id, distance_km in matches if car_id in cars
+        ]
+        return Response({'count': len(results), 'results': results})
+
+
+class CarFilterView(APIView):
+    """Active cars narrowed by facets and price, with facet counts over the matches"""
+    permission_classes = [permissions.AllowAny]
+    
+    MAX_PAGE_SIZE = 100
+    
+    def get(self, request):
+        params = request.query_params
+        try:
+            page = int(params.get('page', 1))
+            page_size = int(params.get('page_size', 20))
+            filters = {field: params.get(field) for field in search.FACET_FIELDS + ('price_band',)}
+            for bound in ('min_price', 'max_price'):
+                filters[bound] = Decimal(params[bound]) if params.get(bound) else None
+            if page < 1 or not 0 < page_size <= self.MAX_PAGE_SIZE:
+                raise ValueError
+            result = search.search(
+                self.query(request), filters, params.get('sort', 'relevance'),
+                offset=(page - 1) * page_size, limit=page_size
+            )
+        except (ValueError, InvalidOperation) as e:
+            return Response({'detail': str(e) or 'Invalid page, page_size or price'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        cars = Car.objects.for_listing().in_bulk(result['ids'])
+        return Response({
+            'count': result['count'],
+            'page': page,
+            'results': [listing_card(cars[car_id]) for car_id in map(UUID, result['ids']) if car_id in cars],
+            'facets': result['facets']
+        })
+    
+    def query(self, request):
+        return ''
+
+
+class CarSearchView(CarFilterView):
+    """Full-text search over listings (q), with the same filters and facets as CarFilterView"""
+    
+    def query(self, request):
+        return request.query_params.get('q', '')
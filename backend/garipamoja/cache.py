@@ -0,0 +1,106 @@
+"""
+Versioned, stampede-safe caching on top of the default Django cache.
+
+Cached values live under keys that embed the current version of every namespace
+they depend on (e.g. "car:<id>", "catalog"). Invalidation bumps a namespace's
+version instead of hunting down keys, so old entries simply stop being read and
+expire on their own. get_or_set lets one caller rebuild a missing or soon-to-expire
+entry while concurrent callers wait briefly or keep serving the previous value.
+
+Producers always read from the primary: an entry is stored under the versions
+current after the write that bumped them, so filling it from a lagging replica
+would pin the pre-write row there for the whole timeout.
+"""
+
+import random
+import time
+
+from django.core.cache import cache
+
+from garipamoja.db_router import primary
+
+DEFAULT_TIMEOUT = 300
+LOCK_TIMEOUT = 10
+WAIT_SECONDS = 2.0
+WAIT_STEP = 0.05
+# Entries are refreshed by one caller somewhere in the last 10-20% of their lifetime
+EARLY_REFRESH = (0.1, 0.2)
+
+
+def version_key(namespace):
+    return f'version:{namespace}'
+
+
+def initial_version():
+    # Milliseconds, so a version key lost to eviction never restarts at a number already used
+    return int(time.time() * 1000)
+
+
+def versions(namespaces):
+    """{namespace: version}, creating missing versions"""
+    keys = {namespace: version_key(namespace) for namespace in namespaces}
+    found = cache.get_many(list(keys.values()))
+    result = {}
+    for namespace, key in keys.items():
+        if key not in found:
+            cache.add(key, initial_version(), None)
+            found[key] = cache.get(key) or initial_version()
+        result[namespace] = found[key]
+    return result
+
+
+def bump(*namespaces):
+    """Invalidate everything cached under these namespaces"""
+    for namespace in namespaces:
+        try:
+            cache.incr(version_key(namespace))
+        except ValueError:
+            cache.set(version_key(namespace), initial_version(), None)
+
+
+def make_key(namespaces, *parts):
+    current = versions(namespaces)
+    scope = '|'.join(f'{namespace}.{current[namespace]}' for namespace in namespaces)
+    return ':'.join([scope] + [str(part) for part in parts])
+
+
+def produce(producer):
+    with primary():
+        return producer()
+
+
+def get_or_set(key, producer, timeout=DEFAULT_TIMEOUT):
+    """Cached value for key, computing it with producer() at most once at a time"""
+    lock_key = f'lock:{key}'
+    entry = cache.get(key)
+    if entry is not None:
+        value, refresh_at = entry
+        if time.time() < refresh_at or not cache.add(lock_key, 1, LOCK_TIMEOUT):
+            return value
+        return store(key, lock_key, producer, timeout)
+
+    locked = cache.add(lock_key, 1, LOCK_TIMEOUT)
+    if locked is None:
+        # django-redis with IGNORE_EXCEPTIONS returns None while Redis is unreachable
+        return produce(producer)
+    if locked:
+        return store(key, lock_key, producer, timeout)
+
+    # Someone else is computing it; wait for their result rather than piling onto the database
+    deadline = time.time() + WAIT_SECONDS
+    while time.time() < deadline:
+        time.sleep(WAIT_STEP)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+    return produce(producer)
+
+
+def store(key, lock_key, producer, timeout):
+    try:
+        value = produce(producer)
+        refresh_at = time.time() + timeout * (1 - random.uniform(*EARLY_REFRESH))
+        cache.set(key, (value, refresh_at), timeout)
+        return value
+    finally:
+        cache.delete(lock_key)
@@ -0,0 +1,127 @@
+"""
+Primary/replica database routing.
+
+Writes always go to the primary ("default"). Reads go to a replica only while a
+request to one of the DATABASE_REPLICA_VIEWS is being served with a safe method,
+and only if that client has not written recently: every mutating request pins
+the client to the primary until replicas have caught up, so it reads its own
+writes. Authenticated clients (session or JWT bearer token) are pinned by user
+id in the cache, which works for API clients that keep no cookies; anonymous
+ones get a short-lived pin cookie. Anything outside a request (Celery,
+management commands, shell) uses the primary, as does anything run under
+primary().
+"""
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+PIN_COOKIE = 'db_pin_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Set per request by ReplicaRoutingMiddleware
+use_replica = ContextVar('use_replica', default=False)
+
+
+@contextmanager
+def primary():
+    """Route the reads of this block to the primary, even during a replica request"""
+    token = use_replica.set(False)
+    try:
+        yield
+    finally:
+        use_replica.reset(token)
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith('replica')]
+
+
+class PrimaryReplicaRouter:
+    """Send reads to a random replica when the current request allows it"""
+
+    def db_for_read(self, model, **hints):
+        replicas = replica_aliases()
+        if replicas and use_replica.get():
+            return random.choice(replicas)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        # A write mid-request pins its remaining reads to the primary
+        use_replica.set(False)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas mirror the primary, so objects from any alias may relate
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+def pin_key(user_id):
+    return f'db_pin:{user_id}'
+
+
+def client_user_id(request):
+    """Id of the user making the request, from the session or a bearer token, or None
+
+    The token is only validated, not looked up, so this costs no query.
+    """
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return str(user.pk)
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header else None
+    if raw_token is None:
+        return None
+    try:
+        user_id = authentication.get_validated_token(raw_token).get(jwt_settings.USER_ID_CLAIM)
+    except (InvalidToken, TokenError):
+        return None
+    return str(user_id) if user_id is not None else None
+
+
+class ReplicaRoutingMiddleware:
+    """Decide per request whether reads may use replicas, and pin clients after writes"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.replica_views = frozenset(getattr(settings, 'DATABASE_REPLICA_VIEWS', ()))
+        self.pin_seconds = getattr(settings, 'DATABASE_REPLICA_PIN_SECONDS', 5)
+
+    def __call__(self, request):
+        token = use_replica.set(False)
+        try:
+            response = self.get_response(request)
+        finally:
+            use_replica.reset(token)
+
+        if request.method not in SAFE_METHODS and replica_aliases():
+            user_id = client_user_id(request)
+            if user_id is not None:
+                cache.set(pin_key(user_id), 1, self.pin_seconds)
+            else:
+                response.set_cookie(PIN_COOKIE, '1', max_age=self.pin_seconds, httponly=True, samesite='Lax')
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        use_replica.set(
+            request.method in SAFE_METHODS
+            and match is not None and match.view_name in self.replica_views
+            and bool(replica_aliases()) and not self.pinned(request)
+        )
+
+    def pinned(self, request):
+        if PIN_COOKIE in request.COOKIES:
+            return True
+        user_id = client_user_id(request)
+        return user_id is not None and cache.get(pin_key(user_id)) is not None
@@ -12,7 +12,9 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 
 import os
 from pathlib import Path
-from decouple import config
+from decouple import config, Csv
+import dj_database_url
+from celery.schedules import crontab
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -65,6 +67,7 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    'garipamoja.db_router.ReplicaRoutingMiddleware',
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -93,13 +96,90 @@ WSGI_APPLICATION = "garipamoja.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# Connections persist for DB_CONN_MAX_AGE seconds per worker and are health-checked
+# before reuse. Behind a transaction-mode pooler (PgBouncer), set DB_POOLER=True:
+# server-side cursors are disabled because they cannot span pooled transactions, and
+# bookings.exports pages its streams by keyset instead.
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=60, cast=int)
+DB_POOLER = config('DB_POOLER', default=False, cast=bool)
+
+
+def database_from_url(url):
+    database = dj_database_url.parse(url, conn_max_age=DB_CONN_MAX_AGE, conn_health_checks=True)
+    if database['ENGINE'] == 'django.db.backends.postgresql':
+        database['DISABLE_SERVER_SIDE_CURSORS'] = DB_POOLER
+        database['OPTIONS'] = {
+            'connect_timeout': config('DB_CONNECT_TIMEOUT', default=5, cast=int),
+        }
+    return database
+
+
 DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
-    }
+    "default": database_from_url(config('DATABASE_URL', default=f"sqlite:///{BASE_DIR / 'db.sqlite3'}")),
 }
 
+# Read replicas: DATABASE_REPLICA_URLS is a comma-separated list, exposed as replica_0, replica_1, ...
+for index, replica_url in enumerate(config('DATABASE_REPLICA_URLS', default='', cast=Csv())):
+    DATABASES[f'replica_{index}'] = dict(database_from_url(replica_url), TEST={'MIRROR': 'default'})
+
+DATABASE_ROUTERS = ['garipamoja.db_router.PrimaryReplicaRouter']
+
+# Read-heavy views whose GET requests may be served from replicas
+DATABASE_REPLICA_VIEWS = [
+    'cars:car-listing',
+    'cars:car-detail',
+    'cars:car-search',
+    'cars:car-filter',
+    'cars:nearby-cars',
+    'cars:car-reviews',
+    'cars:car-categories',
+    'cars:car-brands',
+    'cars:car-models',
+    'cars:my-cars-stats',
+    'cars:my-cars-earnings',
+    'bookings:booking-stats',
+    'bookings:booking-revenue',
+    'bookings:booking-analytics',
+    'bookings:booking-csv-export',
+    'payments:payment-analytics',
+    'payments:payment-revenue',
+    'payments:payment-transactions',
+    'payments:payment-csv-export',
+    'users:user-detail',
+    'users:user-stats',
+    'users:user-activity',
+]
+
+# How long after a write a client keeps reading from the primary; cover replica lag
+DATABASE_REPLICA_PIN_SECONDS = config('DATABASE_REPLICA_PIN_SECONDS', default=5, cast=int)
+
+
+# Cache
+# Redis via django-redis when REDIS_URL is set; a cache outage degrades to database reads.
+CACHE_REDIS_URL = config('CACHE_REDIS_URL', default=config('REDIS_URL', default=''))
+
+if CACHE_REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": CACHE_REDIS_URL,
+            "TIMEOUT": 300,
+            "KEY_PREFIX": "garipamoja",
+            "OPTIONS": {
+                "CLIENT_CLASS": "django_redis.client.DefaultClient",
+                "SOCKET_CONNECT_TIMEOUT": 2,
+                "SOCKET_TIMEOUT": 2,
+                "IGNORE_EXCEPTIONS": True,
+            },
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -137,6 +217,23 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 
+# Uploaded files and background exports (bookings.tasks)
+MEDIA_URL = "media/"
+MEDIA_ROOT = BASE_DIR / "media"
+
+
+# Celery
+
+CELERY_BROKER_URL = config('CELERY_BROKER_URL', default='redis://localhost:6379/0')
+CELERY_RESULT_BACKEND = config('CELERY_RESULT_BACKEND', default='django-db')
+CELERY_TASK_TRACK_STARTED = True
+CELERY_BEAT_SCHEDULE = {
+    'rebuild-recent-booking-rollups': {
+        'task': 'bookings.tasks.rebuild_recent_rollups',
+        'schedule': crontab(hour=2, minute=30),
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -1,3 +1,11 @@
-from django.shortcuts import render
+from bookings.views import BookingCSVExportView, BookingExportView
 
-# Create your views here.
+
+class PaymentCSVExportView(BookingCSVExportView):
+    """Stream the payment ledger (the money side of bookings) as CSV or NDJSON"""
+    kind = 'payments'
+
+
+class PaymentExportView(BookingExportView):
+    """Background payment ledger exports written to storage"""
+    kind = 'payments'
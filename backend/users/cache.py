@@ -0,0 +1,46 @@
+"""
+Cached public user profiles, versioned per user (see garipamoja.cache).
+"""
+
+from django.db.models import Avg, Count, Q
+
+from garipamoja.cache import bump, get_or_set, make_key
+
+from users.models import User
+
+PROFILE_TIMEOUT = 3600
+
+
+def invalidate_profile(user_id):
+    bump(f'user:{user_id}')
+
+
+def public_profile(user_id):
+    """What other users may see about a user, or None"""
+    def load():
+        user = (
+            User.objects.filter(pk=user_id, is_active=True)
+            .annotate(
+                rating_average=Avg('ratings_received__rating', filter=Q(ratings_received__is_public=True)),
+                rating_count=Count('ratings_received', filter=Q(ratings_received__is_public=True), distinct=True)
+            )
+            .first()
+        )
+        if user is None:
+            return None
+        return {
+            'id': str(user.pk),
+            'name': user.full_name,
+            'user_type': user.user_type,
+            'profile_picture': user.profile_picture.url if user.profile_picture else None,
+            'city': user.city,
+            'country': user.country,
+            'is_verified': user.is_verified,
+            'trust_score': user.trust_score,
+            'rating_average': round(user.rating_average, 2) if user.rating_average is not None else None,
+            'rating_count': user.rating_count,
+            'active_cars': user.cars.filter(is_active=True).count(),
+            'member_since': user.created_at.date()
+        }
+
+    return get_or_set(make_key([f'user:{user_id}'], 'public'), load, PROFILE_TIMEOUT)
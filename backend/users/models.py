@@ -54,6 +54,9 @@ class User(AbstractUser):
     class Meta:
         verbose_name = _('user')
         verbose_name_plural = _('users')
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='user_recent_idx'),
+        ]
     
     def __str__(self):
         return self.email
@@ -164,5 +167,11 @@ class UserNotification(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     read_at = models.DateTimeField(blank=True, null=True)
     
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='notification_user_recent_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.notification_type} for {self.user.email}"
@@ -0,0 +1,18 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from users.cache import invalidate_profile
+from users.models import User, UserRating
+
+
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, instance, **kwargs):
+    user_id = instance.pk
+    transaction.on_commit(lambda: invalidate_profile(user_id))
+
+
+@receiver([post_save, post_delete], sender=UserRating)
+def rating_changed(sender, instance, **kwargs):
+    user_id = instance.reviewed_user_id
+    transaction.on_commit(lambda: invalidate_profile(user_id))
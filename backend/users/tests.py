@@ -1,3 +1,124 @@
-from django.test import TestCase
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from garipamoja import db_router
+from garipamoja.pagination import InvalidCursor, page_size_param, paginate
+
+User = get_user_model()
+
+
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        for index in range(7):
+            User.objects.create_user(username=f'user{index}', email=f'user{index}@example.com', password='secret')
+        # Three pairs share a timestamp, so most page boundaries fall inside a tie
+        moment = timezone.now().replace(microsecond=0)
+        users = list(User.objects.order_by('username'))
+        for index, user in enumerate(users):
+            User.objects.filter(pk=user.pk).update(created_at=moment + timedelta(seconds=index // 2))
+
+    def walk(self, descending, page_size=2):
+        pages, cursor = [], None
+        while True:
+            rows, cursor = paginate(User.objects.all(), cursor, page_size, descending)
+            pages.append([row.pk for row in rows])
+            if cursor is None:
+                return pages
+
+    def test_pages_cover_every_row_once(self):
+        for descending in (True, False):
+            pages = self.walk(descending)
+            ids = [pk for page in pages for pk in page]
+            expected = list(
+                User.objects.order_by(*(['-created_at', '-pk'] if descending else ['created_at', 'pk']))
+                .values_list('pk', flat=True)
+            )
+
+            self.assertEqual(ids, expected)
+            self.assertEqual([len(page) for page in pages], [2, 2, 2, 1])
+
+    def test_rows_inserted_before_the_cursor_do_not_shift_pages(self):
+        rows, cursor = paginate(User.objects.all(), None, 3)
+        newest = User.objects.create_user(username='late', email='late@example.com', password='secret')
+        User.objects.filter(pk=newest.pk).update(created_at=timezone.now() + timedelta(hours=1))
+
+        rest, _ = paginate(User.objects.all(), cursor, 10)
+        ids = [row.pk for row in rows + rest]
+
+        self.assertNotIn(newest.pk, ids)
+        self.assertEqual(len(set(ids)), 7)
+
+    def test_exact_last_page_has_no_cursor(self):
+        rows, cursor = paginate(User.objects.all(), None, 7)
+
+        self.assertEqual(len(rows), 7)
+        self.assertIsNone(cursor)
+
+    def test_cursor_of_the_other_direction_is_rejected(self):
+        _, cursor = paginate(User.objects.all(), None, 2, descending=True)
+
+        with self.assertRaises(InvalidCursor):
+            paginate(User.objects.all(), cursor, 2, descending=False)
+        with self.assertRaises(InvalidCursor):
+            paginate(User.objects.all(), cursor[:-2] + 'xx', 2)
+
+    def test_page_size_is_bounded(self):
+        self.assertEqual(page_size_param({'page_size': '5'}), 5)
+        for value in ('0', '101', 'ten'):
+            with self.assertRaises(InvalidCursor):
+                page_size_param({'page_size': value})
+
+
+@override_settings(DATABASE_REPLICA_VIEWS=['users:user-detail'])
+@mock.patch('garipamoja.db_router.replica_aliases', return_value=['replica_0'])
+class ReplicaPinTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='writer', email='writer@example.com', password='secret')
+        self.middleware = db_router.ReplicaRoutingMiddleware(lambda request: HttpResponse())
+        self.factory = RequestFactory()
+
+    def request(self, method, token=None, cookies=None):
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {token}'} if token else {}
+        request = getattr(self.factory, method)('/', **headers)
+        request.user = AnonymousUser()
+        request.COOKIES.update(cookies or {})
+        request.resolver_match = SimpleNamespace(view_name='users:user-detail')
+        return request
+
+    def reads_replica(self, request):
+        token = db_router.use_replica.set(False)
+        try:
+            self.middleware.process_view(request, None, (), {})
+            return db_router.use_replica.get()
+        finally:
+            db_router.use_replica.reset(token)
+
+    def test_bearer_token_client_reads_its_writes_from_the_primary(self, _):
+        token = str(AccessToken.for_user(self.user))
+        self.assertTrue(self.reads_replica(self.request('get', token)))
+
+        response = self.middleware(self.request('post', token))
+
+        self.assertNotIn(db_router.PIN_COOKIE, response.cookies)
+        self.assertFalse(self.reads_replica(self.request('get', token)))
+        # Other clients keep reading from replicas
+        self.assertTrue(self.reads_replica(self.request('get')))
+
+    def test_anonymous_client_is_pinned_by_cookie(self, _):
+        response = self.middleware(self.request('post'))
+
+        self.assertIn(db_router.PIN_COOKIE, response.cookies)
+        self.assertFalse(self.reads_replica(self.request('get', cookies={db_router.PIN_COOKIE: '1'})))
+
+    def test_invalid_token_counts_as_anonymous(self, _):
+        self.assertIsNone(db_router.client_user_id(self.request('get', 'not-a-token')))
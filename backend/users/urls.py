@@ -18,7 +18,7 @@ urlpatterns = [
     
     # User management endpoints
     path('users/', views.UserListView.as_view(), name='user-list'),
-    path('users/<int:pk>/', views.UserDetailView.as_view(), name='user-detail'),
+    path('users/<uuid:pk>/', views.UserDetailView.as_view(), name='user-detail'),
     path('users/<int:pk>/verify/', views.UserVerificationView.as_view(), name='user-verify'),
     path('users/<int:pk>/suspend/', views.UserSuspensionView.as_view(), name='user-suspend'),
     
@@ -1,3 +1,49 @@
-from django.shortcuts import render
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-# Create your views here.
+from garipamoja.pagination import InvalidCursor, paginate_request
+
+from users.cache import public_profile
+from users.models import User
+
+
+class UserDetailView(APIView):
+    """Public profile of a user"""
+    permission_classes = [permissions.AllowAny]
+    
+    def get(self, request, pk):
+        profile = public_profile(pk)
+        if profile is None:
+            return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(profile)
+
+
+
+class UserListView(APIView):
+    """All users, newest first, for staff; cursor-paginated"""
+    permission_classes = [permissions.IsAdminUser]
+    
+    def get(self, request):
+        users = User.objects.all()
+        if request.query_params.get('user_type'):
+            users = users.filter(user_type=request.query_params['user_type'])
+        try:
+            rows, next_cursor = paginate_request(request, users)
+        except InvalidCursor as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'results': [
+                {
+                    'id': str(user.pk),
+                    'email': user.email,
+                    'name': user.full_name,
+                    'user_type': user.user_type,
+                    'verification_status': user.verification_status,
+                    'is_active': user.is_active,
+                    'created_at': user.created_at
+                }
+                for user in rows
+            ],
+            'next': next_cursor
+        })